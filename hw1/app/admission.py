@@ -0,0 +1,110 @@
+import asyncio
+import math
+import os
+from collections import deque
+from typing import Deque, List, Optional
+
+
+class Overloaded(Exception):
+    """A request shed by admission control; answered with 503 and a Retry-After header."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("Service Unavailable")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Weighted concurrency limiter with a bounded FIFO wait queue.
+
+    Every request holds `cost` units of a `capacity` budget while it runs. A request that does not
+    fit waits in the queue for at most `queue_timeout` seconds; when the queue is full it is rejected
+    right away, so excess load is shed before it piles up behind expensive requests. Waiters are
+    admitted strictly in arrival order so that expensive requests are not starved by cheap ones.
+    A capacity of 0 disables admission control.
+    """
+
+    def __init__(
+            self,
+            capacity: Optional[int] = None,
+            max_queue: Optional[int] = None,
+            queue_timeout: Optional[float] = None,
+    ) -> None:
+        self.capacity = capacity if capacity is not None else int(os.environ.get("HW1_ADMISSION_CAPACITY", 64))
+        self.max_queue = max_queue if max_queue is not None else int(os.environ.get("HW1_ADMISSION_QUEUE", 128))
+        self.queue_timeout = (
+            queue_timeout if queue_timeout is not None
+            else float(os.environ.get("HW1_ADMISSION_QUEUE_TIMEOUT", 1.0))
+        )
+        self.retry_after = max(1, math.ceil(self.queue_timeout))
+
+        self._waiters: Deque[List] = deque()
+        self.in_use = 0
+        self.admitted = 0
+        # Requests rejected because the queue was full, and requests that waited past their deadline
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, cost: int) -> int:
+        """
+        Wait until `cost` units of the budget are free and take them.
+
+        Args:
+            cost (int): Estimated cost of the request; capped at the capacity so that
+                any request can run when it is alone.
+
+        Returns:
+            int: The units taken, to be given back with `release()`.
+
+        Raises:
+            Overloaded: If the queue is full or the request waited longer than `queue_timeout`.
+        """
+        if not self.enabled:
+            return 0
+        cost = max(1, min(cost, self.capacity))
+        if not self._waiters and self.in_use + cost <= self.capacity:
+            self.in_use += cost
+            self.admitted += 1
+            return cost
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(self.retry_after)
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = [cost, future]
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                # Admitted at the very moment the wait was given up
+                self.release(cost)
+            else:
+                future.cancel()
+                self._waiters.remove(waiter)
+                self._wake()
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise Overloaded(self.retry_after) from None
+            raise
+        return cost
+
+    def release(self, cost: int) -> None:
+        if cost:
+            self.in_use -= cost
+            self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_use + self._waiters[0][0] <= self.capacity:
+            cost, future = self._waiters.popleft()
+            self.in_use += cost
+            self.admitted += 1
+            future.set_result(None)
@@ -0,0 +1,95 @@
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Hashable, List, NamedTuple, Optional, Tuple
+
+
+class CachedResponse(NamedTuple):
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    etag: bytes
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(name) + len(value) for name, value in self.headers)
+
+
+def make_etag(body: bytes) -> bytes:
+    """Strong entity tag derived from the body."""
+    return b'"' + hashlib.blake2b(body, digest_size=16).hexdigest().encode("ascii") + b'"'
+
+
+def etag_matches(if_none_match: bytes, etag: bytes) -> bool:
+    """Whether an If-None-Match header value matches the entity tag (weak comparison)."""
+    for candidate in if_none_match.split(b","):
+        candidate = candidate.strip()
+        if candidate == b"*" or candidate.removeprefix(b"W/") == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """
+    LRU cache of fully encoded responses bounded by their total size in bytes.
+
+    Responses larger than `max_entry_bytes` are never stored, so a single huge result cannot
+    flush the whole cache. A `max_bytes` of 0 disables caching.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, max_entry_bytes: Optional[int] = None) -> None:
+        self.max_bytes = (
+            max_bytes if max_bytes is not None
+            else int(os.environ.get("HW1_CACHE_BYTES", 64 * 1024 * 1024))
+        )
+        self.max_entry_bytes = (
+            max_entry_bytes if max_entry_bytes is not None
+            else int(os.environ.get("HW1_CACHE_ENTRY_BYTES", 1024 * 1024))
+        )
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def accepts(self, size: int) -> bool:
+        """Whether a response of roughly this many bytes would be stored."""
+        return 0 < size <= min(self.max_entry_bytes, self.max_bytes)
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: Hashable, headers: List[Tuple[bytes, bytes]], body: bytes) -> CachedResponse:
+        """Build the entry (adding content-length and an ETag) and store it if it fits the budget."""
+        etag = make_etag(body)
+        headers = [
+            *headers,
+            (b"content-length", str(len(body)).encode("ascii")),
+            (b"etag", etag),
+        ]
+        entry = CachedResponse(headers, body, etag)
+        if not self.accepts(entry.size):
+            return entry
+
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= previous.size
+        self._entries[key] = entry
+        self.size += entry.size
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= evicted.size
+            self.evictions += 1
+        return entry
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
@@ -0,0 +1,81 @@
+import json
+import os
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+AUTO = "auto"
+
+
+class JsonCodec(NamedTuple):
+    """A JSON backend: `dumps` returns UTF-8 bytes, `loads` accepts bytes."""
+
+    name: str
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[bytes], Any]
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    return json.dumps(obj).encode("utf-8")
+
+
+def stdlib_codec() -> JsonCodec:
+    return JsonCodec("json", _stdlib_dumps, json.loads)
+
+
+def orjson_codec() -> JsonCodec:
+    import orjson
+
+    def dumps(obj: Any) -> bytes:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # orjson only serializes integers that fit in 64 bits
+            return _stdlib_dumps(obj)
+
+    return JsonCodec("orjson", dumps, orjson.loads)
+
+
+def ujson_codec() -> JsonCodec:
+    import ujson
+
+    def dumps(obj: Any) -> bytes:
+        try:
+            return ujson.dumps(obj, ensure_ascii=False).encode("utf-8")
+        except OverflowError:
+            # ujson only serializes integers that fit in 64 bits
+            return _stdlib_dumps(obj)
+
+    return JsonCodec("ujson", dumps, ujson.loads)
+
+
+# Fastest first; "auto" picks the first one that can be imported
+CODECS: Dict[str, Callable[[], JsonCodec]] = {
+    "orjson": orjson_codec,
+    "ujson": ujson_codec,
+    "json": stdlib_codec,
+}
+
+
+def get_codec(name: Optional[str] = None) -> JsonCodec:
+    """
+    Build the JSON codec selected by `name` or the HW1_JSON_CODEC environment variable.
+
+    Args:
+        name (Optional[str]): "auto" (default), "orjson", "ujson" or "json".
+
+    Returns:
+        JsonCodec: The codec.
+
+    Raises:
+        ValueError: If the name is unknown.
+        ImportError: If the requested library is not installed.
+    """
+    name = name or os.environ.get("HW1_JSON_CODEC", AUTO)
+    if name == AUTO:
+        for factory in CODECS.values():
+            try:
+                return factory()
+            except ImportError:
+                continue
+    if name not in CODECS:
+        raise ValueError(f"Unknown JSON codec: {name}")
+    return CODECS[name]()
@@ -0,0 +1,173 @@
+from functools import lru_cache
+from typing import Any, Callable, Iterable, Iterator, List, Tuple
+
+JSON = "application/json"
+HEX = "application/x-hex"
+BINARY = "application/octet-stream"
+FORMATS = (JSON, HEX, BINARY)
+
+# Digits converted with str() at the leaves of the divide-and-conquer conversion.
+# Kept well below the int-to-str digit limit of Python 3.11+ (4300 digits by default).
+LEAF_DIGITS = 1024
+CHUNK_SIZE = 64 * 1024
+# Bit length at which converting a result to decimal costs about as much again as the result's size
+DECIMAL_COST_BITS = 1_000_000
+
+
+def negotiate_format(headers: Iterable[Tuple[bytes, bytes]]) -> str:
+    """
+    Pick the response format from the Accept header, in the order listed by the client.
+
+    Args:
+        headers (Iterable[Tuple[bytes, bytes]]): Raw ASGI request headers.
+
+    Returns:
+        str: One of JSON, HEX or BINARY; JSON when nothing else is accepted.
+    """
+    for name, value in headers:
+        if name.lower() != b"accept":
+            continue
+        for media_range in value.decode("latin-1").split(","):
+            media_type = media_range.split(";", 1)[0].strip().lower()
+            if media_type in FORMATS:
+                return media_type
+    return JSON
+
+
+@lru_cache(maxsize=None)
+def _pow10(level: int) -> int:
+    """10 ** (LEAF_DIGITS * 2 ** level), shared between requests."""
+    if level == 0:
+        return 10 ** LEAF_DIGITS
+    half = _pow10(level - 1)
+    return half * half
+
+
+def _decimal_parts(n: int, level: int, pad: bool) -> Iterator[str]:
+    # n < _pow10(level); with `pad` the output is zero-filled to LEAF_DIGITS * 2 ** level digits
+    if level == 0:
+        digits = str(n)
+        yield digits.zfill(LEAF_DIGITS) if pad else digits
+        return
+
+    high, low = divmod(n, _pow10(level - 1))
+    if high or pad:
+        yield from _decimal_parts(high, level - 1, pad)
+        yield from _decimal_parts(low, level - 1, True)
+    else:
+        yield from _decimal_parts(low, level - 1, pad)
+
+
+def iter_decimal(n: int) -> Iterator[str]:
+    """
+    Convert a non-negative integer to decimal lazily, most significant digits first.
+
+    The number is split recursively by powers 10 ** (LEAF_DIGITS * 2 ** k), so no str() call
+    exceeds the int-to-str digit limit and the whole string is never built at once. The divisions
+    dominate: big-int division is quadratic before CPython 3.12, so the conversion is too, only
+    faster than str() (see estimate_encoding_cost).
+
+    Args:
+        n (int): The number to convert.
+
+    Returns:
+        Iterator[str]: Consecutive pieces of the decimal representation.
+    """
+    if n < 0:
+        raise ValueError("n should be a non-negative integer")
+
+    level = 0
+    while n >= _pow10(level):
+        level += 1
+    return _decimal_parts(n, level, False)
+
+
+def _batch(parts: Iterable[str], chunk_size: int) -> Iterator[bytes]:
+    buffer: List[str] = []
+    size = 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield "".join(buffer).encode("ascii")
+            buffer.clear()
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode("ascii")
+
+
+def iter_json_result(n: int, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Render {"result": n} as a sequence of byte chunks of roughly `chunk_size` bytes.
+
+    Args:
+        n (int): The result to render.
+        chunk_size (int): Approximate size of every chunk.
+
+    Returns:
+        Iterator[bytes]: The JSON document split into chunks.
+    """
+    yield b'{"result": '
+    yield from _batch(iter_decimal(n), chunk_size)
+    yield b"}"
+
+
+def encode_decimal(n: int) -> bytes:
+    """ASCII decimal digits of a non-negative integer, with no int-to-str digit limit."""
+    return "".join(iter_decimal(n)).encode("ascii")
+
+
+def encode_json(n: int) -> bytes:
+    """The JSON document {"result": n}."""
+    return b"".join(iter_json_result(n))
+
+
+def encode_hex(n: int) -> bytes:
+    """Lowercase hexadecimal digits of a non-negative integer; linear time, no digit limit."""
+    return format(n, "x").encode("ascii")
+
+
+def encode_binary(n: int) -> bytes:
+    """Big-endian unsigned bytes of a non-negative integer; b"\\x00" for zero."""
+    return n.to_bytes(max((n.bit_length() + 7) // 8, 1), "big")
+
+
+def iter_slices(data: bytes, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Split bytes into chunks, slicing through a memoryview so only one chunk is copied at a time."""
+    view = memoryview(data)
+    for offset in range(0, len(view), chunk_size):
+        yield bytes(view[offset:offset + chunk_size])
+
+
+def estimate_encoding_cost(bits: int, response_format: str) -> int:
+    """
+    Estimate the cost of encoding a result with the given bit length, in the same bit units as
+    the estimates of the computation. Hex and binary are linear; decimal grows quadratically.
+    """
+    if response_format in (HEX, BINARY):
+        return bits
+    return bits + bits * bits // DECIMAL_COST_BITS
+
+
+ENCODERS = {JSON: encode_json, HEX: encode_hex, BINARY: encode_binary}
+
+
+def encode_result(n: int, response_format: str) -> bytes:
+    """Encode a whole non-negative integer result in one of FORMATS."""
+    return ENCODERS[response_format](n)
+
+
+def call_encoded(encode: Callable[[int], bytes], func: Callable[..., int], *args: Any) -> bytes:
+    """
+    Call `func` and encode its integer result, so that a pooled job returns bytes and the
+    conversion, which costs as much as the computation for large results, stays off the event loop.
+
+    Args:
+        encode (Callable[[int], bytes]): One of ENCODERS or encode_decimal; must be picklable.
+        func (Callable[..., int]): The computation; must be picklable.
+        *args (Any): Arguments of `func`.
+
+    Returns:
+        bytes: The encoded result.
+    """
+    return encode(func(*args))
@@ -0,0 +1,112 @@
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any, Callable, List, Optional, Tuple
+
+INLINE = "inline"
+POOL = "pool"
+AUTO = "auto"
+EXECUTION_MODES = (INLINE, POOL, AUTO)
+# Largest estimated cost ever run on the event loop itself, whatever the mode and threshold
+INLINE_MAX_COST = 250_000
+
+# Set by the caller (the server, per admitted request) to collect the jobs that were still running
+# when their deadline passed, so that it can keep their cost reserved until they really finish
+overrunning_jobs: ContextVar[Optional[List["asyncio.Future[Any]"]]] = ContextVar("overrunning_jobs", default=None)
+
+
+class ComputeExecutor:
+    """
+    Runs CPU-heavy calculations either inline on the event loop or on a process pool.
+
+    In "auto" mode only calls whose estimated cost exceeds `cost_threshold` (or INLINE_MAX_COST)
+    are sent to the pool, "pool" sends everything and "inline" never uses a pool. The pool is
+    created by `start()` (called from the ASGI lifespan startup). Calls that are not sent to the
+    pool run on the event loop up to INLINE_MAX_COST, and above it on a thread with the deadline.
+    """
+
+    def __init__(
+            self,
+            mode: Optional[str] = None,
+            max_workers: Optional[int] = None,
+            cost_threshold: Optional[int] = None,
+            deadline: Optional[float] = None,
+    ) -> None:
+        self.mode = mode or os.environ.get("HW1_EXECUTION_MODE", AUTO)
+        if self.mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode: {self.mode}")
+
+        workers = max_workers or os.environ.get("HW1_POOL_WORKERS")
+        self.max_workers = int(workers) if workers else None
+        self.cost_threshold = (
+            cost_threshold if cost_threshold is not None
+            else int(os.environ.get("HW1_POOL_COST_THRESHOLD", 250_000))
+        )
+        self.deadline = deadline if deadline is not None else float(os.environ.get("HW1_DEADLINE_SECONDS", 30.0))
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._threads: Optional[ThreadPoolExecutor] = None
+        # Number of calls submitted to the pool and not finished yet, and its high-water mark
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+
+    @property
+    def started(self) -> bool:
+        return self._pool is not None
+
+    def start(self, initializer: Optional[Callable[..., None]] = None, initargs: Tuple[Any, ...] = ()) -> None:
+        if self.mode != INLINE and self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=initializer, initargs=initargs)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+            self._threads = None
+
+    def _executor(self, offloaded: bool) -> Executor:
+        if offloaded and self._pool is not None:
+            return self._pool
+        # Without a pool, expensive calls go to threads so they get the deadline too
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="hw1-compute")
+        return self._threads
+
+    def _job_done(self, _: "asyncio.Future[Any]") -> None:
+        self.queue_depth -= 1
+
+    def offloads(self, cost: int) -> bool:
+        """Whether a call with the given estimated cost would be sent to the pool."""
+        if self._pool is None or self.mode == INLINE:
+            return False
+        return self.mode == POOL or cost > min(self.cost_threshold, INLINE_MAX_COST)
+
+    async def run(self, func: Callable[..., Any], *args: Any, cost: int = 0) -> Any:
+        """
+        Call `func(*args)` inline or on the pool depending on the mode and the estimated cost.
+
+        Raises:
+            asyncio.TimeoutError: If a call that left the event loop does not finish within the deadline.
+        """
+        offloaded = self.offloads(cost)
+        if not offloaded and cost <= INLINE_MAX_COST:
+            return func(*args)
+
+        job = self._executor(offloaded).submit(func, *args)
+        future = asyncio.wrap_future(job)
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        future.add_done_callback(self._job_done)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.deadline)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # Queued calls are dropped; one already running in a worker cannot be interrupted, so
+            # it is reported through overrunning_jobs while the request itself is freed
+            if not job.cancel():
+                jobs = overrunning_jobs.get()
+                if jobs is not None:
+                    jobs.append(future)
+            raise
@@ -0,0 +1,144 @@
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Bucket boundaries of the default metrics of prometheus_fastapi_instrumentator used by hw2, so the
+# histograms of both services line up on dashboards: few buckets per handler, many without labels
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.1, 0.5, 1.0)
+HIGHR_BUCKETS: Tuple[float, ...] = (
+    0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0, 7.5, 10.0, 30.0, 60.0,
+)
+CONTENT_TYPE = b"text/plain; version=0.0.4; charset=utf-8"
+# Handler label of requests that did not match any route
+UNMATCHED = "none"
+# Method label of requests whose method is not a standard one, so clients cannot create label series
+OTHER_METHOD = "OTHER"
+HTTP_METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "CONNECT", "TRACE"))
+
+
+class Histogram:
+    """Latency histogram over a preallocated array of per-bucket counts; made cumulative on render."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RouteMetrics:
+    __slots__ = ("statuses", "latency")
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        # Counts by status class ("2xx", "4xx", ...), grouped like the instrumentator does
+        self.statuses: Dict[str, int] = {}
+        self.latency = Histogram(buckets)
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    return ",".join(f'{name}="{value}"' for name, value in labels.items())
+
+
+def _render_histogram(lines: List[str], name: str, labels: str, histogram: Histogram) -> None:
+    prefix = f"{labels}," if labels else ""
+    cumulative = 0
+    # The last count is the +Inf overflow bucket
+    for bound, count in zip(histogram.buckets, histogram.counts[:-1], strict=True):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{prefix}le="{float(bound)!r}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {histogram.sum!r}")
+    lines.append(f"{name}_count{suffix} {histogram.count}")
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """
+    Request metrics of the hw1 server rendered in the Prometheus text format.
+
+    Metric names, status classes and buckets follow the default Instrumentator() of hw2, so both
+    services can share dashboards. Everything runs on the event loop thread, so plain integer updates need no locks;
+    per-route state is created when routes are registered, keeping the hot path to a dict lookup.
+    """
+
+    def __init__(
+            self,
+            buckets: Sequence[float] = DEFAULT_BUCKETS,
+            highr_buckets: Sequence[float] = HIGHR_BUCKETS,
+    ) -> None:
+        self.buckets = tuple(buckets)
+        self.routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self.latency_highr = Histogram(highr_buckets)
+        self.in_flight = 0
+        # Extra gauges and counters evaluated on scrape: name -> (type, help, callback)
+        self.collectors: Dict[str, Tuple[str, str, Callable[[], float]]] = {}
+
+    def register(self, method: str, handler: str) -> RouteMetrics:
+        key = (method, handler)
+        if key not in self.routes:
+            self.routes[key] = RouteMetrics(self.buckets)
+        return self.routes[key]
+
+    def add_collector(self, name: str, metric_type: str, help_text: str, callback: Callable[[], float]) -> None:
+        self.collectors[name] = (metric_type, help_text, callback)
+
+    def observe(self, method: str, handler: Optional[str], status: int, duration: float) -> None:
+        route = self.routes.get((method, handler or UNMATCHED))
+        if route is None:
+            if method not in HTTP_METHODS:
+                method = OTHER_METHOD
+            route = self.register(method, handler or UNMATCHED)
+        status_class = f"{status // 100}xx"
+        route.statuses[status_class] = route.statuses.get(status_class, 0) + 1
+        route.latency.observe(duration)
+        self.latency_highr.observe(duration)
+
+    def render(self) -> bytes:
+        lines: List[str] = [
+            "# HELP http_requests_total Total number of requests by method, status and handler.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, handler), route in self.routes.items():
+            for status, count in sorted(route.statuses.items()):
+                labels = _format_labels({"handler": handler, "method": method, "status": status})
+                lines.append(f"http_requests_total{{{labels}}} {count}")
+
+        lines += [
+            "# HELP http_request_duration_highr_seconds Latency with many buckets but no API specific labels. "
+            "Made for more accurate percentile calculations.",
+            "# TYPE http_request_duration_highr_seconds histogram",
+        ]
+        _render_histogram(lines, "http_request_duration_highr_seconds", "", self.latency_highr)
+
+        lines += [
+            "# HELP http_request_duration_seconds Latency with only few buckets by handler. "
+            "Made to be only used if aggregation by handler is important.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, handler), route in self.routes.items():
+            if route.latency.count:
+                labels = _format_labels({"handler": handler, "method": method})
+                _render_histogram(lines, "http_request_duration_seconds", labels, route.latency)
+
+        lines += [
+            "# HELP http_requests_inprogress Number of HTTP requests in progress.",
+            "# TYPE http_requests_inprogress gauge",
+            f"http_requests_inprogress {self.in_flight}",
+        ]
+        for name, (metric_type, help_text, callback) in self.collectors.items():
+            lines += [
+                f"# HELP {name} {help_text}",
+                f"# TYPE {name} {metric_type}",
+                f"{name} {_format_value(callback())}",
+            ]
+        return ("\n".join(lines) + "\n").encode("utf-8")
@@ -0,0 +1,164 @@
+import re
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+_INT = re.compile(r"-?[0-9]+")
+
+
+def _to_int(raw: str) -> int:
+    # int() also takes "1_0", "+1", " 1" and non-ASCII digits, none of which are a path integer
+    if _INT.fullmatch(raw) is None:
+        raise ValueError(f"invalid integer: {raw!r}")
+    return int(raw)
+
+
+# Converters for typed path parameters, e.g. "/fibonacci/{n:int}"
+CONVERTERS: Dict[str, Callable[[str], Any]] = {
+    "str": str,
+    "int": _to_int,
+}
+
+
+class Route(NamedTuple):
+    method: str
+    pattern: str
+    handler: Callable
+
+
+class RouteNotFound(LookupError):
+    pass
+
+
+class MethodNotAllowed(LookupError):
+    def __init__(self, allowed: List[str]) -> None:
+        super().__init__(", ".join(allowed))
+        self.allowed = allowed
+
+
+class InvalidPathParam(ValueError):
+    def __init__(self, name: str, route: Route) -> None:
+        super().__init__(name)
+        self.route = route
+
+
+class _Node:
+    """Tree node for one path segment: static children by segment, at most one parameter child."""
+
+    __slots__ = ("static", "param", "param_name", "converter", "routes")
+
+    def __init__(self) -> None:
+        self.static: Dict[str, "_Node"] = {}
+        self.param: Optional["_Node"] = None
+        self.param_name = ""
+        self.converter: Callable[[str], Any] = str
+        self.routes: Dict[str, Route] = {}
+
+
+class Router:
+    """
+    Route table compiled when routes are added.
+
+    Static paths are answered with one dict lookup; paths with parameters walk a radix tree
+    over path segments, where static segments win over parameters. Parameters are converted
+    after the whole path matched, so a route whose "{n:int}" segment is not an integer raises
+    InvalidPathParam instead of falling through to 404. So does a route whose last parameter is
+    missing: "/fibonacci" and "/fibonacci/" are "/fibonacci/{n:int}" without n.
+    """
+
+    def __init__(self) -> None:
+        self._static: Dict[str, Dict[str, Route]] = {}
+        self._root = _Node()
+        self.routes: List[Route] = []
+
+    def add(self, method: str, pattern: str, handler: Callable) -> Route:
+        route = Route(method, pattern, handler)
+        self.routes.append(route)
+        if "{" not in pattern:
+            self._static.setdefault(pattern, {})[method] = route
+            return route
+
+        node = self._root
+        for segment in pattern.split("/")[1:]:
+            if segment.startswith("{") and segment.endswith("}"):
+                name, _, type_name = segment[1:-1].partition(":")
+                if (type_name or "str") not in CONVERTERS:
+                    raise ValueError(f"Unknown parameter type in {pattern}")
+                converter = CONVERTERS[type_name or "str"]
+                if node.param is None:
+                    node.param = _Node()
+                    node.param.param_name = name
+                    node.param.converter = converter
+                elif (node.param.param_name, node.param.converter) != (name, converter):
+                    raise ValueError(f"Conflicting parameter {segment} in {pattern}")
+                node = node.param
+            else:
+                node = node.static.setdefault(segment, _Node())
+        node.routes[method] = route
+        return route
+
+    def match(self, method: str, path: str) -> Tuple[Route, Dict[str, Any]]:
+        """
+        Find the handler for a request.
+
+        Args:
+            method (str): HTTP method.
+            path (str): Request path.
+
+        Returns:
+            Tuple[Route, Dict[str, Any]]: The route and converted path parameters.
+
+        Raises:
+            RouteNotFound: If no route matches the path.
+            MethodNotAllowed: If the path matches but not for this method.
+            InvalidPathParam: If a typed path parameter cannot be converted.
+        """
+        routes = self._static.get(path)
+        values: List[Tuple[_Node, str]] = []
+        if routes is None:
+            node = self._lookup(self._root, path.split("/")[1:], 0, values)
+            if node is None and not path.endswith("/"):
+                node = self._lookup(self._root, (path + "/").split("/")[1:], 0, values)
+                if node is not None and not (values and values[-1][1] == ""):
+                    node = None
+            if node is None:
+                raise RouteNotFound(path)
+            routes = node.routes
+
+        route = routes.get(method)
+        if route is None:
+            raise MethodNotAllowed(sorted(routes))
+
+        params: Dict[str, Any] = {}
+        for param, raw in values:
+            if not raw:
+                raise InvalidPathParam(param.param_name, route)
+            try:
+                params[param.param_name] = param.converter(raw)
+            except ValueError as e:
+                raise InvalidPathParam(param.param_name, route) from e
+        return route, params
+
+    def _lookup(
+            self,
+            node: _Node,
+            segments: List[str],
+            index: int,
+            values: List[Tuple[_Node, str]],
+    ) -> Optional[_Node]:
+        if index == len(segments):
+            return node if node.routes else None
+
+        segment = segments[index]
+        child = node.static.get(segment)
+        if child is not None:
+            found = self._lookup(child, segments, index + 1, values)
+            if found is not None:
+                return found
+
+        # Only the last segment may be empty, as a missing parameter
+        if node.param is not None and (segment or index == len(segments) - 1):
+            values.append((node.param, segment))
+            found = self._lookup(node.param, segments, index + 1, values)
+            if found is not None:
+                return found
+            values.pop()
+        return None
@@ -1,131 +1,559 @@
-import json
-from typing import Any, Callable, Dict
+import asyncio
+import math
+import os
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
 from urllib.parse import parse_qs
 
-from .utils import calculate_factorial, calculate_fibonacci, calculate_mean
+from .admission import AdmissionController, Overloaded
+from .cache import CachedResponse, ResponseCache, etag_matches
+from .codec import JsonCodec, get_codec
+from .encoding import (
+    ENCODERS,
+    JSON,
+    call_encoded,
+    encode_decimal,
+    encode_result,
+    estimate_encoding_cost,
+    iter_slices,
+    negotiate_format,
+)
+from .executor import ComputeExecutor, overrunning_jobs
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from .metrics import Metrics
+from .router import InvalidPathParam, MethodNotAllowed, Route, RouteNotFound, Router
+from .stats import DEFAULT_BOUNDS, DEFAULT_QUANTILES, DescriptiveStats, float64_batch
+from .streaming import CompensatedSum, Float64Reader, NumberArrayParser
+from .tables import (
+    DEFAULT_FACTORIAL_CHECKPOINTS,
+    DEFAULT_FIBONACCI_CHECKPOINTS,
+    SharedTable,
+    attach_shared_table,
+)
+from .utils import (
+    calculate_factorial,
+    calculate_fibonacci,
+    calculate_float64_sum,
+    estimate_factorial_bits,
+    estimate_factorial_mod_cost,
+    estimate_fibonacci_bits,
+    estimate_fibonacci_mod_cost,
+    factorial_mod,
+    fibonacci_mod,
+    use_shared_table,
+)
+from .validation import (
+    BadRequest,
+    RequestError,
+    UnprocessableEntity,
+    validate_float_list,
+    validate_modulus,
+    validate_n,
+    validate_numbers,
+    validate_quantiles,
+)
+
+# Operations of one /batch request running at the same time, and the longest accepted input line
+BATCH_CONCURRENCY = 32
+MAX_BATCH_LINE_BYTES = 1024 * 1024
+# Admission cost of a request: one unit plus one per this many result bits or request body bytes
+COST_UNIT_BITS = 250_000
+COST_UNIT_BYTES = 1024 * 1024
+# Error responses whose body and headers never change; they are encoded once per app
+STATIC_ERRORS: Tuple[Tuple[int, str], ...] = (
+    (BadRequest.status_code, BadRequest.message),
+    (404, "Not Found"),
+    (405, "Method Not Allowed"),
+    (UnprocessableEntity.status_code, UnprocessableEntity.message),
+    (500, "Internal Server Error"),
+    (503, "Service Unavailable"),
+)
 
 
 class ServerApp:
-    def __init__(self) -> None:
-        self.routes: Dict[str, Dict[str, Callable]] = {
-            "GET": {
-                "/factorial": self.factorial,
-                "/fibonacci": self.fibonacci,
-                "/mean": self.mean,
-            }
+    def __init__(
+            self,
+            executor: Optional[ComputeExecutor] = None,
+            cache: Optional[ResponseCache] = None,
+            warm_up: Optional[bool] = None,
+            admission: Optional[AdmissionController] = None,
+            codec: Optional[JsonCodec] = None,
+    ) -> None:
+        self.executor = executor or ComputeExecutor()
+        self.cache = cache if cache is not None else ResponseCache()
+        self.admission = admission or AdmissionController()
+        self.codec = codec or get_codec()
+        self.static_errors: Dict[Tuple[int, str], Tuple[bytes, Tuple[Tuple[bytes, bytes], ...]]] = {}
+        for status_code, message in STATIC_ERRORS:
+            body = self.codec.dumps({"error": message})
+            headers = ((b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("utf-8")))
+            self.static_errors[status_code, message] = (body, headers)
+
+        # Startup work done on ASGI lifespan startup, see warm_up()
+        self.warm_up_enabled = warm_up if warm_up is not None else os.environ.get("HW1_WARM_UP", "1") != "0"
+        self.table_path: Optional[str] = os.environ.get("HW1_TABLE_PATH") or None
+        self.fibonacci_checkpoints: Iterable[int] = DEFAULT_FIBONACCI_CHECKPOINTS
+        self.factorial_checkpoints: Iterable[int] = DEFAULT_FACTORIAL_CHECKPOINTS
+        self.warm_responses = int(os.environ.get("HW1_WARM_RESPONSES", 64))
+        self.table: Optional[SharedTable] = None
+        self.router = Router()
+        self.router.add("GET", "/factorial", self.factorial)
+        self.router.add("GET", "/fibonacci/{n:int}", self.fibonacci)
+        self.router.add("GET", "/mean", self.mean)
+        self.router.add("POST", "/mean", self.mean)
+        self.router.add("GET", "/stats", self.stats)
+        self.router.add("POST", "/stats", self.stats)
+        self.router.add("POST", "/batch", self.batch)
+        self.router.add("GET", "/metrics", self.metrics_endpoint)
+        # Estimated cost of the admission-controlled routes; /metrics stays reachable under load
+        self.admission_costs: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], int]] = {
+            "/factorial": lambda scope, params: (
+                estimate_factorial_mod_cost(_query_int(params, "n"), _query_int(params, "mod"))
+                if "mod" in params else _result_cost(
+                    estimate_factorial_bits(_query_int(params, "n")), negotiate_format(scope.get("headers", [])),
+                )
+            ) // COST_UNIT_BITS,
+            "/fibonacci/{n:int}": lambda scope, params: (
+                estimate_fibonacci_mod_cost(scope["path_params"]["n"], _query_int(params, "mod"))
+                if "mod" in params else _result_cost(
+                    estimate_fibonacci_bits(scope["path_params"]["n"]), negotiate_format(scope.get("headers", [])),
+                )
+            ) // COST_UNIT_BITS,
+            "/mean": lambda scope, params: _content_length(scope) // COST_UNIT_BYTES,
+            "/stats": lambda scope, params: _content_length(scope) // COST_UNIT_BYTES,
+            "/batch": lambda scope, params: _content_length(scope) // COST_UNIT_BYTES,
         }
 
+        self.metrics = Metrics()
+        for route in self.router.routes:
+            self.metrics.register(route.method, route.pattern)
+        collectors = [
+            ("hw1_response_cache_hits_total", "counter", "Response cache hits.", lambda: self.cache.hits),
+            ("hw1_response_cache_misses_total", "counter", "Response cache misses.", lambda: self.cache.misses),
+            ("hw1_response_cache_evictions_total", "counter", "Response cache evictions.",
+             lambda: self.cache.evictions),
+            ("hw1_response_cache_bytes", "gauge", "Size of the cached responses.", lambda: self.cache.size),
+            ("hw1_pool_queue_depth", "gauge", "Calls waiting for or running on the process pool.",
+             lambda: self.executor.queue_depth),
+            ("hw1_admission_queue_depth", "gauge", "Requests waiting for admission.",
+             lambda: self.admission.queue_depth),
+            ("hw1_admission_in_use", "gauge", "Cost units held by running requests.", lambda: self.admission.in_use),
+            ("hw1_admission_rejected_total", "counter", "Requests rejected because the wait queue was full.",
+             lambda: self.admission.rejected),
+            ("hw1_admission_timeouts_total", "counter", "Requests rejected after waiting past the queue deadline.",
+             lambda: self.admission.timed_out),
+        ]
+        for collector in collectors:
+            self.metrics.add_collector(*collector)
+
     async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] == "lifespan":
+            await self.lifespan(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        route: Optional[Route] = None
+
+        async def send_and_record(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.metrics.in_flight += 1
         try:
             assert scope["type"] == "http"
-            method: str = scope["method"]
-            path: str = scope["path"]
+            try:
+                route, scope["path_params"] = self.router.match(scope["method"], scope["path"])
+            except RouteNotFound:
+                await self.not_found(send_and_record)
+                return
+            except MethodNotAllowed as e:
+                await self.method_not_allowed(send_and_record, e.allowed)
+                return
+            except InvalidPathParam as e:
+                route = e.route
+                await self.unprocessable_entity(send_and_record)
+                return
+
             query_string = scope.get("query_string", b"").decode("utf-8")
             params = parse_qs(query_string)
-
-            if method in self.routes:
-                if path.startswith("/fibonacci"):
-                    await self.fibonacci(scope, params, receive, send)
-                elif path in self.routes[method]:
-                    handler = self.routes[method][path]
-                    await handler(scope, params, receive, send)
-                else:
-                    await self.not_found(send)
-            else:
-                await self.not_found(send)
+            cost_estimate = self.admission_costs.get(route.pattern)
+            if cost_estimate is None:
+                await route.handler(scope, params, receive, send_and_record)
+                return
+            try:
+                cost = await self.admission.acquire(1 + cost_estimate(scope, params))
+            except Overloaded as e:
+                await self.service_unavailable(send_and_record, retry_after=e.retry_after)
+                return
+            jobs: List[asyncio.Future] = []
+            token = overrunning_jobs.set(jobs)
+            try:
+                await route.handler(scope, params, receive, send_and_record)
+            finally:
+                overrunning_jobs.reset(token)
+                self.release_when_done(cost, jobs)
 
         except Exception as e:
-            await self.internal_server_error(send, str(e))
+            await self.internal_server_error(send_and_record, str(e))
+        finally:
+            self.metrics.in_flight -= 1
+            pattern = route.pattern if route is not None else None
+            self.metrics.observe(scope.get("method", ""), pattern, status, time.perf_counter() - started)
 
-    async def factorial(self, scope: Dict[str, Any], params: Dict[str, Any], receive: Callable, send: Callable) -> None:
-        try:
-            n_str = params.get("n", [None])[0]
-            if n_str is None:
-                await self.unprocessable_entity(send)
+    async def lifespan(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    if self.warm_up_enabled:
+                        await asyncio.to_thread(self.warm_up)
+                    if self.table is not None:
+                        self.executor.start(initializer=attach_shared_table, initargs=(self.table.path,))
+                    else:
+                        self.executor.start()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown()
+                if self.table is not None:
+                    use_shared_table(None)
+                    self.table.close()
+                    self.table = None
+                await send({"type": "lifespan.shutdown.complete"})
                 return
 
-            try:
-                n = int(n_str)
-            except ValueError:
-                await self.unprocessable_entity(send)
-                return
+    def warm_up(self) -> None:
+        """
+        Map the shared checkpoint table (building it if this is the first worker) and prefill
+        the response cache with the cheapest results, so a cold worker answers like a warm one.
+        """
+        self.table = SharedTable.open_or_build(self.table_path, self.fibonacci_checkpoints, self.factorial_checkpoints)
+        use_shared_table(self.table)
+        for n in range(self.warm_responses):
+            self.cache_body(("factorial", n), encode_result(calculate_factorial(n), JSON), JSON)
+            self.cache_body(("fibonacci", n), encode_result(calculate_fibonacci(n), JSON), JSON)
 
-            if n < 0:
-                await self.bad_request(send)
+    async def factorial(self, scope: Dict[str, Any], params: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        try:
+            n = validate_n(params.get("n", [None])[0], modular="mod" in params)
+            m = validate_modulus(params.get("mod", [None])[0])
+
+            cache_key = ("factorial", n) if m is None else ("factorial", n, m)
+            if await self.send_cached(scope, send, cache_key):
                 return
-            factorial_result = calculate_factorial(n)
-            response_body = {"result": factorial_result}
-            await self.send_response(send, response_body)
+            response_format = negotiate_format(scope.get("headers", []))
+            encode = ENCODERS[response_format]
+            if m is None:
+                body = await self.executor.run(
+                    call_encoded, encode, calculate_factorial, n,
+                    cost=_result_cost(estimate_factorial_bits(n), response_format),
+                )
+            else:
+                body = await self.executor.run(
+                    call_encoded, encode, factorial_mod, n, m, cost=estimate_factorial_mod_cost(n, m),
+                )
+            await self.send_body(scope, send, body, response_format, cache_key)
+        except RequestError as e:
+            await self.error_response(send, e.message, status_code=e.status_code)
+        except ValueError:
+            await self.unprocessable_entity(send)
+        except asyncio.TimeoutError:
+            await self.service_unavailable(send)
         except Exception:
             await self.internal_server_error(send)
 
     async def fibonacci(self, scope: Dict[str, Any], params: Dict[str, Any], receive: Callable, send: Callable) -> None:
         try:
-            path = scope["path"]
-            n_str = path.split("/fibonacci/")[-1]
-
-            try:
-                n = int(n_str)
-            except ValueError:
-                await self.unprocessable_entity(send)
-                return
+            n = validate_n(scope["path_params"]["n"], modular="mod" in params)
+            m = validate_modulus(params.get("mod", [None])[0])
 
-            if n < 0:
-                await self.bad_request(send)
+            cache_key = ("fibonacci", n) if m is None else ("fibonacci", n, m)
+            if await self.send_cached(scope, send, cache_key):
                 return
-
-            fibonacci_result = calculate_fibonacci(n)
-            response_body = {"result": fibonacci_result}
-            await self.send_response(send, response_body)
+            response_format = negotiate_format(scope.get("headers", []))
+            encode = ENCODERS[response_format]
+            if m is None:
+                body = await self.executor.run(
+                    call_encoded, encode, calculate_fibonacci, n,
+                    cost=_result_cost(estimate_fibonacci_bits(n), response_format),
+                )
+            else:
+                body = await self.executor.run(
+                    call_encoded, encode, fibonacci_mod, n, m, cost=estimate_fibonacci_mod_cost(n, m),
+                )
+            await self.send_body(scope, send, body, response_format, cache_key)
+        except RequestError as e:
+            await self.error_response(send, e.message, status_code=e.status_code)
+        except asyncio.TimeoutError:
+            await self.service_unavailable(send)
         except Exception:
             await self.internal_server_error(send)
 
     async def mean(self, scope: Dict[str, Any], params: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        content_type = get_header(scope, b"content-type").split(b";", 1)[0].strip().lower()
+        if content_type in (b"application/octet-stream", b"application/x-npy"):
+            await self.mean_binary(scope, receive, send, npy=content_type == b"application/x-npy")
+            return
+
         try:
-            body = await self.get_request_body(receive)
+            # The body is parsed while it arrives, keeping only a running sum and a count
+            parser = NumberArrayParser()
+            total = CompensatedSum()
+            async for chunk in self.iter_request_body(receive):
+                total.add_many(parser.feed(chunk))
+            parser.close()
+
+            if parser.count == 0:
+                await self.bad_request(send)
+                return
 
-            if not isinstance(body, list):
+            result = total.value / parser.count
+            if not math.isfinite(result):
                 await self.unprocessable_entity(send)
                 return
+            await self.send_response(send, {"result": result})
+
+        except (ValueError, OverflowError):
+            # math.fsum raises OverflowError when the finite inputs sum beyond the float range
+            await self.unprocessable_entity(send)
+        except Exception as e:
+            await self.internal_server_error(send, str(e))
 
-            if len(body) == 0:
+    async def mean_binary(self, scope: Dict[str, Any], receive: Callable, send: Callable, npy: bool) -> None:
+        """Mean of a packed little-endian float64 body (raw or .npy), reduced buffer by buffer."""
+        try:
+            content_length = get_header(scope, b"content-length")
+            reader = Float64Reader(content_length=int(content_length) if content_length else None, npy=npy)
+            total = CompensatedSum()
+            async for chunk in self.iter_request_body(receive):
+                for buffer in reader.feed(chunk):
+                    total.add(calculate_float64_sum(buffer))
+            for buffer in reader.close():
+                total.add(calculate_float64_sum(buffer))
+
+            if reader.count == 0:
                 await self.bad_request(send)
                 return
 
-            if not all(isinstance(num, (float, int)) for num in body):
+            result = total.value / reader.count
+            if not math.isfinite(result):
                 await self.unprocessable_entity(send)
                 return
+            await self.send_response(send, {"result": result})
 
-            mean_result = calculate_mean(body)
-            response_body = {"result": mean_result}
-            await self.send_response(send, response_body)
+        except ValueError:
+            await self.unprocessable_entity(send)
+        except Exception as e:
+            await self.internal_server_error(send, str(e))
+
+    async def stats(self, scope: Dict[str, Any], params: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        """
+        Count, mean, variance, min, max, approximate quantiles and a fixed-bucket histogram in one pass.
+
+        Accepts the same bodies as mean (a JSON array, raw or .npy float64). Quantiles are chosen
+        with `q=0.5,0.99` and histogram boundaries with `bounds=0,10,100`; memory stays bounded
+        whatever the size of the body.
+        """
+        try:
+            stats = DescriptiveStats(
+                quantiles=validate_quantiles(params.get("q", [None])[0], DEFAULT_QUANTILES),
+                bounds=validate_float_list(params.get("bounds", [None])[0], DEFAULT_BOUNDS),
+            )
+            content_type = get_header(scope, b"content-type").split(b";", 1)[0].strip().lower()
+            if content_type in (b"application/octet-stream", b"application/x-npy"):
+                content_length = get_header(scope, b"content-length")
+                reader = Float64Reader(
+                    content_length=int(content_length) if content_length else None,
+                    npy=content_type == b"application/x-npy",
+                )
+                async for chunk in self.iter_request_body(receive):
+                    for buffer in reader.feed(chunk):
+                        stats.add_batch(float64_batch(buffer))
+                for buffer in reader.close():
+                    stats.add_batch(float64_batch(buffer))
+            else:
+                parser = NumberArrayParser()
+                async for chunk in self.iter_request_body(receive):
+                    values = parser.feed(chunk)
+                    if values:
+                        stats.add_batch(values)
+                parser.close()
+
+            if stats.count == 0:
+                await self.bad_request(send)
+                return
+            await self.send_response(send, stats.summary())
 
+        except RequestError as e:
+            await self.error_response(send, e.message, status_code=e.status_code)
         except ValueError:
             await self.unprocessable_entity(send)
         except Exception as e:
             await self.internal_server_error(send, str(e))
 
-    async def get_request_body(self, receive: Callable) -> Any:
-        """Helper function to extract and parse JSON body from request."""
-        body = b""
+    async def batch(self, scope: Dict[str, Any], params: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        """
+        Run a stream of NDJSON operations and stream back one NDJSON result per operation.
+
+        Every input line is an object like {"op": "fibonacci", "n": 10, "id": "a"}. Operations run
+        concurrently (at most BATCH_CONCURRENCY at a time) and results are written in completion
+        order, carrying the "id" of the operation (its line number in the body, counting blank lines
+        and starting at 1, when absent) and the status code
+        the single-operation endpoint would have answered with.
+        """
+        results: asyncio.Queue = asyncio.Queue()
+        slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+        async def run(index: int, line: bytes) -> None:
+            try:
+                results.put_nowait(await self.run_batch_item(index, line))
+            finally:
+                slots.release()
+
+        async def read() -> None:
+            tasks = set()
+            number = 0
+            try:
+                async for line in iter_lines(self.iter_request_body(receive), MAX_BATCH_LINE_BYTES):
+                    number += 1
+                    if not line.strip():
+                        continue
+                    await slots.acquire()
+                    tasks.add(asyncio.create_task(run(number, line)))
+            except ValueError:
+                # The line that is too long is the one after the last line read
+                error_line = batch_line(
+                    self.codec.dumps, number + 1, UnprocessableEntity.status_code, error=UnprocessableEntity.message,
+                )
+                results.put_nowait(error_line)
+            finally:
+                await asyncio.gather(*tasks, return_exceptions=True)
+                results.put_nowait(None)
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/x-ndjson")],
+        })
+        reader = asyncio.create_task(read())
+        try:
+            while (line := await results.get()) is not None:
+                await send({
+                    "type": "http.response.body",
+                    "body": line,
+                    "more_body": True,
+                })
+        finally:
+            reader.cancel()
+        await send({
+            "type": "http.response.body",
+            "body": b"",
+        })
+
+    async def run_batch_item(self, index: int, line: bytes) -> bytes:
+        """Validate and run one batch operation, returning its encoded NDJSON result line."""
+        correlation_id: Any = index
+        try:
+            try:
+                item = self.codec.loads(line)
+            except ValueError:
+                raise UnprocessableEntity() from None
+            if not isinstance(item, dict):
+                raise UnprocessableEntity()
+            correlation_id = item.get("id", index)
+
+            op = item.get("op")
+            if op == "factorial":
+                n = validate_n(item.get("n"))
+                result = await self.executor.run(
+                    call_encoded, encode_decimal, calculate_factorial, n,
+                    cost=_result_cost(estimate_factorial_bits(n), JSON),
+                )
+            elif op == "fibonacci":
+                n = validate_n(item.get("n"))
+                result = await self.executor.run(
+                    call_encoded, encode_decimal, calculate_fibonacci, n,
+                    cost=_result_cost(estimate_fibonacci_bits(n), JSON),
+                )
+            elif op == "mean":
+                values = validate_numbers(item.get("values"))
+                total = CompensatedSum()
+                try:
+                    total.add_many(values)
+                except OverflowError:
+                    raise UnprocessableEntity() from None
+                result = total.value / len(values)
+                if not math.isfinite(result):
+                    raise UnprocessableEntity()
+            else:
+                raise UnprocessableEntity()
+            return batch_line(self.codec.dumps, correlation_id, 200, result=result)
+        except RequestError as e:
+            return batch_line(self.codec.dumps, correlation_id, e.status_code, error=e.message)
+        except asyncio.TimeoutError:
+            return batch_line(self.codec.dumps, correlation_id, 503, error="Service Unavailable")
+        except Exception:
+            return batch_line(self.codec.dumps, correlation_id, 500, error="Internal Server Error")
+
+    async def metrics_endpoint(
+            self,
+            scope: Dict[str, Any],
+            params: Dict[str, Any],
+            receive: Callable,
+            send: Callable,
+    ) -> None:
+        body = self.metrics.render()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", METRICS_CONTENT_TYPE),
+                (b"content-length", str(len(body)).encode("utf-8")),
+            ],
+        })
+        await send({
+            "type": "http.response.body",
+            "body": body,
+        })
+
+    async def iter_request_body(self, receive: Callable) -> AsyncIterator[bytes]:
+        """Yield the request body chunk by chunk as it is received."""
         more_body = True
         while more_body:
             message = await receive()
-            body += message.get("body", b"")
+            chunk = message.get("body", b"")
+            if chunk:
+                yield chunk
             more_body = message.get("more_body", False)
 
+    async def get_request_body(self, receive: Callable) -> Any:
+        """Helper function to extract and parse JSON body from request."""
+        body = b"".join([chunk async for chunk in self.iter_request_body(receive)])
+
         if body:
-            return json.loads(body)
+            return self.codec.loads(body)
         return None
 
-    async def send_response(self, send: Callable, body: Dict[str, Any], status_code: int = 200) -> None:
-        body_bytes = json.dumps(body).encode("utf-8")
+    async def send_response(
+            self,
+            send: Callable,
+            body: Dict[str, Any],
+            status_code: int = 200,
+            headers: Optional[List[Tuple[bytes, bytes]]] = None,
+    ) -> None:
+        body_bytes = self.codec.dumps(body)
         await send({
             "type": "http.response.start",
             "status": status_code,
             "headers": [
                 (b"content-type", b"application/json"),
-                (b"content-length", str(len(body_bytes)).encode("utf-8"))
+                (b"content-length", str(len(body_bytes)).encode("utf-8")),
+                *(headers or []),
             ]
         })
         await send({
@@ -133,27 +561,210 @@ class ServerApp:
             "body": body_bytes,
         })
 
+    def release_when_done(self, cost: int, jobs: List[asyncio.Future]) -> None:
+        """Give back admitted units once the jobs of a request that overran its deadline have finished."""
+        if not jobs:
+            self.admission.release(cost)
+            return
+        asyncio.gather(*jobs, return_exceptions=True).add_done_callback(lambda _: self.admission.release(cost))
+
+    async def send_cached(self, scope: Dict[str, Any], send: Callable, cache_key: Hashable) -> bool:
+        """Answer from the response cache if possible; returns whether a response was sent."""
+        entry = self.cache.get((*cache_key, negotiate_format(scope.get("headers", []))))
+        if entry is None:
+            return False
+        await self.send_entry(scope, send, entry)
+        return True
+
+    async def send_entry(self, scope: Dict[str, Any], send: Callable, entry: CachedResponse) -> None:
+        """Send a pre-encoded response, or 304 Not Modified if the client already has it."""
+        if etag_matches(get_header(scope, b"if-none-match"), entry.etag):
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [(b"etag", entry.etag)],
+            })
+            await send({
+                "type": "http.response.body",
+                "body": b"",
+            })
+            return
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": entry.headers,
+        })
+        await send({
+            "type": "http.response.body",
+            "body": entry.body,
+        })
+
+    def cache_body(self, cache_key: Hashable, body: bytes, response_format: str) -> CachedResponse:
+        """Store an encoded result in the response cache."""
+        headers = [(b"content-type", response_format.encode("ascii"))]
+        return self.cache.put((*cache_key, response_format), headers, body)
+
+    async def send_body(
+            self,
+            scope: Dict[str, Any],
+            send: Callable,
+            body: bytes,
+            response_format: str,
+            cache_key: Optional[Hashable] = None,
+    ) -> None:
+        """
+        Send a result already encoded (off the event loop) in `response_format`.
+
+        Bodies that fit the response cache are stored under `cache_key` and sent with an ETag;
+        larger ones are sent in slices.
+        """
+        if cache_key is not None and self.cache.accepts(len(body)):
+            await self.send_entry(scope, send, self.cache_body(cache_key, body, response_format))
+        else:
+            await self.send_stream(send, iter_slices(body), response_format, content_length=len(body))
+
+    async def send_stream(
+            self,
+            send: Callable,
+            chunks: Iterable[bytes],
+            content_type: str,
+            content_length: Optional[int] = None,
+    ) -> None:
+        """Send the body as a sequence of `more_body` messages; chunked unless the length is known."""
+        headers = [(b"content-type", content_type.encode("ascii"))]
+        if content_length is not None:
+            headers.append((b"content-length", str(content_length).encode("utf-8")))
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": headers,
+        })
+        for chunk in chunks:
+            await send({
+                "type": "http.response.body",
+                "body": chunk,
+                "more_body": True,
+            })
+        await send({
+            "type": "http.response.body",
+            "body": b"",
+        })
+
     # 400 Bad Request Handler
     async def bad_request(self, send: Callable) -> None:
-        await self.error_response(send, "Bad Request", status_code=400)
+        await self.error_response(send, BadRequest.message, status_code=BadRequest.status_code)
 
     # 422 Unprocessable Entity Handler
     async def unprocessable_entity(self, send: Callable) -> None:
-        await self.error_response(send, "Unprocessable Entity", status_code=422)
+        await self.error_response(send, UnprocessableEntity.message, status_code=UnprocessableEntity.status_code)
 
     # 405 Method Not Allowed Handler
-    async def method_not_allowed(self, send: Callable) -> None:
-        await self.error_response(send, "Method Not Allowed", status_code=405)
+    async def method_not_allowed(self, send: Callable, allowed: List[str]) -> None:
+        allow_header = (b"allow", ", ".join(allowed).encode("ascii"))
+        await self.error_response(send, "Method Not Allowed", status_code=405, headers=[allow_header])
 
     # 404 Not Found Handler
     async def not_found(self, send: Callable) -> None:
         await self.error_response(send, "Not Found", status_code=404)
 
+    # 503 Service Unavailable Handler
+    async def service_unavailable(self, send: Callable, retry_after: Optional[int] = None) -> None:
+        headers = [(b"retry-after", str(retry_after).encode("utf-8"))] if retry_after is not None else None
+        await self.error_response(send, "Service Unavailable", status_code=503, headers=headers)
+
     # 500 Internal Server Error Handler
     async def internal_server_error(self, send: Callable, error_msg: str = "Internal Server Error") -> None:
         await self.error_response(send, error_msg, status_code=500)
 
     # Common method for generating error responses
-    async def error_response(self, send: Callable, message: str, status_code: int) -> None:
-        response_body = {"error": message}
-        await self.send_response(send, response_body, status_code=status_code)
+    async def error_response(
+            self,
+            send: Callable,
+            message: str,
+            status_code: int,
+            headers: Optional[List[Tuple[bytes, bytes]]] = None,
+    ) -> None:
+        static = self.static_errors.get((status_code, message))
+        if static is None:
+            response_body = {"error": message}
+            await self.send_response(send, response_body, status_code=status_code, headers=headers)
+            return
+
+        body, static_headers = static
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [*static_headers, *headers] if headers else static_headers,
+        })
+        await send({
+            "type": "http.response.body",
+            "body": body,
+        })
+
+
+def _result_cost(bits: int, response_format: str) -> int:
+    """Cost of a job computing a result of `bits` bits and encoding it in `response_format`."""
+    return bits + estimate_encoding_cost(bits, response_format)
+
+
+def _query_int(params: Dict[str, Any], name: str) -> int:
+    """An integer query parameter for cost estimation; invalid values cost nothing and are rejected by the handler."""
+    try:
+        return max(int(params.get(name, ["0"])[0]), 0)
+    except ValueError:
+        return 0
+
+
+def _content_length(scope: Dict[str, Any]) -> int:
+    """Declared request body size for cost estimation, 0 when absent or invalid."""
+    try:
+        return max(int(get_header(scope, b"content-length") or 0), 0)
+    except ValueError:
+        return 0
+
+
+def get_header(scope: Dict[str, Any], name: bytes) -> bytes:
+    """Value of the first request header with the given lowercase name, or b"" if absent."""
+    for key, value in scope.get("headers", []):
+        if key.lower() == name:
+            return value
+    return b""
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[bytes]:
+    """
+    Split a stream of chunks into lines without the trailing newline.
+
+    Raises:
+        ValueError: If a line, complete or still pending, is longer than `max_line_bytes`.
+    """
+    pending = b""
+    async for chunk in chunks:
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            if len(line) > max_line_bytes:
+                raise ValueError("Line is too long")
+            yield line
+        if len(pending) > max_line_bytes:
+            raise ValueError("Line is too long")
+    if pending:
+        yield pending
+
+
+def batch_line(
+        dumps: Callable[[Any], bytes],
+        correlation_id: Any,
+        status_code: int,
+        result: Any = None,
+        error: Optional[str] = None,
+) -> bytes:
+    """Encode one NDJSON result of the batch endpoint with the `dumps` of the app's JSON codec."""
+    head = dumps({"id": correlation_id, "status": status_code})[:-1]
+    if error is not None:
+        return head + b', "error": ' + dumps(error) + b"}\n"
+    if isinstance(result, bytes):
+        # Integers are encoded to decimal by the job that computed them (see call_encoded)
+        return head + b', "result": ' + result + b"}\n"
+    return head + b', "result": ' + dumps(result) + b"}\n"
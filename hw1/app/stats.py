@@ -0,0 +1,217 @@
+import math
+import sys
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy is optional
+    np = None
+
+DEFAULT_QUANTILES: Tuple[float, ...] = (0.5, 0.9, 0.99)
+DEFAULT_BOUNDS: Tuple[float, ...] = (-1000.0, -100.0, -10.0, -1.0, 0.0, 1.0, 10.0, 100.0, 1000.0)
+DEFAULT_COMPRESSION = 200
+
+Batch = Union[List[float], Any]  # a list of floats or a float64 NumPy array
+
+
+def float64_batch(buffer: memoryview) -> Batch:
+    """View packed little-endian float64 values as a NumPy array, or decode them into a list without NumPy."""
+    if np is not None:
+        return np.frombuffer(buffer, dtype="<f8")
+    values = array("d")
+    values.frombytes(buffer)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tolist()
+
+
+class RunningMoments:
+    """Count, mean, variance, min and max with Welford's update, merged batch by batch (Chan et al.)."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add_batch(self, values: Batch) -> None:
+        count = len(values)
+        if not count:
+            return
+        if np is not None and not isinstance(values, list):
+            mean = float(values.mean())
+            m2 = float(((values - mean) ** 2).sum())
+            low, high = float(values.min()), float(values.max())
+        else:
+            mean = math.fsum(values) / count
+            m2 = math.fsum((value - mean) ** 2 for value in values)
+            low, high = min(values), max(values)
+
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = min(self.min, low)
+        self.max = max(self.max, high)
+
+    @property
+    def variance(self) -> float:
+        """Sample variance; 0.0 for fewer than two values."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+
+class TDigest:
+    """
+    Merging t-digest for approximate quantiles in O(compression) memory.
+
+    Every batch is sorted together with the current centroids and neighbours are merged so that
+    no centroid spans more than one unit of the k1 scale function k(q) = d / (2 pi) * asin(2q - 1).
+    Centroids near the tails therefore stay small, which keeps extreme quantiles accurate.
+    """
+
+    def __init__(self, compression: int = DEFAULT_COMPRESSION) -> None:
+        self.compression = compression
+        self.means: List[float] = []
+        self.weights: List[float] = []
+        self.total = 0.0
+
+    def _scale(self, q: float) -> int:
+        return math.floor(self.compression / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1))
+
+    def add_batch(self, values: Batch) -> None:
+        if not len(values):
+            return
+        if np is not None and not isinstance(values, list):
+            self._merge_vectorized(values)
+            return
+
+        points = sorted(zip(self.means + list(values), self.weights + [1.0] * len(values), strict=True))
+        total = self.total + len(values)
+        means: List[float] = []
+        weights: List[float] = []
+        current_group = None
+        cumulative = 0.0
+        for mean, weight in points:
+            group = self._scale(cumulative / total)
+            cumulative += weight
+            if group == current_group:
+                merged = weights[-1] + weight
+                means[-1] += (mean - means[-1]) * weight / merged
+                weights[-1] = merged
+            else:
+                means.append(mean)
+                weights.append(weight)
+                current_group = group
+        self.means, self.weights, self.total = means, weights, total
+
+    def _merge_vectorized(self, values: Any) -> None:
+        means = np.concatenate([np.asarray(self.means, dtype="f8"), values])
+        weights = np.concatenate([np.asarray(self.weights, dtype="f8"), np.ones(len(values))])
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        total = self.total + len(values)
+
+        left = (np.cumsum(weights) - weights) / total
+        groups = np.floor(self.compression / (2 * np.pi) * np.arcsin(2 * np.clip(left, 0.0, 1.0) - 1))
+        starts = np.flatnonzero(np.concatenate([[True], groups[1:] != groups[:-1]]))
+        merged_weights = np.add.reduceat(weights, starts)
+        merged_means = np.add.reduceat(means * weights, starts) / merged_weights
+        self.means, self.weights, self.total = merged_means.tolist(), merged_weights.tolist(), total
+
+    def quantile(self, q: float, low: float, high: float) -> float:
+        """
+        Estimate the q-th quantile by interpolating between centroid centres.
+
+        Args:
+            q (float): The quantile, between 0 and 1.
+            low (float): The exact minimum, used at the left edge.
+            high (float): The exact maximum, used at the right edge.
+        """
+        if not self.means:
+            return math.nan
+        target = q * self.total
+        cumulative = 0.0
+        previous_center, previous_mean = 0.0, low
+        for mean, weight in zip(self.means, self.weights, strict=True):
+            center = cumulative + weight / 2
+            if target < center:
+                span = center - previous_center
+                fraction = (target - previous_center) / span if span else 0.0
+                return previous_mean + (mean - previous_mean) * fraction
+            previous_center, previous_mean = center, mean
+            cumulative += weight
+        span = self.total - previous_center
+        fraction = (target - previous_center) / span if span else 1.0
+        return previous_mean + (high - previous_mean) * fraction
+
+
+class FixedHistogram:
+    """Counts per bucket for fixed, sorted boundaries: (-inf, b0), [b0, b1), ..., [bn, +inf)."""
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BOUNDS) -> None:
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+
+    def add_batch(self, values: Batch) -> None:
+        if np is not None and not isinstance(values, list):
+            indices = np.searchsorted(np.asarray(self.bounds, dtype="f8"), values, side="right")
+            for i, count in enumerate(np.bincount(indices, minlength=len(self.counts)).tolist()):
+                self.counts[i] += count
+            return
+        bounds, counts = self.bounds, self.counts
+        for value in values:
+            counts[bisect_right(bounds, value)] += 1
+
+
+class DescriptiveStats:
+    """Single-pass descriptive statistics over batches of numbers with bounded memory."""
+
+    def __init__(
+            self,
+            quantiles: Sequence[float] = DEFAULT_QUANTILES,
+            bounds: Sequence[float] = DEFAULT_BOUNDS,
+            compression: int = DEFAULT_COMPRESSION,
+    ) -> None:
+        self.quantiles = list(quantiles)
+        self.moments = RunningMoments()
+        self.digest = TDigest(compression)
+        self.histogram = FixedHistogram(bounds)
+
+    @property
+    def count(self) -> int:
+        return self.moments.count
+
+    def add_batch(self, values: Batch) -> None:
+        """
+        Add a batch of numbers.
+
+        Raises:
+            ValueError: If the batch contains NaN or infinite values.
+        """
+        if np is not None:
+            # Parsed JSON batches are converted once so that every accumulator takes its vectorized path
+            values = np.asarray(values, dtype="f8")
+            if not np.isfinite(values).all():
+                raise ValueError("Values should be finite")
+        elif not all(map(math.isfinite, values)):
+            raise ValueError("Values should be finite")
+        self.moments.add_batch(values)
+        self.digest.add_batch(values)
+        self.histogram.add_batch(values)
+
+    def summary(self) -> Dict[str, Any]:
+        moments = self.moments
+        return {
+            "count": moments.count,
+            "mean": moments.mean,
+            "variance": moments.variance,
+            "std": math.sqrt(moments.variance),
+            "min": moments.min,
+            "max": moments.max,
+            "quantiles": {str(q): self.digest.quantile(q, moments.min, moments.max) for q in self.quantiles},
+            "histogram": {"bounds": self.histogram.bounds, "counts": self.histogram.counts},
+        }
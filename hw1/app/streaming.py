@@ -0,0 +1,250 @@
+import ast
+import math
+import re
+from typing import Iterator, List, Optional, Tuple
+
+_WS = rb"[ \t\n\r]*"
+_NUMBER = rb"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?"
+# One or more comma-separated JSON numbers, nothing else
+_NUMBER_LIST = re.compile(_WS + _NUMBER + _WS + rb"(?:," + _WS + _NUMBER + _WS + rb")*")
+_BLANK = re.compile(_WS)
+
+# Longest incomplete element kept between chunks, so memory stays bounded on hostile input
+MAX_PENDING_BYTES = 4096
+
+
+class NumberArrayParser:
+    """
+    Incremental parser for a JSON array of numbers, fed with arbitrary body chunks.
+
+    Only the unfinished tail of the last element is buffered. Anything that is not a number
+    (strings, booleans, null, nested containers) is rejected by the chunk that contains it.
+    """
+
+    def __init__(self) -> None:
+        self._pending = b""
+        self.started = False
+        self.done = False
+        self.count = 0
+
+    def feed(self, chunk: bytes) -> List[float]:
+        """
+        Consume the next chunk of the body.
+
+        Args:
+            chunk (bytes): The next piece of the request body.
+
+        Returns:
+            List[float]: Numbers completed by this chunk.
+
+        Raises:
+            ValueError: If the body is not a JSON array of numbers.
+        """
+        if self.done:
+            if not _BLANK.fullmatch(chunk):
+                raise ValueError("Unexpected data after the end of the array")
+            return []
+
+        data = self._pending + chunk if self._pending else chunk
+        if not self.started:
+            data = data.lstrip(b" \t\n\r")
+            if not data:
+                return []
+            if data[:1] != b"[":
+                raise ValueError("Expected a JSON array")
+            self.started = True
+            data = data[1:]
+
+        end = data.find(b"]")
+        if end >= 0:
+            values = self._parse(data[:end], last=True)
+            self.done = True
+            self._pending = b""
+            self.feed(data[end + 1:])
+            return values
+
+        split = data.rfind(b",")
+        if split < 0:
+            if len(data) > MAX_PENDING_BYTES:
+                raise ValueError("Array element is too long")
+            self._pending = data
+            return []
+
+        self._pending = data[split + 1:]
+        return self._parse(data[:split], last=False)
+
+    def close(self) -> None:
+        """
+        Signal the end of the body.
+
+        Raises:
+            ValueError: If the array was never opened or not closed.
+        """
+        if not self.done:
+            raise ValueError("Unterminated JSON array")
+
+    def _parse(self, segment: bytes, last: bool) -> List[float]:
+        if last and self.count == 0 and _BLANK.fullmatch(segment):
+            return []
+        if not _NUMBER_LIST.fullmatch(segment):
+            raise ValueError("Array elements should be numbers")
+        values = [float(value) for value in segment.split(b",")]
+        self.count += len(values)
+        return values
+
+
+class CompensatedSum:
+    """Running sum with Neumaier compensation for the rounding error of every addition."""
+
+    def __init__(self) -> None:
+        self.total = 0.0
+        self.compensation = 0.0
+
+    def add(self, value: float) -> None:
+        total = self.total + value
+        if abs(self.total) >= abs(value):
+            self.compensation += (self.total - total) + value
+        else:
+            self.compensation += (value - total) + self.total
+        self.total = total
+
+    def add_many(self, values: List[float]) -> None:
+        """Add a batch; the batch itself is summed exactly with math.fsum."""
+        if values:
+            self.add(math.fsum(values))
+
+    @property
+    def value(self) -> float:
+        return self.total + self.compensation
+
+
+FLOAT64_SIZE = 8
+BINARY_BUFFER_SIZE = 1024 * 1024
+NPY_MAGIC = b"\x93NUMPY"
+MAX_NPY_HEADER_BYTES = 64 * 1024
+
+
+def parse_npy_header(data: bytes) -> Optional[Tuple[int, int]]:
+    """
+    Parse the header of a one-dimensional little-endian float64 .npy array.
+
+    Args:
+        data (bytes): The beginning of the .npy file.
+
+    Returns:
+        Optional[Tuple[int, int]]: Offset of the array data and number of elements,
+        or None if more bytes are needed.
+
+    Raises:
+        ValueError: If the data is not a .npy file with a 1-D '<f8' array.
+    """
+    if len(data) < 10:
+        if not NPY_MAGIC.startswith(data[:len(NPY_MAGIC)]):
+            raise ValueError("Not a .npy file")
+        return None
+    if data[:len(NPY_MAGIC)] != NPY_MAGIC:
+        raise ValueError("Not a .npy file")
+
+    major = data[6]
+    if major == 1:
+        start = 10
+    elif major in (2, 3):
+        start = 12
+        if len(data) < start:
+            return None
+    else:
+        raise ValueError("Unsupported .npy version")
+    offset = start + int.from_bytes(data[8:start], "little")
+    if offset > MAX_NPY_HEADER_BYTES:
+        raise ValueError(".npy header is too long")
+    if len(data) < offset:
+        return None
+
+    try:
+        header = ast.literal_eval(data[start:offset].decode("latin-1"))
+    except (SyntaxError, ValueError) as e:
+        raise ValueError("Malformed .npy header") from e
+    if (
+            not isinstance(header, dict)
+            or header.get("descr") not in ("<f8", "<d")
+            or header.get("fortran_order", False)
+            or not isinstance(header.get("shape"), tuple)
+            or len(header["shape"]) != 1
+    ):
+        raise ValueError("Only one-dimensional '<f8' arrays are supported")
+    return offset, header["shape"][0]
+
+
+class Float64Reader:
+    """
+    Collects packed little-endian float64 values from body chunks into one preallocated buffer.
+
+    Chunks are copied into the buffer through a memoryview; every time it fills up, a view of it
+    is handed out for reduction and the buffer is reused, so memory does not grow with the body.
+    With `npy` the body is expected to be a .npy file and its header is checked first.
+    """
+
+    def __init__(
+            self,
+            content_length: Optional[int] = None,
+            npy: bool = False,
+            buffer_size: int = BINARY_BUFFER_SIZE,
+    ) -> None:
+        if content_length:
+            buffer_size = min(buffer_size, content_length)
+        buffer_size = max(buffer_size - buffer_size % FLOAT64_SIZE, FLOAT64_SIZE)
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self._filled = 0
+        self._header: Optional[bytes] = b"" if npy else None
+        self.expected: Optional[int] = None
+        self.count = 0
+
+    def feed(self, chunk: bytes) -> Iterator[memoryview]:
+        """
+        Copy the next chunk of the body into the buffer.
+
+        Returns:
+            Iterator[memoryview]: Full buffers; each one must be reduced before resuming the iterator.
+        """
+        if self._header is not None:
+            self._header += chunk
+            parsed = parse_npy_header(self._header)
+            if parsed is None:
+                return
+            offset, self.expected = parsed
+            chunk, self._header = self._header[offset:], None
+
+        source = memoryview(chunk)
+        size = len(self._buffer)
+        while source:
+            taken = min(size - self._filled, len(source))
+            self._view[self._filled:self._filled + taken] = source[:taken]
+            self._filled += taken
+            source = source[taken:]
+            if self._filled == size:
+                yield self._flush()
+
+    def close(self) -> Iterator[memoryview]:
+        """
+        Signal the end of the body.
+
+        Returns:
+            Iterator[memoryview]: The last, partially filled buffer.
+
+        Raises:
+            ValueError: If the body is not a whole number of float64 values or does not match the .npy shape.
+        """
+        if self._header is not None:
+            raise ValueError("Incomplete .npy header")
+        if self._filled % FLOAT64_SIZE:
+            raise ValueError("Body size should be a multiple of 8 bytes")
+        if self._filled:
+            yield self._flush()
+        if self.expected is not None and self.expected != self.count:
+            raise ValueError("Array size does not match the .npy shape")
+
+    def _flush(self) -> memoryview:
+        filled, self._filled = self._filled, 0
+        self.count += filled // FLOAT64_SIZE
+        return self._view[:filled]
@@ -0,0 +1,154 @@
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+from .utils import fibonacci_pair, multiply_range, use_shared_table
+
+MAGIC = b"HW1TAB\x00\x01"
+# Header: magic, number of entries; index entry: kind, n, offset, length
+_HEADER = struct.Struct("<8sQ")
+_ENTRY = struct.Struct("<BxxxxxxxQQQ")
+FIBONACCI, FIBONACCI_NEXT, FACTORIAL = 0, 1, 2
+
+DEFAULT_FIBONACCI_CHECKPOINTS = range(16_384, 2 ** 20 + 1, 16_384)
+DEFAULT_FACTORIAL_CHECKPOINTS = range(10_000, 200_001, 10_000)
+
+
+def default_path(fibonacci_ns: Iterable[int], factorial_ns: Iterable[int]) -> str:
+    """Table file in the temp directory, named after its contents so different configurations never clash."""
+    digest = hashlib.blake2b(
+        MAGIC + repr((list(fibonacci_ns), list(factorial_ns))).encode("ascii"), digest_size=8,
+    ).hexdigest()
+    return os.path.join(tempfile.gettempdir(), f"hw1_checkpoints_{digest}.bin")
+
+
+def build_table(path: str, fibonacci_ns: Iterable[int], factorial_ns: Iterable[int]) -> None:
+    """
+    Precompute (F(n), F(n + 1)) and n! for the given checkpoints and write them to `path`.
+
+    The file is written next to its destination and renamed into place, so readers never see
+    a partial table. Checkpoints are computed incrementally from the previous one.
+
+    Args:
+        path (str): Destination of the table.
+        fibonacci_ns (Iterable[int]): Fibonacci checkpoints.
+        factorial_ns (Iterable[int]): Factorial checkpoints.
+    """
+    payloads: List[Tuple[int, int, bytes]] = []
+    for n in sorted(set(fibonacci_ns)):
+        fn, fn1 = fibonacci_pair(n)
+        payloads.append((FIBONACCI, n, fn.to_bytes((fn.bit_length() + 7) // 8, "little")))
+        payloads.append((FIBONACCI_NEXT, n, fn1.to_bytes((fn1.bit_length() + 7) // 8, "little")))
+
+    previous, factorial = 0, 1
+    for n in sorted(set(factorial_ns)):
+        factorial *= multiply_range(previous + 1, n + 1)
+        previous = n
+        payloads.append((FACTORIAL, n, factorial.to_bytes((factorial.bit_length() + 7) // 8, "little")))
+
+    offset = _HEADER.size + _ENTRY.size * len(payloads)
+    index = []
+    for kind, n, payload in payloads:
+        index.append(_ENTRY.pack(kind, n, offset, len(payload)))
+        offset += len(payload)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".hw1_checkpoints_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, len(payloads)))
+            f.writelines(index)
+            f.writelines(payload for _, _, payload in payloads)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class SharedTable:
+    """
+    Read-only memory-mapped checkpoint table shared by every worker process.
+
+    The pages of the file live in the OS page cache once, however many processes map it,
+    and values are decoded straight from the mapping on lookup.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a checkpoint table")
+        self._entries: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        for i in range(count):
+            kind, n, offset, length = _ENTRY.unpack_from(self._mmap, _HEADER.size + i * _ENTRY.size)
+            self._entries[kind, n] = (offset, length)
+        self.fibonacci_ns = sorted(n for kind, n in self._entries if kind == FIBONACCI)
+        self.factorial_ns = sorted(n for kind, n in self._entries if kind == FACTORIAL)
+
+    @classmethod
+    def open_or_build(
+            cls,
+            path: Optional[str] = None,
+            fibonacci_ns: Iterable[int] = DEFAULT_FIBONACCI_CHECKPOINTS,
+            factorial_ns: Iterable[int] = DEFAULT_FACTORIAL_CHECKPOINTS,
+    ) -> "SharedTable":
+        """
+        Map the table at `path`, building it first if no worker has done so yet.
+
+        Workers starting at the same time serialize on a lock file, so the table is built once.
+        """
+        fibonacci_ns, factorial_ns = list(fibonacci_ns), list(factorial_ns)
+        path = path or default_path(fibonacci_ns, factorial_ns)
+        with open(path + ".lock", "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if not os.path.exists(path):
+                    build_table(path, fibonacci_ns, factorial_ns)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+        return cls(path)
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def _value(self, kind: int, n: int) -> int:
+        offset, length = self._entries[kind, n]
+        with memoryview(self._mmap) as view:
+            return int.from_bytes(view[offset:offset + length], "little")
+
+    def fibonacci_floor(self, n: int, minimum: int = 0) -> Optional[Tuple[int, Tuple[int, int]]]:
+        """The largest checkpoint minimum <= k <= n with (F(k), F(k + 1)), or None."""
+        i = bisect_right(self.fibonacci_ns, n)
+        if not i or self.fibonacci_ns[i - 1] < minimum:
+            return None
+        k = self.fibonacci_ns[i - 1]
+        return k, (self._value(FIBONACCI, k), self._value(FIBONACCI_NEXT, k))
+
+    def factorial_floor(self, n: int) -> Optional[Tuple[int, int]]:
+        """The largest checkpoint k <= n with k!, or None."""
+        i = bisect_right(self.factorial_ns, n)
+        if not i:
+            return None
+        k = self.factorial_ns[i - 1]
+        return k, self._value(FACTORIAL, k)
+
+
+def attach_shared_table(path: str) -> None:
+    """Map an existing table and let the engines in utils use it; also a process pool initializer."""
+    use_shared_table(SharedTable(path))
@@ -1,10 +1,48 @@
 import math
-from typing import List
+import sys
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy is optional
+    np = None
+
+
+# Read-only checkpoint table shared between worker processes (see tables.SharedTable), if attached
+_shared_table: Optional[Any] = None
+
+
+def use_shared_table(table: Optional[Any]) -> None:
+    """Let the Fibonacci and factorial engines start from the checkpoints of a shared table."""
+    global _shared_table
+    _shared_table = table
+
+
+def multiply_range(start: int, stop: int) -> int:
+    """
+    Calculate the product of range(start, stop) by binary splitting, keeping the operands balanced.
+
+    Args:
+        start (int): The first factor.
+        stop (int): The end of the range (excluded).
+
+    Returns:
+        int: The product; 1 for an empty range.
+    """
+    if stop - start <= 16:
+        return math.prod(range(start, stop))
+    middle = (start + stop) // 2
+    return multiply_range(start, middle) * multiply_range(middle, stop)
 
 
 def calculate_factorial(n: int) -> int:
     """
-    Calculate the factorial of a number using the built-in math.factorial.
+    Calculate the factorial of a number using the built-in math.factorial, or from the closest
+    shared checkpoint k! when n is only a little larger than k.
 
     Args:
         n (int): The number for which the factorial is calculated.
@@ -12,12 +50,122 @@ def calculate_factorial(n: int) -> int:
     Returns:
         int: The factorial of the number.
     """
+    if _shared_table is not None and n >= 0:
+        floor = _shared_table.factorial_floor(n)
+        if floor is not None and n - floor[0] <= floor[0] // FACTORIAL_CHECKPOINT_REACH:
+            k, factorial_k = floor
+            return factorial_k * multiply_range(k + 1, n + 1) if n > k else factorial_k
     return math.factorial(n)
 
 
+# Bounded memo table of Fibonacci checkpoints: n -> (F(n), F(n + 1)).
+# Keys are additionally kept sorted so the nearest checkpoint below n can be found with bisect.
+# The table is bounded by the total size of the pairs (it lives in the server and in every pool
+# worker); pairs above FIB_CHECKPOINT_MAX_PAIR_BITS (n of about 24 million) are never kept.
+FIB_CHECKPOINT_LIMIT = 64
+FIB_CHECKPOINT_MAX_BITS = 32 * 1024 * 1024 * 8
+FIB_CHECKPOINT_MAX_PAIR_BITS = 4 * 1024 * 1024 * 8
+FIB_CHECKPOINT_MIN_N = 1024
+# A factorial checkpoint k is used for n <= k + k / FACTORIAL_CHECKPOINT_REACH
+FACTORIAL_CHECKPOINT_REACH = 4
+_fib_checkpoints: "OrderedDict[int, Tuple[int, int]]" = OrderedDict()
+_fib_checkpoint_keys: List[int] = []
+_fib_checkpoint_bits = 0
+
+
+def _fib_doubling(n: int) -> Tuple[int, int]:
+    """
+    Calculate the pair (F(n), F(n + 1)) using the fast doubling identities.
+
+    Args:
+        n (int): The position in the Fibonacci sequence.
+
+    Returns:
+        Tuple[int, int]: F(n) and F(n + 1).
+    """
+    a, b = 0, 1
+    for bit in bin(n)[2:]:
+        # F(2k) = F(k) * (2F(k + 1) - F(k)), F(2k + 1) = F(k)^2 + F(k + 1)^2
+        c = a * ((b << 1) - a)
+        d = a * a + b * b
+        if bit == "1":
+            a, b = d, c + d
+        else:
+            a, b = c, d
+    return a, b
+
+
+def _pair_bits(pair: Tuple[int, int]) -> int:
+    return pair[0].bit_length() + pair[1].bit_length()
+
+
+def _fib_remember(n: int, pair: Tuple[int, int]) -> None:
+    global _fib_checkpoint_bits
+    bits = _pair_bits(pair)
+    if n < FIB_CHECKPOINT_MIN_N or n in _fib_checkpoints or bits > FIB_CHECKPOINT_MAX_PAIR_BITS:
+        return
+    _fib_checkpoints[n] = pair
+    _fib_checkpoint_bits += bits
+    insort(_fib_checkpoint_keys, n)
+    while len(_fib_checkpoints) > FIB_CHECKPOINT_LIMIT or _fib_checkpoint_bits > FIB_CHECKPOINT_MAX_BITS:
+        evicted, evicted_pair = _fib_checkpoints.popitem(last=False)
+        _fib_checkpoint_bits -= _pair_bits(evicted_pair)
+        del _fib_checkpoint_keys[bisect_left(_fib_checkpoint_keys, evicted)]
+
+
+def fibonacci_pair(n: int) -> Tuple[int, int]:
+    """
+    Calculate the pair (F(n), F(n + 1)), reusing the closest checkpoint from the memo table.
+
+    When a checkpoint k <= n is known, only the gap d = n - k is computed from scratch and
+    the result is assembled with F(k + d) = F(k)F(d + 1) + F(k - 1)F(d).
+
+    Args:
+        n (int): The position in the Fibonacci sequence.
+
+    Returns:
+        Tuple[int, int]: F(n) and F(n + 1).
+    """
+    pair = _fib_checkpoints.get(n)
+    if pair is not None:
+        _fib_checkpoints.move_to_end(n)
+        return pair
+
+    idx = bisect_right(_fib_checkpoint_keys, n)
+    k = _fib_checkpoint_keys[idx - 1] if idx else 0
+    checkpoint = _fib_checkpoints[k] if k else None
+    if _shared_table is not None:
+        shared = _shared_table.fibonacci_floor(n, minimum=k)
+        if shared is not None:
+            k, checkpoint = shared
+            if k == n:
+                return checkpoint
+
+    d = n - k
+    if checkpoint is not None and d < k:
+        if k in _fib_checkpoints:
+            _fib_checkpoints.move_to_end(k)
+        fk, fk1 = checkpoint
+        fd, fd1 = _fib_doubling(d)
+        pair = (fk * fd1 + (fk1 - fk) * fd, fk1 * fd1 + fk * fd)
+    else:
+        pair = _fib_doubling(n)
+
+    _fib_remember(n, pair)
+    return pair
+
+
+def clear_fibonacci_checkpoints() -> None:
+    """Drop every memoized Fibonacci checkpoint."""
+    global _fib_checkpoint_bits
+    _fib_checkpoints.clear()
+    _fib_checkpoint_keys.clear()
+    _fib_checkpoint_bits = 0
+
+
 def calculate_fibonacci(n: int) -> int:
     """
-    Calculate the n-th Fibonacci number using Binet's formula.
+    Calculate the n-th Fibonacci number exactly using fast doubling in O(log n) multiplications.
 
     Args:
         n (int): The position in the Fibonacci sequence to calculate.
@@ -28,9 +176,135 @@ def calculate_fibonacci(n: int) -> int:
     if n < 0:
         raise ValueError("n should be a positive integer")
 
-    phi = (1 + math.sqrt(5)) / 2
-    psi = (1 - math.sqrt(5)) / 2
-    return round((phi ** n - psi ** n) / math.sqrt(5))
+    return fibonacci_pair(n)[0]
+
+
+# Moduli up to this size have their Pisano period computed (once, cached) to shrink n
+PISANO_MAX_MODULUS = 4096
+# Longest run of modular multiplications a modular factorial may take
+MAX_MODULAR_FACTORIAL_STEPS = 1_000_000
+_MILLER_RABIN_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+# Smallest strong pseudoprime to all of the bases above, so the test is exact below it
+_MILLER_RABIN_EXACT_BELOW = 3_317_044_064_679_887_385_961_981
+
+
+@lru_cache(maxsize=None)
+def pisano_period(m: int) -> int:
+    """
+    Calculate the period of the Fibonacci sequence modulo m (at most 6m).
+
+    Args:
+        m (int): The modulus, a positive integer.
+
+    Returns:
+        int: The Pisano period; 1 for m = 1.
+    """
+    if m == 1:
+        return 1
+    a, b = 0, 1
+    for period in range(1, 6 * m + 1):
+        a, b = b, (a + b) % m
+        if a == 0 and b == 1:
+            return period
+    raise AssertionError("The Pisano period is at most 6m")
+
+
+def fibonacci_mod(n: int, m: int) -> int:
+    """
+    Calculate F(n) mod m with fast doubling on residues, in O(log n) small multiplications.
+
+    For small moduli n is first reduced modulo the Pisano period.
+
+    Args:
+        n (int): The position in the Fibonacci sequence.
+        m (int): The modulus, a positive integer.
+
+    Returns:
+        int: F(n) mod m.
+    """
+    if n < 0 or m < 1:
+        raise ValueError("n should be non-negative and m positive")
+    if m <= PISANO_MAX_MODULUS:
+        n %= pisano_period(m)
+
+    a, b = 0, 1
+    for bit in bin(n)[2:]:
+        c = a * ((b << 1) - a) % m
+        d = (a * a + b * b) % m
+        if bit == "1":
+            a, b = d, (c + d) % m
+        else:
+            a, b = c, d
+    return a % m
+
+
+def is_probable_prime(m: int) -> bool:
+    """Miller-Rabin test with fixed bases: exact for m < _MILLER_RABIN_EXACT_BELOW, probable above."""
+    if m < 2:
+        return False
+    for p in _MILLER_RABIN_BASES:
+        if m % p == 0:
+            return m == p
+    d, s = m - 1, 0
+    while d % 2 == 0:
+        d, s = d // 2, s + 1
+    for a in _MILLER_RABIN_BASES:
+        x = pow(a, d, m)
+        if x in (1, m - 1):
+            continue
+        for _ in range(s - 1):
+            x = x * x % m
+            if x == m - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def _product_mod(start: int, stop: int, m: int) -> int:
+    """The product of range(start, stop) modulo m, stopping early once it is 0."""
+    result = 1 % m
+    for k in range(start, stop):
+        result = result * k % m
+        if not result:
+            break
+    return result
+
+
+def factorial_mod(n: int, m: int) -> int:
+    """
+    Calculate n! mod m without computing n!.
+
+    n! is a multiple of m as soon as n >= m, and for a prime m close to n Wilson's theorem
+    (m - 1)! = -1 (mod m) leaves only the short product n + 1 .. m - 1 to invert; it is only
+    taken while the primality test is exact, so a pseudoprime cannot give a wrong result. Otherwise
+    the residues are multiplied directly, which ends early once a composite m divides the product.
+
+    Args:
+        n (int): The number whose factorial is taken.
+        m (int): The modulus, a positive integer.
+
+    Returns:
+        int: n! mod m.
+
+    Raises:
+        ValueError: If no shortcut applies and more than MAX_MODULAR_FACTORIAL_STEPS
+            multiplications would be needed.
+    """
+    if n < 0 or m < 1:
+        raise ValueError("n should be non-negative and m positive")
+    if n >= m:
+        return 0
+    wilson = m - 1 - n <= MAX_MODULAR_FACTORIAL_STEPS and m - 1 - n < n
+    if wilson and m < _MILLER_RABIN_EXACT_BELOW and is_probable_prime(m):
+        return -pow(_product_mod(n + 1, m, m), -1, m) % m
+    if n <= MAX_MODULAR_FACTORIAL_STEPS:
+        return _product_mod(2, n + 1, m)
+
+    result = _product_mod(2, MAX_MODULAR_FACTORIAL_STEPS + 1, m)
+    if result:
+        raise ValueError("n! mod m is too expensive to compute")
+    return 0
 
 
 def calculate_mean(numbers: List[float]) -> float:
@@ -46,3 +320,79 @@ def calculate_mean(numbers: List[float]) -> float:
     if not numbers:
         raise ValueError("The list of numbers is empty")
     return sum(numbers) / len(numbers)
+
+
+def calculate_float64_sum(buffer: memoryview) -> float:
+    """
+    Sum packed little-endian float64 values without creating a Python object per element.
+
+    NumPy (pairwise summation) is used when installed, array('d') with math.fsum otherwise.
+
+    Args:
+        buffer (memoryview): Raw bytes, a multiple of 8 long.
+
+    Returns:
+        float: The sum of the values.
+    """
+    if np is not None:
+        return float(np.frombuffer(buffer, dtype="<f8").sum())
+
+    values = array("d")
+    values.frombytes(buffer)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return math.fsum(values)
+
+
+def estimate_factorial_bits(n: int) -> int:
+    """
+    Estimate the size of n! in bits, used as the cost of computing it.
+
+    Args:
+        n (int): The number for which the factorial is calculated.
+
+    Returns:
+        int: An upper bound of the bit length of n!.
+    """
+    return n * max(n.bit_length(), 1)
+
+
+def estimate_factorial_mod_cost(n: int, m: int) -> int:
+    """
+    Estimate the cost of n! mod m: one multiplication of m-sized residues per step.
+
+    Args:
+        n (int): The number for which the factorial is calculated.
+        m (int): The modulus.
+
+    Returns:
+        int: The number of steps times the bit length of m.
+    """
+    return min(n, m, MAX_MODULAR_FACTORIAL_STEPS) * max(m.bit_length(), 1)
+
+
+def estimate_fibonacci_mod_cost(n: int, m: int) -> int:
+    """
+    Estimate the cost of F(n) mod m: one doubling step of m-sized residues per bit of n.
+
+    Args:
+        n (int): The position in the Fibonacci sequence.
+        m (int): The modulus.
+
+    Returns:
+        int: The bit length of n times the bit length of m.
+    """
+    return max(n.bit_length(), 1) * max(m.bit_length(), 1)
+
+
+def estimate_fibonacci_bits(n: int) -> int:
+    """
+    Estimate the size of F(n) in bits (log2 of the golden ratio is ~0.6943), used as its cost.
+
+    Args:
+        n (int): The position in the Fibonacci sequence.
+
+    Returns:
+        int: An approximation of the bit length of F(n).
+    """
+    return (n * 6943) // 10_000 + 1
@@ -0,0 +1,148 @@
+import math
+import os
+from typing import Any, List, Optional, Sequence
+
+# Largest `n` accepted by factorial and fibonacci without a modulus: 100000! is computed and encoded
+# in about two seconds, well within the deadline (jobs that overrun it keep their worker busy)
+MAX_N = int(os.environ.get("HW1_MAX_N", 100_000))
+# Largest bit length of `n` and `m` when the result is taken modulo `m`
+MAX_MODULAR_BITS = int(os.environ.get("HW1_MAX_MODULAR_BITS", 4096))
+
+
+class RequestError(Exception):
+    """A request that cannot be served; carries the status code and message of the error response."""
+
+    status_code = 500
+    message = "Internal Server Error"
+
+
+class BadRequest(RequestError):
+    status_code = 400
+    message = "Bad Request"
+
+
+class UnprocessableEntity(RequestError):
+    status_code = 422
+    message = "Unprocessable Entity"
+
+
+def _validate_int(value: Any) -> int:
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise UnprocessableEntity()
+    try:
+        n = int(value)
+    except ValueError:
+        raise UnprocessableEntity() from None
+    if n < 0:
+        raise BadRequest()
+    return n
+
+
+def validate_n(value: Any, modular: bool = False) -> int:
+    """
+    Validate the `n` argument of factorial and fibonacci.
+
+    Args:
+        value (Any): A query string value, a path parameter or a JSON value.
+        modular (bool): The result is taken modulo `m`, so `n` is limited by MAX_MODULAR_BITS
+            instead of MAX_N.
+
+    Returns:
+        int: The non-negative integer.
+
+    Raises:
+        UnprocessableEntity: If the value is missing, not an integer or too large.
+        BadRequest: If the integer is negative.
+    """
+    n = _validate_int(value)
+    if n.bit_length() > MAX_MODULAR_BITS if modular else n > MAX_N:
+        raise UnprocessableEntity()
+    return n
+
+
+def validate_numbers(values: Any) -> List[float]:
+    """
+    Validate the input of mean.
+
+    Args:
+        values (Any): A decoded JSON value.
+
+    Returns:
+        List[float]: The numbers.
+
+    Raises:
+        UnprocessableEntity: If the value is not a list of numbers.
+        BadRequest: If the list is empty.
+    """
+    if not isinstance(values, list):
+        raise UnprocessableEntity()
+    if not values:
+        raise BadRequest()
+    if not all(isinstance(num, (float, int)) and not isinstance(num, bool) for num in values):
+        raise UnprocessableEntity()
+    try:
+        return [float(num) for num in values]
+    except OverflowError:
+        raise UnprocessableEntity() from None
+
+
+def validate_float_list(value: Any, default: Sequence[float]) -> List[float]:
+    """
+    Validate a comma-separated list of finite numbers given as a query string value.
+
+    Args:
+        value (Any): The query string value, or None when the parameter is missing.
+        default (Sequence[float]): The list used when the parameter is missing.
+
+    Returns:
+        List[float]: The numbers, sorted and without duplicates.
+
+    Raises:
+        UnprocessableEntity: If an item is not a finite number.
+    """
+    if value is None:
+        return sorted(set(default))
+    try:
+        numbers = [float(item) for item in value.split(",")]
+    except ValueError:
+        raise UnprocessableEntity() from None
+    if not all(math.isfinite(num) for num in numbers):
+        raise UnprocessableEntity()
+    return sorted(set(numbers))
+
+
+def validate_quantiles(value: Any, default: Sequence[float]) -> List[float]:
+    """
+    Validate the `q` argument of stats: a comma-separated list of quantiles between 0 and 1.
+
+    Raises:
+        UnprocessableEntity: If an item is not a number between 0 and 1.
+    """
+    quantiles = validate_float_list(value, default)
+    if not all(0.0 <= q <= 1.0 for q in quantiles):
+        raise UnprocessableEntity()
+    return quantiles
+
+
+def validate_modulus(value: Any) -> Optional[int]:
+    """
+    Validate the optional `mod` argument of factorial and fibonacci.
+
+    Args:
+        value (Any): The query string value, or None when the parameter is missing.
+
+    Returns:
+        Optional[int]: The positive modulus, or None.
+
+    Raises:
+        UnprocessableEntity: If the value is not an integer or is longer than MAX_MODULAR_BITS.
+        BadRequest: If the integer is not positive.
+    """
+    if value is None:
+        return None
+    m = _validate_int(value)
+    if m == 0:
+        raise BadRequest()
+    if m.bit_length() > MAX_MODULAR_BITS:
+        raise UnprocessableEntity()
+    return m
@@ -0,0 +1,81 @@
+"""
+Per-request cost of small responses with every installed JSON codec, and of constant error
+responses sent pre-encoded versus encoded on every request.
+
+Usage:
+    python -m hw1.benchmarks.bench_codec [--duration 0.5]
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, List
+
+from hw1.app.cache import ResponseCache
+from hw1.app.codec import CODECS, JsonCodec
+from hw1.app.executor import INLINE, ComputeExecutor
+from hw1.app.server import ServerApp
+from hw1.benchmarks.harness import Case, run_case
+
+CASES = [
+    Case("not_found", "GET", "/not_found"),
+    Case("unprocessable", "GET", "/factorial", query=b"n=lol"),
+    Case("factorial[n=10]", "GET", "/factorial", query=b"n=10"),
+    Case("mean_json[size=10]", "POST", "/mean", body=json.dumps(list(range(10))).encode()),
+    Case("batch[ops=10]", "POST", "/batch", body=b"\n".join(
+        json.dumps({"op": "fibonacci", "n": i}).encode() for i in range(10)
+    )),
+]
+
+
+def installed_codecs() -> List[JsonCodec]:
+    codecs = []
+    for factory in CODECS.values():
+        try:
+            codecs.append(factory())
+        except ImportError:
+            continue
+    return codecs
+
+
+async def time_error_responses(app: ServerApp, requests: int) -> Dict[str, float]:
+    """Mean cost in microseconds of one 404 response sent pre-encoded and encoded per request."""
+    async def send(message: Dict[str, Any]) -> None:
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app.error_response(send, "Not Found", status_code=404)
+    static = (time.perf_counter() - start) / requests * 1e6
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app.send_response(send, {"error": "Not Found"}, status_code=404)
+    dynamic = (time.perf_counter() - start) / requests * 1e6
+    return {"static": static, "dynamic": dynamic}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=0.5, help="seconds per case")
+    parser.add_argument("--requests", type=int, default=200_000, help="error responses per variant")
+    args = parser.parse_args()
+
+    codecs = installed_codecs()
+    print(f"{'case':<22}" + "".join(f" {codec.name + ', req/s':>14}" for codec in codecs))
+    apps = [
+        ServerApp(executor=ComputeExecutor(mode=INLINE), cache=ResponseCache(max_bytes=0), codec=codec)
+        for codec in codecs
+    ]
+    for case in CASES:
+        results = [asyncio.run(run_case(app, case, args.duration, min_requests=20)) for app in apps]
+        print(f"{case.name:<22}" + "".join(f" {result['rps']:>14.0f}" for result in results))
+
+    print(f"\n{'codec':<10} {'404 pre-encoded, us':>20} {'404 encoded, us':>16}")
+    for app in apps:
+        costs = asyncio.run(time_error_responses(app, args.requests))
+        print(f"{app.codec.name:<10} {costs['static']:>20.3f} {costs['dynamic']:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
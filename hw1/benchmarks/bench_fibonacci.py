@@ -0,0 +1,45 @@
+"""
+Latency benchmark for the Fibonacci engine.
+
+Usage:
+    python -m hw1.benchmarks.bench_fibonacci [--repeat 5]
+"""
+import argparse
+import time
+from typing import List
+
+from hw1.app.utils import calculate_fibonacci, clear_fibonacci_checkpoints
+
+SIZES: List[int] = [10, 100, 1_000, 10_000, 100_000, 1_000_000]
+
+
+def measure(n: int, repeat: int, warm: bool) -> float:
+    """Return the best wall time in seconds of computing F(n) over `repeat` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        if not warm:
+            clear_fibonacci_checkpoints()
+        start = time.perf_counter()
+        calculate_fibonacci(n)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'n':>10} {'cold, ms':>12} {'warm, ms':>12} {'neighbour, ms':>15}")
+    for n in SIZES:
+        cold = measure(n, args.repeat, warm=False)
+        warm = measure(n, args.repeat, warm=True)
+        # A nearby n reuses the checkpoint left behind by F(n)
+        start = time.perf_counter()
+        calculate_fibonacci(n + 17)
+        neighbour = time.perf_counter() - start
+        print(f"{n:>10} {cold * 1e3:>12.3f} {warm * 1e3:>12.3f} {neighbour * 1e3:>15.3f}")
+
+
+if __name__ == "__main__":
+    main()
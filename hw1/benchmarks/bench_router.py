@@ -0,0 +1,79 @@
+"""
+Dispatch cost of the Router with hundreds of registered routes, compared to a linear scan
+over compiled regular expressions.
+
+Usage:
+    python -m hw1.benchmarks.bench_router [--routes 500] [--lookups 200000]
+"""
+import argparse
+import re
+import time
+from typing import Callable, List, Pattern, Tuple
+
+from hw1.app.router import RouteNotFound, Router
+
+
+def handler() -> None:
+    pass
+
+
+def build(count: int) -> Tuple[Router, List[Tuple[str, Pattern]]]:
+    router = Router()
+    regexes: List[Tuple[str, Pattern]] = []
+    for i in range(count):
+        static = f"/static/{i}/resource"
+        param = f"/api/v{i}/users/{{user_id:int}}/orders/{{order}}"
+        router.add("GET", static, handler)
+        router.add("GET", param, handler)
+        regexes.append(("GET", re.compile(re.escape(static) + "$")))
+        regexes.append(("GET", re.compile(rf"/api/v{i}/users/(?P<user_id>[^/]+)/orders/(?P<order>[^/]+)$")))
+    router.add("GET", "/fibonacci/{n:int}", handler)
+    regexes.append(("GET", re.compile(r"/fibonacci/(?P<n>[^/]+)$")))
+    return router, regexes
+
+
+def time_lookups(lookup: Callable[[str], object], paths: List[str], lookups: int) -> float:
+    """Return the mean cost of one lookup in microseconds."""
+    start = time.perf_counter()
+    for i in range(lookups):
+        lookup(paths[i % len(paths)])
+    return (time.perf_counter() - start) / lookups * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", type=int, default=500)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    args = parser.parse_args()
+
+    router, regexes = build(args.routes)
+
+    def radix(path: str) -> object:
+        try:
+            return router.match("GET", path)
+        except RouteNotFound:
+            return None
+
+    def linear(path: str) -> object:
+        for method, regex in regexes:
+            found = regex.match(path)
+            if found and method == "GET":
+                return handler, found.groupdict()
+        return None
+
+    workloads = {
+        "static": [f"/static/{i}/resource" for i in range(0, args.routes, 7)],
+        "param": [f"/api/v{i}/users/{i}/orders/x{i}" for i in range(0, args.routes, 7)],
+        "fibonacci": ["/fibonacci/10", "/fibonacci/1000"],
+        "miss": ["/nothing/here", "/api/v1/users"],
+    }
+    print(f"{2 * args.routes + 1} routes, {args.lookups} lookups per workload")
+    print(f"{'workload':>10} {'radix, us':>10} {'linear, us':>11}")
+    for name, paths in workloads.items():
+        radix_cost = time_lookups(radix, paths, args.lookups)
+        linear_cost = time_lookups(linear, paths, max(args.lookups // 100, 1))
+        print(f"{name:>10} {radix_cost:>10.3f} {linear_cost:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
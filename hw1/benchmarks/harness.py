@@ -0,0 +1,214 @@
+"""
+In-process throughput benchmark for ServerApp.
+
+Requests are fed straight into ServerApp.__call__ with synthetic scope/receive/send callables,
+so no sockets or HTTP parsing are involved. For every route and payload size it reports
+requests per second, p50/p99 latency and memory allocated per request, can save the results
+as JSON and fails (exit code 1) when a run regresses against a stored baseline.
+
+Usage:
+    python -m hw1.benchmarks.harness [--duration 0.5] [--save results.json]
+                                     [--baseline baseline.json] [--threshold 0.2] [--only mean]
+"""
+import argparse
+import asyncio
+import json
+import platform
+import struct
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from hw1.app.cache import ResponseCache
+from hw1.app.executor import INLINE, ComputeExecutor
+from hw1.app.server import ServerApp
+
+
+class Case(NamedTuple):
+    name: str
+    method: str
+    path: str
+    query: bytes = b""
+    body: bytes = b""
+    headers: Tuple[Tuple[bytes, bytes], ...] = ()
+
+
+def default_cases() -> List[Case]:
+    cases = [Case("not_found", "GET", "/not_found")]
+    for n in (10, 1_000, 10_000):
+        cases.append(Case(f"factorial[n={n}]", "GET", "/factorial", query=f"n={n}".encode()))
+    for n in (10, 1_000, 100_000):
+        cases.append(Case(f"fibonacci[n={n}]", "GET", f"/fibonacci/{n}"))
+    for size in (10, 1_000, 100_000):
+        values = [i / 3 for i in range(size)]
+        cases.append(Case(f"mean_json[size={size}]", "POST", "/mean", body=json.dumps(values).encode()))
+        cases.append(Case(
+            f"mean_binary[size={size}]",
+            "POST",
+            "/mean",
+            body=struct.pack(f"<{size}d", *values),
+            headers=((b"content-type", b"application/octet-stream"),),
+        ))
+    for size in (1_000, 100_000):
+        values = [i / 3 for i in range(size)]
+        cases.append(Case(f"stats_json[size={size}]", "POST", "/stats", body=json.dumps(values).encode()))
+        cases.append(Case(
+            f"stats_binary[size={size}]",
+            "POST",
+            "/stats",
+            body=struct.pack(f"<{size}d", *values),
+            headers=((b"content-type", b"application/octet-stream"),),
+        ))
+    batch = b"\n".join(json.dumps({"op": "fibonacci", "n": i}).encode() for i in range(100))
+    cases.append(Case("batch[ops=100]", "POST", "/batch", body=batch))
+    return cases
+
+
+def make_request(app: ServerApp, case: Case, chunk_size: int = 64 * 1024) -> Callable[[], Any]:
+    """Build a coroutine factory issuing one request; the body is delivered in `chunk_size` chunks."""
+    chunks = [case.body[i:i + chunk_size] for i in range(0, len(case.body), chunk_size)] or [b""]
+    headers = [*case.headers, (b"content-length", str(len(case.body)).encode())]
+
+    async def request() -> int:
+        index = 0
+        status = 0
+
+        async def receive() -> Dict[str, Any]:
+            nonlocal index
+            chunk = chunks[index]
+            index += 1
+            return {"type": "http.request", "body": chunk, "more_body": index < len(chunks)}
+
+        async def send(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        scope = {
+            "type": "http",
+            "method": case.method,
+            "path": case.path,
+            "query_string": case.query,
+            "headers": headers,
+        }
+        await app(scope, receive, send)
+        return status
+
+    return request
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+async def run_case(app: ServerApp, case: Case, duration: float, min_requests: int) -> Dict[str, Any]:
+    request = make_request(app, case)
+    await request()  # warm-up
+
+    latencies: List[float] = []
+    started = time.perf_counter()
+    while len(latencies) < min_requests or time.perf_counter() - started < duration:
+        start = time.perf_counter()
+        await request()
+        latencies.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - started
+
+    # Allocations are measured in a separate pass because tracing slows everything down
+    traced = min(len(latencies), 20)
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    peak = 0
+    for _ in range(traced):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        await request()
+        peak += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    blocks = sys.getallocatedblocks() - blocks
+
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1e3,
+        "p99_ms": percentile(latencies, 0.99) * 1e3,
+        "alloc_kib": peak / traced / 1024,
+        "net_blocks": blocks / traced,
+    }
+
+
+def run(cases: List[Case], duration: float, min_requests: int, cache: bool) -> Dict[str, Any]:
+    app = ServerApp(
+        executor=ComputeExecutor(mode=INLINE),
+        cache=None if cache else ResponseCache(max_bytes=0),
+    )
+    results = {case.name: asyncio.run(run_case(app, case, duration, min_requests)) for case in cases}
+    return {
+        "python": platform.python_version(),
+        "cache": cache,
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    List the cases whose throughput dropped or p99 latency grew by more than `threshold`.
+
+    Args:
+        current (Dict[str, Any]): Results of this run.
+        baseline (Dict[str, Any]): Stored results to compare against.
+        threshold (float): Allowed relative regression, e.g. 0.2 for 20%.
+
+    Returns:
+        List[str]: Human-readable descriptions of the regressions.
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            continue
+        if result["rps"] < reference["rps"] * (1 - threshold):
+            regressions.append(f"{name}: {result['rps']:.0f} req/s vs {reference['rps']:.0f} req/s")
+        if result["p99_ms"] > reference["p99_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p99 {result['p99_ms']:.3f} ms vs {reference['p99_ms']:.3f} ms")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=0.5, help="seconds per case")
+    parser.add_argument("--min-requests", type=int, default=20)
+    parser.add_argument("--cache", action="store_true", help="keep the response cache enabled")
+    parser.add_argument("--only", help="run only the cases whose name contains this string")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against results stored in this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args(argv)
+
+    cases = [case for case in default_cases() if not args.only or args.only in case.name]
+    current = run(cases, args.duration, args.min_requests, args.cache)
+
+    print(f"{'case':<28} {'req/s':>10} {'p50, ms':>9} {'p99, ms':>9} {'alloc, KiB':>11} {'net blocks':>11}")
+    for name, result in current["results"].items():
+        print(
+            f"{name:<28} {result['rps']:>10.0f} {result['p50_ms']:>9.3f} {result['p99_ms']:>9.3f}"
+            f" {result['alloc_kib']:>11.1f} {result['net_blocks']:>11.1f}"
+        )
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(current, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(current, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from hw1.app.admission import AdmissionController, Overloaded
+
+
+def test_disabled_admits_everything():
+    async def main() -> None:
+        admission = AdmissionController(capacity=0, max_queue=0, queue_timeout=0.1)
+        assert await admission.acquire(100) == 0
+        admission.release(0)
+
+    asyncio.run(main())
+
+
+def test_cost_is_capped_at_capacity():
+    async def main() -> None:
+        admission = AdmissionController(capacity=4, max_queue=0, queue_timeout=0.1)
+        assert await admission.acquire(100) == 4
+        with pytest.raises(Overloaded):
+            await admission.acquire(1)
+        assert admission.rejected == 1
+
+    asyncio.run(main())
+
+
+def test_waiters_are_admitted_in_order():
+    async def main() -> None:
+        admission = AdmissionController(capacity=2, max_queue=4, queue_timeout=1.0)
+        held = await admission.acquire(2)
+        order = []
+
+        async def request(name: str, cost: int) -> None:
+            taken = await admission.acquire(cost)
+            order.append(name)
+            admission.release(taken)
+
+        tasks = [asyncio.create_task(request("expensive", 2)), asyncio.create_task(request("cheap", 1))]
+        await asyncio.sleep(0)
+        assert admission.queue_depth == 2
+        admission.release(held)
+        await asyncio.gather(*tasks)
+
+        assert order == ["expensive", "cheap"]
+        assert (admission.in_use, admission.queue_depth, admission.admitted) == (0, 0, 3)
+
+    asyncio.run(main())
+
+
+def test_queue_deadline():
+    async def main() -> None:
+        admission = AdmissionController(capacity=1, max_queue=1, queue_timeout=0.01)
+        await admission.acquire(1)
+        with pytest.raises(Overloaded) as e:
+            await admission.acquire(1)
+        assert e.value.retry_after == 1
+        assert (admission.timed_out, admission.queue_depth, admission.in_use) == (1, 0, 1)
+
+    asyncio.run(main())
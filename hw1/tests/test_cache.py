@@ -0,0 +1,59 @@
+from hw1.app.cache import ResponseCache, etag_matches, make_etag
+
+HEADERS = [(b"content-type", b"application/json")]
+
+
+def test_lru_eviction_by_bytes():
+    cache = ResponseCache(max_bytes=1000, max_entry_bytes=1000)
+    for key in "abc":
+        cache.put(key, HEADERS, b"x" * 250)
+    assert len(cache) == 3
+    assert cache.size <= 1000
+
+    cache.get("a")
+    cache.put("d", HEADERS, b"x" * 250)
+    assert cache.evictions == 1
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.size <= 1000
+
+
+def test_large_entries_are_not_stored():
+    cache = ResponseCache(max_bytes=1000, max_entry_bytes=100)
+    entry = cache.put("big", HEADERS, b"x" * 500)
+    assert entry.body == b"x" * 500
+    assert cache.get("big") is None
+    assert cache.size == 0
+
+
+def test_replacing_entry_keeps_size():
+    cache = ResponseCache(max_bytes=1000)
+    cache.put("a", HEADERS, b"x" * 100)
+    cache.put("a", HEADERS, b"y" * 100)
+    assert len(cache) == 1
+    assert cache.size == cache.get("a").size
+
+
+def test_disabled_cache():
+    cache = ResponseCache(max_bytes=0)
+    cache.put("a", HEADERS, b"1")
+    assert not cache.accepts(1)
+    assert cache.get("a") is None
+    assert cache.misses == 1
+
+
+def test_etag_matches():
+    etag = make_etag(b"body")
+    assert etag_matches(etag, etag)
+    assert etag_matches(b"W/" + etag, etag)
+    assert etag_matches(b'"a", ' + etag, etag)
+    assert etag_matches(b"*", etag)
+    assert not etag_matches(b"", etag)
+    assert not etag_matches(make_etag(b"other"), etag)
+
+
+def test_entry_limit_does_not_follow_budget(monkeypatch):
+    monkeypatch.setenv("HW1_CACHE_ENTRY_BYTES", "100")
+    cache = ResponseCache(max_bytes=1_000_000)
+    assert cache.accepts(100)
+    assert not cache.accepts(101)
@@ -0,0 +1,22 @@
+import pytest
+
+from hw1.app.codec import get_codec, orjson_codec, stdlib_codec
+
+
+def test_stdlib_codec_round_trip():
+    codec = stdlib_codec()
+    assert codec.loads(codec.dumps({"result": [1, 2.5, "a"]})) == {"result": [1, 2.5, "a"]}
+
+
+def test_get_codec():
+    assert get_codec("json").name == "json"
+    assert get_codec("auto").name in ("orjson", "ujson", "json")
+    with pytest.raises(ValueError):
+        get_codec("yaml")
+
+
+def test_orjson_falls_back_for_big_integers():
+    pytest.importorskip("orjson")
+    codec = orjson_codec()
+    assert codec.dumps({"result": 2 ** 70}) == b'{"result": 1180591620717411303424}'
+    assert codec.loads(codec.dumps({"result": 1.5})) == {"result": 1.5}
@@ -0,0 +1,29 @@
+from hw1.benchmarks.harness import Case, compare, run
+
+
+def test_harness_runs_in_process():
+    cases = [Case("fibonacci", "GET", "/fibonacci/10"), Case("mean", "POST", "/mean", body=b"[1, 2]")]
+    current = run(cases, duration=0.0, min_requests=3, cache=False)
+
+    for name in ("fibonacci", "mean"):
+        result = current["results"][name]
+        assert result["requests"] == 3
+        assert result["rps"] > 0
+        assert result["p50_ms"] <= result["p99_ms"]
+
+    assert compare(current, current, threshold=0.1) == []
+
+
+def test_compare_reports_regressions():
+    baseline = {"results": {"a": {"rps": 1000.0, "p99_ms": 1.0}, "b": {"rps": 1000.0, "p99_ms": 1.0}}}
+    current = {
+        "results": {
+            "a": {"rps": 850.0, "p99_ms": 1.1},
+            "b": {"rps": 700.0, "p99_ms": 2.0},
+            "new": {"rps": 1.0, "p99_ms": 100.0},
+        },
+    }
+
+    regressions = compare(current, baseline, threshold=0.2)
+    assert len(regressions) == 2
+    assert all(regression.startswith("b:") for regression in regressions)
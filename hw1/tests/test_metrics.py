@@ -0,0 +1,44 @@
+from hw1.app.metrics import Histogram, Metrics
+
+
+def test_histogram_buckets_are_inclusive():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 1.0, 5.0):
+        histogram.observe(value)
+    assert histogram.counts == [2, 2, 1]
+    assert histogram.count == 5
+
+
+def test_render():
+    metrics = Metrics(buckets=(0.1, 1.0), highr_buckets=(0.01, 1.0))
+    metrics.register("GET", "/factorial")
+    metrics.observe("GET", "/factorial", 200, 0.05)
+    metrics.observe("GET", "/factorial", 200, 0.5)
+    metrics.observe("GET", "/factorial", 422, 2.0)
+    metrics.observe("GET", None, 404, 0.01)
+    metrics.add_collector("queue_depth", "gauge", "Queue depth.", lambda: 3)
+
+    lines = metrics.render().decode().splitlines()
+    # Status codes are grouped into classes, like hw2's Instrumentator does
+    assert 'http_requests_total{handler="/factorial",method="GET",status="2xx"} 2' in lines
+    assert 'http_requests_total{handler="/factorial",method="GET",status="4xx"} 1' in lines
+    assert 'http_requests_total{handler="none",method="GET",status="4xx"} 1' in lines
+    assert 'http_request_duration_highr_seconds_bucket{le="0.01"} 1' in lines
+    assert 'http_request_duration_highr_seconds_bucket{le="1.0"} 3' in lines
+    assert "http_request_duration_highr_seconds_count 4" in lines
+    assert 'http_request_duration_seconds_bucket{handler="/factorial",method="GET",le="0.1"} 1' in lines
+    assert 'http_request_duration_seconds_bucket{handler="/factorial",method="GET",le="1.0"} 2' in lines
+    assert 'http_request_duration_seconds_bucket{handler="/factorial",method="GET",le="+Inf"} 3' in lines
+    assert 'http_request_duration_seconds_count{handler="/factorial",method="GET"} 3' in lines
+    assert "http_requests_inprogress 0" in lines
+    assert "# TYPE queue_depth gauge" in lines
+    assert "queue_depth 3" in lines
+
+
+def test_unknown_methods_share_one_label():
+    metrics = Metrics(buckets=(0.1,))
+    for method in ("BREW", "PROPFIND", "X" * 100):
+        metrics.observe(method, None, 405, 0.01)
+
+    assert list(metrics.routes) == [("OTHER", "none")]
+    assert 'http_requests_total{handler="none",method="OTHER",status="4xx"} 3' in metrics.render().decode().splitlines()
@@ -0,0 +1,75 @@
+import pytest
+
+from hw1.app.router import InvalidPathParam, MethodNotAllowed, RouteNotFound, Router
+
+
+def handler_for(name: str):
+    def handler():
+        return name
+    return handler
+
+
+@pytest.fixture()
+def router() -> Router:
+    router = Router()
+    router.add("GET", "/factorial", handler_for("factorial"))
+    router.add("GET", "/fibonacci/{n:int}", handler_for("fibonacci"))
+    router.add("GET", "/fibonacci/last", handler_for("last"))
+    router.add("GET", "/users/{name}/items/{item:int}", handler_for("item"))
+    router.add("GET", "/mean", handler_for("mean"))
+    router.add("POST", "/mean", handler_for("mean"))
+    return router
+
+
+@pytest.mark.parametrize(
+    ("path", "name", "params"),
+    [
+        ("/factorial", "factorial", {}),
+        ("/fibonacci/10", "fibonacci", {"n": 10}),
+        ("/fibonacci/-1", "fibonacci", {"n": -1}),
+        ("/fibonacci/last", "last", {}),
+        ("/users/bob/items/3", "item", {"name": "bob", "item": 3}),
+    ],
+)
+def test_match(router: Router, path: str, name: str, params: dict):
+    route, path_params = router.match("GET", path)
+    assert route.handler() == name
+    assert path_params == params
+
+
+@pytest.mark.parametrize("path", ["/", "/fibonacciXYZ", "/fibonacci/1/2", "/fibonacci//2", "/factorial/", "/users//items"])
+def test_not_found(router: Router, path: str):
+    with pytest.raises(RouteNotFound):
+        router.match("GET", path)
+
+
+def test_method_not_allowed(router: Router):
+    with pytest.raises(MethodNotAllowed) as e:
+        router.match("DELETE", "/mean")
+    assert e.value.allowed == ["GET", "POST"]
+
+    with pytest.raises(MethodNotAllowed) as e:
+        router.match("POST", "/fibonacci/10")
+    assert e.value.allowed == ["GET"]
+
+
+@pytest.mark.parametrize("path", ["/fibonacci/lol", "/fibonacci/1_0", "/fibonacci/+1", "/fibonacci/ 1", "/fibonacci/١٠"])
+def test_invalid_typed_param(router: Router, path: str):
+    with pytest.raises(InvalidPathParam):
+        router.match("GET", path)
+
+
+@pytest.mark.parametrize("path", ["/fibonacci", "/fibonacci/", "/users/bob/items", "/users/bob/items/"])
+def test_missing_param(router: Router, path: str):
+    with pytest.raises(InvalidPathParam) as e:
+        router.match("GET", path)
+    assert e.value.route.handler() in ("fibonacci", "item")
+
+
+def test_conflicting_params():
+    router = Router()
+    router.add("GET", "/a/{n:int}", handler_for("a"))
+    with pytest.raises(ValueError):
+        router.add("GET", "/a/{m}", handler_for("b"))
+    with pytest.raises(ValueError):
+        router.add("GET", "/b/{n:float}", handler_for("b"))
@@ -0,0 +1,487 @@
+import asyncio
+import json
+import struct
+import sys
+from http import HTTPStatus
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytest
+
+from hw1.app import server, validation
+from hw1.app.admission import AdmissionController
+from hw1.app.cache import ResponseCache
+from hw1.app.codec import stdlib_codec
+from hw1.app.executor import AUTO, INLINE, POOL, ComputeExecutor
+from hw1.app.server import ServerApp
+from hw1.app.utils import calculate_factorial, fibonacci_pair
+
+
+def call(
+        app: ServerApp,
+        method: str,
+        path: str,
+        query: bytes = b"",
+        body: bytes = b"",
+        headers: Optional[List[Tuple[bytes, bytes]]] = None,
+) -> Tuple[int, Dict[bytes, bytes], bytes]:
+    """Drive the ASGI app in-process and collect the status, headers and the full response body."""
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query,
+        "headers": headers or [],
+    }
+    messages: List[Dict[str, Any]] = []
+
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message: Dict[str, Any]) -> None:
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = messages[0]
+    return start["status"], dict(start["headers"]), b"".join(m.get("body", b"") for m in messages[1:])
+
+
+def run_lifespan(app: ServerApp, *events: str) -> List[str]:
+    sent: List[str] = []
+
+    async def main() -> None:
+        queue: asyncio.Queue = asyncio.Queue()
+        for event in events:
+            queue.put_nowait({"type": f"lifespan.{event}"})
+
+        async def send(message: Dict[str, Any]) -> None:
+            sent.append(message["type"])
+
+        await app({"type": "lifespan"}, queue.get, send)
+
+    asyncio.run(main())
+    return sent
+
+
+@pytest.mark.parametrize(
+    ("path", "query", "status_code"),
+    [
+        ("/factorial", b"n=10", HTTPStatus.OK),
+        ("/factorial", b"n=-1", HTTPStatus.BAD_REQUEST),
+        ("/factorial", b"n=lol", HTTPStatus.UNPROCESSABLE_ENTITY),
+        ("/fibonacci/10", b"", HTTPStatus.OK),
+        ("/fibonacci/lol", b"", HTTPStatus.UNPROCESSABLE_ENTITY),
+        ("/fibonacci/1_0", b"", HTTPStatus.UNPROCESSABLE_ENTITY),
+        ("/fibonacci", b"", HTTPStatus.UNPROCESSABLE_ENTITY),
+        ("/fibonacci/", b"", HTTPStatus.UNPROCESSABLE_ENTITY),
+        ("/fibonacci/-1", b"", HTTPStatus.BAD_REQUEST),
+        ("/fibonacci/10", b"mod=0", HTTPStatus.BAD_REQUEST),
+        ("/factorial", b"n=10&mod=x", HTTPStatus.UNPROCESSABLE_ENTITY),
+        ("/fibonacciXYZ", b"", HTTPStatus.NOT_FOUND),
+        ("/not_found", b"", HTTPStatus.NOT_FOUND),
+    ],
+)
+def test_inline_requests(path: str, query: bytes, status_code: int):
+    app = ServerApp(executor=ComputeExecutor(mode=INLINE))
+    status, _, _ = call(app, "GET", path, query)
+    assert status == status_code
+
+
+def test_modular_results():
+    app = ServerApp(executor=ComputeExecutor(mode=INLINE))
+    status, _, body = call(app, "GET", "/fibonacci/1000000000000000000", b"mod=1000000007")
+    assert status == HTTPStatus.OK
+    assert json.loads(body) == {"result": 209783453}
+    status, _, body = call(app, "GET", "/factorial", b"n=1000000005&mod=1000000007")
+    assert status == HTTPStatus.OK
+    assert json.loads(body) == {"result": 1}
+
+
+@pytest.mark.parametrize("codec", [None, stdlib_codec()])
+def test_static_error_responses(codec):
+    app = ServerApp(codec=codec)
+    status, headers, body = call(app, "GET", "/not_found")
+    assert status == HTTPStatus.NOT_FOUND
+    assert json.loads(body) == {"error": "Not Found"}
+    assert headers[b"content-length"] == str(len(body)).encode()
+    assert app.static_errors[404, "Not Found"][0] == body
+    # Extra headers are appended to the pre-encoded ones per response
+    status, headers, _ = call(app, "POST", "/factorial")
+    assert headers[b"allow"] == b"GET"
+
+
+def test_method_not_allowed():
+    status, headers, body = call(ServerApp(), "POST", "/factorial", b"n=1")
+    assert status == HTTPStatus.METHOD_NOT_ALLOWED
+    assert headers[b"allow"] == b"GET"
+    assert json.loads(body) == {"error": "Method Not Allowed"}
+
+
+def test_lifespan_starts_and_stops_pool():
+    app = ServerApp(executor=ComputeExecutor(mode=AUTO, max_workers=1), warm_up=False)
+    assert run_lifespan(app, "startup", "shutdown") == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+    assert not app.executor.started
+
+
+def test_lifespan_warm_up(tmp_path):
+    app = ServerApp(executor=ComputeExecutor(mode=POOL, max_workers=1), warm_up=True)
+    app.table_path = str(tmp_path / "table.bin")
+    app.fibonacci_checkpoints = [2048, 4096]
+    app.factorial_checkpoints = [1000]
+    app.warm_responses = 8
+
+    sent = []
+
+    async def main() -> None:
+        queue: asyncio.Queue = asyncio.Queue()
+        queue.put_nowait({"type": "lifespan.startup"})
+
+        async def send(message: Dict[str, Any]) -> None:
+            sent.append(message["type"])
+            if message["type"] == "lifespan.startup.complete":
+                assert app.table is not None
+                assert app.table.fibonacci_ns == [2048, 4096]
+                assert len(app.cache) == 16
+                # The pool workers map the same table through the initializer
+                assert await app.executor.run(calculate_factorial, 1001) == calculate_factorial(1001)
+                queue.put_nowait({"type": "lifespan.shutdown"})
+
+        await app({"type": "lifespan"}, queue.get, send)
+
+    asyncio.run(main())
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+    assert (tmp_path / "table.bin").exists()
+    assert app.table is None
+
+
+def test_expensive_requests_run_on_pool():
+    executor = ComputeExecutor(mode=AUTO, max_workers=1, cost_threshold=1_000)
+    executor.start()
+    try:
+        assert not executor.offloads(10)
+        assert executor.offloads(10_000)
+
+        status, _, body = call(ServerApp(executor=executor), "GET", "/factorial", b"n=500")
+        assert status == HTTPStatus.OK
+        assert json.loads(body)["result"] == calculate_factorial(500)
+        assert executor.max_queue_depth == 1
+        assert executor.queue_depth == 0
+    finally:
+        executor.shutdown()
+
+
+def test_pool_deadline():
+    executor = ComputeExecutor(mode=POOL, max_workers=1, deadline=0.001)
+    executor.start()
+    try:
+        status, _, _ = call(ServerApp(executor=executor), "GET", "/factorial", b"n=100000")
+        assert status == HTTPStatus.SERVICE_UNAVAILABLE
+    finally:
+        executor.shutdown()
+
+
+def test_unknown_execution_mode():
+    with pytest.raises(ValueError):
+        ComputeExecutor(mode="threads")
+
+
+@pytest.mark.parametrize(
+    ("accept", "content_type", "decode"),
+    [
+        (b"application/json", b"application/json", lambda body: json.loads(body)["result"]),
+        (b"text/html, application/x-hex;q=0.9", b"application/x-hex", lambda body: int(body, 16)),
+        (b"application/octet-stream", b"application/octet-stream", lambda body: int.from_bytes(body, "big")),
+    ],
+)
+def test_result_formats(accept: bytes, content_type: bytes, decode):
+    app = ServerApp(executor=ComputeExecutor(mode=INLINE))
+    status, headers, body = call(app, "GET", "/factorial", b"n=1000", headers=[(b"accept", accept)])
+
+    assert status == HTTPStatus.OK
+    assert headers[b"content-type"] == content_type
+    assert decode(body) == calculate_factorial(1000)
+
+
+def test_large_result_is_streamed():
+    messages: List[Dict[str, Any]] = []
+
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request", "body": b""}
+
+    async def send(message: Dict[str, Any]) -> None:
+        messages.append(message)
+
+    app = ServerApp(executor=ComputeExecutor(mode=INLINE), cache=ResponseCache(max_bytes=0))
+    scope = {"type": "http", "method": "GET", "path": "/factorial", "query_string": b"n=30000"}
+    asyncio.run(app(scope, receive, send))
+
+    body = b"".join(m["body"] for m in messages[1:])
+    assert dict(messages[0]["headers"])[b"content-length"] == str(len(body)).encode()
+    assert len(messages) > 3
+    assert all(m["more_body"] for m in messages[1:-1])
+    assert not messages[-1].get("more_body", False)
+    # factorial(30000) has more digits than the default int-to-str limit allows
+    digits = body[len(b'{"result": '):-1]
+    assert len(digits) > 4300
+    default_limit = sys.get_int_max_str_digits()
+    sys.set_int_max_str_digits(0)
+    try:
+        assert int(digits) == calculate_factorial(30000)
+    finally:
+        sys.set_int_max_str_digits(default_limit)
+
+
+@pytest.mark.parametrize(
+    ("method", "body", "status_code"),
+    [
+        ("GET", b"", HTTPStatus.UNPROCESSABLE_ENTITY),
+        ("GET", b"[]", HTTPStatus.BAD_REQUEST),
+        ("GET", b"[1, 2, 3]", HTTPStatus.OK),
+        ("POST", b"[1, 2.0, 3.0]", HTTPStatus.OK),
+        ("POST", b"[1, \"2\", 3]", HTTPStatus.UNPROCESSABLE_ENTITY),
+        ("POST", b"{\"a\": 1}", HTTPStatus.UNPROCESSABLE_ENTITY),
+        ("POST", b"[1e400]", HTTPStatus.UNPROCESSABLE_ENTITY),
+        ("POST", b"[1e308, 1e308]", HTTPStatus.UNPROCESSABLE_ENTITY),
+    ],
+)
+def test_mean(method: str, body: bytes, status_code: int):
+    status, _, response = call(ServerApp(), method, "/mean", body=body)
+    assert status == status_code
+    if status_code == HTTPStatus.OK:
+        assert json.loads(response) == {"result": 2.0}
+
+
+def test_mean_is_streamed():
+    chunks = [b"[", b"0.1, 0.", b"1, 0.1", b", 1e1", b"6, -1e16", b"]"]
+    received: List[Dict[str, Any]] = []
+
+    async def receive() -> Dict[str, Any]:
+        chunk = chunks.pop(0)
+        return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+
+    async def send(message: Dict[str, Any]) -> None:
+        received.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/mean", "query_string": b""}
+    asyncio.run(ServerApp()(scope, receive, send))
+
+    assert received[0]["status"] == HTTPStatus.OK
+    assert json.loads(received[1]["body"])["result"] == pytest.approx(0.3 / 5)
+
+
+@pytest.mark.parametrize(
+    ("body", "status_code"),
+    [
+        (b"", HTTPStatus.BAD_REQUEST),
+        (struct.pack("<3d", 1.0, 2.0, 3.0), HTTPStatus.OK),
+        (struct.pack("<3d", 1.0, float("nan"), 3.0), HTTPStatus.UNPROCESSABLE_ENTITY),
+        (struct.pack("<3d", 1.0, 2.0, 3.0)[:-1], HTTPStatus.UNPROCESSABLE_ENTITY),
+    ],
+)
+def test_mean_binary(body: bytes, status_code: int):
+    headers = [(b"content-type", b"application/octet-stream"), (b"content-length", str(len(body)).encode())]
+    status, _, response = call(ServerApp(), "POST", "/mean", body=body, headers=headers)
+    assert status == status_code
+    if status_code == HTTPStatus.OK:
+        assert json.loads(response) == {"result": 2.0}
+
+
+@pytest.mark.parametrize(
+    ("query", "body", "headers", "status_code"),
+    [
+        (b"", b"[1, 2, 3, 4]", [], HTTPStatus.OK),
+        (b"", struct.pack("<4d", 1.0, 2.0, 3.0, 4.0), [(b"content-type", b"application/octet-stream")], HTTPStatus.OK),
+        (b"", b"[]", [], HTTPStatus.BAD_REQUEST),
+        (b"q=2", b"[1]", [], HTTPStatus.UNPROCESSABLE_ENTITY),
+        (b"bounds=a", b"[1]", [], HTTPStatus.UNPROCESSABLE_ENTITY),
+        (b"", b"[1, 1e999]", [], HTTPStatus.UNPROCESSABLE_ENTITY),
+    ],
+)
+def test_stats(query: bytes, body: bytes, headers: List[Tuple[bytes, bytes]], status_code: int):
+    headers = [*headers, (b"content-length", str(len(body)).encode())]
+    status, _, response = call(ServerApp(), "POST", "/stats", query=query, body=body, headers=headers)
+    assert status == status_code
+    if status_code == HTTPStatus.OK:
+        stats = json.loads(response)
+        assert (stats["count"], stats["mean"], stats["min"], stats["max"]) == (4, 2.5, 1.0, 4.0)
+        assert stats["variance"] == pytest.approx(5 / 3)
+        assert stats["quantiles"]["0.5"] == pytest.approx(2.5)
+        assert sum(stats["histogram"]["counts"]) == 4
+
+
+def test_stats_query_parameters():
+    status, _, response = call(ServerApp(), "POST", "/stats", query=b"q=0.25,0.75&bounds=0,2.5", body=b"[1, 2, 3, 4]")
+    assert status == HTTPStatus.OK
+    stats = json.loads(response)
+    assert list(stats["quantiles"]) == ["0.25", "0.75"]
+    assert stats["histogram"] == {"bounds": [0.0, 2.5], "counts": [0, 2, 2]}
+
+
+def test_admission_control_sheds_load():
+    admission = AdmissionController(capacity=1, max_queue=0, queue_timeout=0.5)
+    app = ServerApp(executor=ComputeExecutor(mode=INLINE), admission=admission)
+    held = asyncio.run(admission.acquire(1))
+
+    status, headers, _ = call(app, "GET", "/factorial", b"n=5")
+    assert status == HTTPStatus.SERVICE_UNAVAILABLE
+    assert headers[b"retry-after"] == b"1"
+    # /metrics is not admission-controlled
+    status, _, body = call(app, "GET", "/metrics")
+    assert status == HTTPStatus.OK
+    assert b"hw1_admission_rejected_total 1" in body
+
+    admission.release(held)
+    assert call(app, "GET", "/factorial", b"n=5")[0] == HTTPStatus.OK
+
+
+def test_responses_are_cached_with_etag():
+    app = ServerApp(executor=ComputeExecutor(mode=INLINE), cache=ResponseCache(max_bytes=1024 * 1024))
+
+    status, headers, body = call(app, "GET", "/fibonacci/1000")
+    assert status == HTTPStatus.OK
+    assert app.cache.misses == 1
+    etag = headers[b"etag"]
+
+    status, headers, cached_body = call(app, "GET", "/fibonacci/1000")
+    assert (status, headers[b"etag"], cached_body) == (HTTPStatus.OK, etag, body)
+    assert app.cache.hits == 1
+
+    status, headers, body = call(app, "GET", "/fibonacci/1000", headers=[(b"if-none-match", b'"other", ' + etag)])
+    assert status == HTTPStatus.NOT_MODIFIED
+    assert headers[b"etag"] == etag
+    assert body == b""
+
+    # Every format is cached separately
+    status, headers, body = call(app, "GET", "/fibonacci/1000", headers=[(b"accept", b"application/x-hex")])
+    assert headers[b"etag"] != etag
+    assert int(body, 16) == json.loads(cached_body)["result"]
+    assert len(app.cache) == 2
+
+
+def test_batch():
+    lines = [
+        {"op": "fibonacci", "n": 10, "id": "fib"},
+        {"op": "factorial", "n": 5},
+        {"op": "factorial", "n": -1, "id": "negative"},
+        {"op": "factorial", "n": "lol", "id": "lol"},
+        {"op": "mean", "values": [1, 2, 3], "id": "mean"},
+        {"op": "mean", "values": [], "id": "empty"},
+        {"op": "mean", "values": [1, True], "id": "bool"},
+        {"op": "sqrt", "n": 4, "id": "unknown"},
+        {"op": "fibonacci", "n": 30000, "id": "huge"},
+    ]
+    body = b"\n".join(json.dumps(line).encode() for line in lines) + b"\n\nnot json\n"
+    status, headers, response = call(ServerApp(), "POST", "/batch", body=body)
+
+    assert status == HTTPStatus.OK
+    assert headers[b"content-type"] == b"application/x-ndjson"
+    default_limit = sys.get_int_max_str_digits()
+    sys.set_int_max_str_digits(0)
+    try:
+        results = {item["id"]: item for item in map(json.loads, response.splitlines())}
+    finally:
+        sys.set_int_max_str_digits(default_limit)
+
+    assert len(results) == len(lines) + 1
+    assert results["fib"] == {"id": "fib", "status": 200, "result": 55}
+    assert results[2] == {"id": 2, "status": 200, "result": 120}
+    assert results["negative"] == {"id": "negative", "status": 400, "error": "Bad Request"}
+    assert results["lol"]["status"] == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert results["mean"]["result"] == 2.0
+    assert results["empty"]["status"] == HTTPStatus.BAD_REQUEST
+    assert results["bool"]["status"] == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert results["unknown"]["status"] == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert results["huge"]["result"] == fibonacci_pair(30000)[0]
+    # The blank line before "not json" counts
+    assert results[11]["status"] == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_batch_rejects_long_lines(monkeypatch):
+    monkeypatch.setattr(server, "MAX_BATCH_LINE_BYTES", 100)
+    operation = json.dumps({"op": "fibonacci", "n": 10}).encode()
+    # The long line is complete inside a single chunk, so it is never the pending tail
+    body = operation + b"\n\n" + b" " * 200 + operation + b"\n" + operation + b"\n"
+    status, _, response = call(ServerApp(executor=ComputeExecutor(mode=INLINE)), "POST", "/batch", body=body)
+
+    assert status == HTTPStatus.OK
+    results = {item["id"]: item for item in map(json.loads, response.splitlines())}
+    assert results[1]["status"] == HTTPStatus.OK
+    assert results[3]["status"] == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert 4 not in results
+
+
+def test_metrics_endpoint():
+    app = ServerApp(executor=ComputeExecutor(mode=INLINE))
+    call(app, "GET", "/fibonacci/10")
+    call(app, "GET", "/fibonacci/10")
+    call(app, "GET", "/fibonacci/lol")
+    call(app, "GET", "/missing")
+
+    status, headers, body = call(app, "GET", "/metrics")
+    assert status == HTTPStatus.OK
+    assert headers[b"content-type"].startswith(b"text/plain; version=0.0.4")
+    lines = body.decode().splitlines()
+    assert 'http_requests_total{handler="/fibonacci/{n:int}",method="GET",status="2xx"} 2' in lines
+    assert 'http_requests_total{handler="/fibonacci/{n:int}",method="GET",status="4xx"} 1' in lines
+    assert 'http_requests_total{handler="none",method="GET",status="4xx"} 1' in lines
+    assert "hw1_response_cache_hits_total 1" in lines
+    assert "http_requests_inprogress 1" in lines
+
+
+def test_n_is_bounded(monkeypatch):
+    monkeypatch.setattr(validation, "MAX_N", 1000)
+    app = ServerApp(executor=ComputeExecutor(mode=INLINE))
+    assert call(app, "GET", "/factorial", b"n=1000")[0] == HTTPStatus.OK
+    assert call(app, "GET", "/factorial", b"n=1001")[0] == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert call(app, "GET", "/fibonacci/99999999999999999999999999")[0] == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_deadline_applies_without_pool():
+    executor = ComputeExecutor(mode=INLINE, deadline=0.001)
+    status, _, _ = call(ServerApp(executor=executor, cache=ResponseCache(max_bytes=0)), "GET", "/factorial", b"n=30000")
+    assert status == HTTPStatus.SERVICE_UNAVAILABLE
+
+
+def test_modular_requests_are_bounded_and_costed():
+    app = ServerApp(executor=ComputeExecutor(mode=INLINE))
+    huge = str(2 ** 5000).encode()
+    assert call(app, "GET", "/fibonacci/10", b"mod=" + huge)[0] == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert call(app, "GET", "/factorial", b"n=" + huge + b"&mod=7")[0] == HTTPStatus.UNPROCESSABLE_ENTITY
+
+    cost = app.admission_costs["/fibonacci/{n:int}"]
+    assert cost({"path_params": {"n": 10}}, {"mod": ["7"]}) == 0
+    assert cost({"path_params": {"n": 2 ** 4000}}, {"mod": [str(2 ** 4000)]}) > 0
+    assert app.admission_costs["/factorial"]({}, {"n": ["1000000"], "mod": [str(2 ** 4000)]}) > 0
+
+
+def test_overrunning_job_keeps_its_admission_cost():
+    executor = ComputeExecutor(mode=INLINE, deadline=0.001)
+    app = ServerApp(executor=executor, cache=ResponseCache(max_bytes=0), admission=AdmissionController(capacity=64))
+    scope = {"type": "http", "method": "GET", "path": "/factorial", "query_string": b"n=30000", "headers": []}
+    messages: List[Dict[str, Any]] = []
+
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request", "body": b""}
+
+    async def send(message: Dict[str, Any]) -> None:
+        messages.append(message)
+
+    async def scenario() -> None:
+        await app(scope, receive, send)
+        assert messages[0]["status"] == HTTPStatus.SERVICE_UNAVAILABLE
+        # The request was answered, but the computation still runs on a worker thread
+        assert app.admission.in_use > 0
+        for _ in range(500):
+            if app.admission.in_use == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert app.admission.in_use == 0
+        assert executor.queue_depth == 0
+
+    asyncio.run(scenario())
+    executor.shutdown()
+
+
+def test_decimal_encoding_is_costed():
+    cost = ServerApp(executor=ComputeExecutor(mode=INLINE)).admission_costs["/factorial"]
+    params = {"n": ["100000"]}
+    assert cost({"headers": []}, params) > cost({"headers": [(b"accept", b"application/x-hex")]}, params)
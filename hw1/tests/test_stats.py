@@ -0,0 +1,61 @@
+import math
+import random
+import statistics
+from bisect import bisect_right
+
+import pytest
+
+from hw1.app.stats import DescriptiveStats, FixedHistogram, RunningMoments, TDigest
+
+
+def batches(values: list[float], size: int) -> list[list[float]]:
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+def test_running_moments_merges_batches():
+    values = [random.gauss(1e6, 3.0) for _ in range(10_000)]
+    moments = RunningMoments()
+    for batch in batches(values, 777):
+        moments.add_batch(batch)
+
+    assert moments.count == len(values)
+    assert moments.mean == pytest.approx(statistics.fmean(values), rel=1e-12)
+    assert moments.variance == pytest.approx(statistics.variance(values), rel=1e-9)
+    assert (moments.min, moments.max) == (min(values), max(values))
+
+
+def test_tdigest_quantiles_are_close_with_bounded_memory():
+    random.seed(7)
+    values = [random.expovariate(1.0) for _ in range(50_000)]
+    digest = TDigest(compression=100)
+    for batch in batches(values, 1000):
+        digest.add_batch(batch)
+
+    assert len(digest.means) <= 100
+    ordered = sorted(values)
+    for q in (0.01, 0.5, 0.9, 0.99):
+        estimate = digest.quantile(q, ordered[0], ordered[-1])
+        # Rank error: the share of values below the estimate should be close to q
+        assert bisect_right(ordered, estimate) / len(ordered) == pytest.approx(q, abs=0.005)
+
+
+def test_fixed_histogram():
+    histogram = FixedHistogram([0.0, 10.0])
+    histogram.add_batch([-1.0, 0.0, 5.0, 10.0, 11.0])
+    assert histogram.counts == [1, 2, 2]
+
+
+def test_descriptive_stats_rejects_non_finite_values():
+    with pytest.raises(ValueError):
+        DescriptiveStats().add_batch([1.0, math.inf])
+
+
+def test_descriptive_stats_summary():
+    stats = DescriptiveStats(quantiles=[0.5], bounds=[2.0])
+    stats.add_batch([1.0, 2.0, 3.0])
+    summary = stats.summary()
+    assert summary["count"] == 3
+    assert summary["mean"] == 2.0
+    assert summary["variance"] == 1.0
+    assert summary["quantiles"] == {"0.5": 2.0}
+    assert summary["histogram"] == {"bounds": [2.0], "counts": [1, 2]}
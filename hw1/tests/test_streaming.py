@@ -0,0 +1,144 @@
+import json
+import math
+import struct
+
+import pytest
+
+from hw1.app.streaming import (
+    MAX_PENDING_BYTES,
+    CompensatedSum,
+    Float64Reader,
+    NumberArrayParser,
+    parse_npy_header,
+)
+from hw1.app.utils import calculate_float64_sum
+
+
+def npy(values: list[float], descr: str = "<f8") -> bytes:
+    header = f"{{'descr': '{descr}', 'fortran_order': False, 'shape': ({len(values)},), }}".encode()
+    header += b" " * (63 - (len(header) + 10) % 64) + b"\n"
+    return b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little") + header + struct.pack(f"<{len(values)}d", *values)
+
+
+def parse_in_chunks(body: bytes, size: int) -> list[float]:
+    parser = NumberArrayParser()
+    values: list[float] = []
+    for start in range(0, len(body), size):
+        values.extend(parser.feed(body[start:start + size]))
+    parser.close()
+    return values
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1024])
+def test_parser_handles_any_chunking(size: int):
+    numbers = [1, -2.5, 0, 3e10, -1.25e-3, 42, 0.1]
+    body = json.dumps(numbers, indent=1).encode()
+    assert parse_in_chunks(body, size) == [float(n) for n in numbers]
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b"",
+        b"{}",
+        b"1",
+        b"[1, 2",
+        b"[1, 2,]",
+        b"[,1]",
+        b"[1, \"2\"]",
+        b"[1, true]",
+        b"[1, null]",
+        b"[[1], 2]",
+        b"[1, {\"a\": 1}]",
+        b"[01]",
+        b"[NaN]",
+        b"[1] 2",
+    ],
+)
+def test_parser_rejects_invalid_bodies(body: bytes):
+    with pytest.raises(ValueError):
+        parse_in_chunks(body, 3)
+
+
+def test_parser_rejects_bad_element_early():
+    parser = NumberArrayParser()
+    parser.feed(b"[1, 2, ")
+    with pytest.raises(ValueError):
+        parser.feed(b"\"three\", 4, 5, ")
+
+
+def test_parser_bounds_pending_element():
+    parser = NumberArrayParser()
+    parser.feed(b"[1")
+    with pytest.raises(ValueError):
+        parser.feed(b"0" * MAX_PENDING_BYTES)
+
+
+def test_empty_array():
+    parser = NumberArrayParser()
+    assert parser.feed(b" [ ] ") == []
+    parser.close()
+    assert parser.count == 0
+
+
+def test_compensated_sum():
+    total = CompensatedSum()
+    for value in [1e16, 1.0, -1e16] * 1000:
+        total.add(value)
+    assert total.value == 1000.0
+
+    total = CompensatedSum()
+    total.add_many([0.1] * 10)
+    total.add_many([0.1] * 10)
+    assert total.value == math.fsum([0.1] * 20)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 8, 13, 4096])
+@pytest.mark.parametrize("is_npy", [False, True])
+def test_float64_reader(chunk_size: int, is_npy: bool):
+    values = [float(i) / 7 for i in range(1000)]
+    body = npy(values) if is_npy else struct.pack(f"<{len(values)}d", *values)
+    reader = Float64Reader(npy=is_npy, buffer_size=100)
+
+    total = 0.0
+    for start in range(0, len(body), chunk_size):
+        for buffer in reader.feed(body[start:start + chunk_size]):
+            assert len(buffer) <= 96
+            total += calculate_float64_sum(buffer)
+    for buffer in reader.close():
+        total += calculate_float64_sum(buffer)
+
+    assert reader.count == len(values)
+    assert total == pytest.approx(math.fsum(values))
+
+
+def test_float64_reader_rejects_partial_values():
+    reader = Float64Reader()
+    list(reader.feed(b"\x00" * 12))
+    with pytest.raises(ValueError):
+        list(reader.close())
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b"not numpy at all",
+        npy([1.0], descr="<f4"),
+        npy([1.0], descr=">f8"),
+        npy([1.0, 2.0])[:-8],
+    ],
+)
+def test_float64_reader_rejects_bad_npy(body: bytes):
+    reader = Float64Reader(npy=True)
+    with pytest.raises(ValueError):
+        list(reader.feed(body))
+        list(reader.close())
+
+
+def test_parse_npy_header_waits_for_more_data():
+    body = npy([1.0, 2.0])
+    assert parse_npy_header(body[:5]) is None
+    assert parse_npy_header(body[:20]) is None
+    offset, count = parse_npy_header(body)
+    assert count == 2
+    assert len(body) - offset == 16
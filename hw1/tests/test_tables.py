@@ -0,0 +1,53 @@
+import math
+
+import pytest
+
+from hw1.app import utils
+from hw1.app.tables import SharedTable, build_table
+
+
+@pytest.fixture()
+def table(tmp_path):
+    table = SharedTable.open_or_build(str(tmp_path / "table.bin"), [2048, 8192], [500, 1000])
+    utils.use_shared_table(table)
+    utils.clear_fibonacci_checkpoints()
+    yield table
+    utils.use_shared_table(None)
+    table.close()
+
+
+def test_table_lookups(table: SharedTable):
+    assert table.fibonacci_floor(100) is None
+    assert table.fibonacci_floor(8191)[0] == 2048
+    assert table.fibonacci_floor(8192, minimum=9000) is None
+    k, pair = table.fibonacci_floor(9000)
+    assert (k, pair) == (8192, utils._fib_doubling(8192))
+    assert table.factorial_floor(1200) == (1000, math.factorial(1000))
+
+
+@pytest.mark.parametrize("n", [0, 10, 2048, 2049, 3000, 8192, 9000, 20000])
+def test_fibonacci_uses_table(table: SharedTable, n: int):
+    assert utils.calculate_fibonacci(n) == utils._fib_doubling(n)[0]
+
+
+@pytest.mark.parametrize("n", [0, 499, 500, 501, 620, 1000, 1100, 5000])
+def test_factorial_uses_table(table: SharedTable, n: int):
+    assert utils.calculate_factorial(n) == math.factorial(n)
+
+
+def test_table_is_built_once(tmp_path):
+    path = str(tmp_path / "table.bin")
+    SharedTable.open_or_build(path, [2048], [100]).close()
+    mtime = (tmp_path / "table.bin").stat().st_mtime_ns
+    SharedTable.open_or_build(path, [2048], [100]).close()
+    assert (tmp_path / "table.bin").stat().st_mtime_ns == mtime
+
+
+def test_rejects_foreign_files(tmp_path):
+    path = tmp_path / "table.bin"
+    path.write_bytes(b"x" * 64)
+    with pytest.raises(ValueError):
+        SharedTable(str(path))
+
+    build_table(str(path), [], [])
+    assert SharedTable(str(path)).fibonacci_floor(10) is None
@@ -1,6 +1,20 @@
+import math
+
 import pytest
 
-from hw1.app.utils import calculate_factorial, calculate_fibonacci, calculate_mean
+from hw1.app import utils
+from hw1.app.utils import (
+    MAX_MODULAR_FACTORIAL_STEPS,
+    calculate_factorial,
+    calculate_fibonacci,
+    calculate_mean,
+    clear_fibonacci_checkpoints,
+    factorial_mod,
+    fibonacci_mod,
+    fibonacci_pair,
+    is_probable_prime,
+    pisano_period,
+)
 
 
 def test_calculate_factorial():
@@ -17,6 +31,77 @@ def test_calculate_fibonacci():
         calculate_fibonacci(-1)
 
 
+def test_calculate_fibonacci_is_exact():
+    clear_fibonacci_checkpoints()
+    a, b = 0, 1
+    expected = []
+    for _ in range(3000):
+        expected.append(a)
+        a, b = b, a + b
+
+    assert [calculate_fibonacci(n) for n in range(3000)] == expected
+    # Past the float range of Binet's formula
+    assert calculate_fibonacci(1500) == expected[1500]
+
+
+def test_fibonacci_checkpoints_are_bounded_by_size(monkeypatch):
+    clear_fibonacci_checkpoints()
+    monkeypatch.setattr(utils, "FIB_CHECKPOINT_MAX_PAIR_BITS", 30_000)
+    monkeypatch.setattr(utils, "FIB_CHECKPOINT_MAX_BITS", 35_000)
+    for n in (10_000, 11_000, 12_000, 30_000):
+        fibonacci_pair(n)
+
+    # F(30000) is too large to keep, and only the most recent pairs fit in the budget
+    assert list(utils._fib_checkpoints) == [11_000, 12_000]
+    assert utils._fib_checkpoint_bits == sum(map(utils._pair_bits, utils._fib_checkpoints.values()))
+    assert utils._fib_checkpoint_bits <= 35_000
+    clear_fibonacci_checkpoints()
+
+
+def test_fibonacci_checkpoints_are_reused():
+    clear_fibonacci_checkpoints()
+    fibonacci_pair(50_000)
+    from_checkpoint = fibonacci_pair(50_123)
+
+    clear_fibonacci_checkpoints()
+    assert fibonacci_pair(50_123) == from_checkpoint
+    assert fibonacci_pair(50_124)[0] == from_checkpoint[1]
+
+
+@pytest.mark.parametrize("m", [1, 2, 10, 1000, 10 ** 9 + 7, 2 ** 64])
+def test_fibonacci_mod(m: int):
+    assert [fibonacci_mod(n, m) for n in range(200)] == [calculate_fibonacci(n) % m for n in range(200)]
+    assert fibonacci_mod(10 ** 5, m) == calculate_fibonacci(10 ** 5) % m
+
+
+def test_pisano_period():
+    assert [pisano_period(m) for m in (1, 2, 3, 10, 1000)] == [1, 3, 8, 60, 1500]
+    # Small moduli reduce n, so n far beyond any exact computation is answered at once
+    assert fibonacci_mod(10 ** 18 + 60, 10) == fibonacci_mod(10 ** 18, 10)
+
+
+@pytest.mark.parametrize("m", [1, 7, 12, 97, 1024, 10 ** 9 + 7])
+def test_factorial_mod(m: int):
+    assert [factorial_mod(n, m) for n in range(120)] == [math.factorial(n) % m for n in range(120)]
+
+
+def test_factorial_mod_shortcuts():
+    p = 10 ** 9 + 7
+    assert is_probable_prime(p) and not is_probable_prime(p * 3)
+    # Wilson's theorem: (p - 1)! = -1, so (p - 3)! = -1 / ((p - 2)(p - 1)) = -1 / 2
+    assert factorial_mod(p - 3, p) == -pow(2, -1, p) % p
+    assert factorial_mod(10 ** 18, p) == 0
+    # A composite modulus divides the product long before n
+    assert factorial_mod(10 ** 12, 2 ** 40) == 0
+    with pytest.raises(ValueError):
+        factorial_mod(MAX_MODULAR_FACTORIAL_STEPS * 10, 2 ** 89 - 1)
+    # The smallest strong pseudoprime to every fixed base is composite, so no Wilson shortcut
+    pseudoprime = 3317044064679887385961981
+    assert is_probable_prime(pseudoprime)
+    with pytest.raises(ValueError):
+        factorial_mod(pseudoprime - 4, pseudoprime)
+
+
 def test_calculate_mean():
     assert calculate_mean([1, 2, 3, 4, 5]) == 3.0
     assert calculate_mean([1.5, 2.5, 3.5]) == 2.5
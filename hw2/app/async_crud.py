@@ -0,0 +1,489 @@
+from typing import Dict, Optional, List, Sequence, Tuple
+from sqlalchemy import Row, insert, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from . import models, schemas
+from .cache import cart_cache, item_cache
+from .crud import (
+    cart_totals_reconciled_counter,
+    drifted_carts_statement,
+    increment_cart_totals,
+    lock_cart_statement,
+    query_counter,
+    query_duration_histogram,
+    reconcile_cart_totals_statement,
+    upsert_cart_items,
+)
+import time
+
+# Async counterparts of crud.py sharing its Prometheus metrics. Relationships cannot be
+# lazy-loaded on an AsyncSession, so cart items are always loaded eagerly with the cart.
+# Sessions keep objects readable after commit, so writes do not re-select the row they changed;
+# they invalidate the read-through cache of get_item_data / get_cart_data instead.
+
+
+def _select_cart(cart_id: int):
+    return select(models.Cart).options(selectinload(models.Cart.items)).where(models.Cart.id == cart_id)
+
+
+def _keyset(query, model, sort: str, after: Optional[tuple]):
+    """
+    Order by (price, id) or id and keep only the rows after the cursor key. NULL prices sort
+    last on every database (the default on Postgres, matching its indexes), and a NULL price
+    in the key means the cursor is already among them.
+    """
+    if sort != "price":
+        if after is not None:
+            query = query.where(model.id > after[0])
+        return query.order_by(model.id)
+
+    if after is not None:
+        price, row_id = after
+        if price is None:
+            query = query.where(model.price.is_(None), model.id > row_id)
+        else:
+            # A row comparison with a NULL price is NULL, so those rows are added explicitly
+            query = query.where(or_(tuple_(model.price, model.id) > tuple_(price, row_id), model.price.is_(None)))
+    return query.order_by(model.price.asc().nulls_last(), model.id)
+
+
+def _select_carts(
+        query,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_quantity: Optional[int] = None,
+        max_quantity: Optional[int] = None,
+):
+    """Carts (or cart columns) selected by `query` filtered by total price and total quantity."""
+    # Apply price filters
+    if min_price is not None:
+        query = query.where(models.Cart.price >= min_price)
+    if max_price is not None:
+        query = query.where(models.Cart.price <= max_price)
+
+    # Apply quantity filters
+    if min_quantity is not None:
+        query = query.where(models.Cart.total_quantity >= min_quantity)
+    if max_quantity is not None:
+        query = query.where(models.Cart.total_quantity <= max_quantity)
+
+    return query
+
+
+async def _cart_models(db: AsyncSession, carts: Sequence[Tuple[int, float]]) -> List[schemas.Cart]:
+    """Response models of (id, price) cart rows, with all their items fetched in one more query."""
+    items: Dict[int, List[schemas.CartItem]] = {cart_id: [] for cart_id, _ in carts}
+    if items:
+        rows = await db.execute(
+            select(
+                models.CartItem.cart_id,
+                models.CartItem.id,
+                models.CartItem.item_id,
+                models.CartItem.quantity,
+                models.CartItem.price,
+            ).where(models.CartItem.cart_id.in_(items)).order_by(models.CartItem.id)
+        )
+        # Rows come straight from the database, so the models are built without validation
+        for cart_id, cart_item_id, item_id, quantity, price in rows:
+            items[cart_id].append(
+                schemas.CartItem.model_construct(id=cart_item_id, item_id=item_id, quantity=quantity, price=price)
+            )
+    return [schemas.Cart.model_construct(id=cart_id, price=price, items=items[cart_id]) for cart_id, price in carts]
+
+
+# Columns of schemas.Item, for reads that skip ORM objects
+ITEM_COLUMNS = (models.Item.id, models.Item.name, models.Item.price, models.Item.deleted)
+
+
+def _select_items(
+        query,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        show_deleted: bool = False,
+):
+    if min_price is not None:
+        query = query.where(models.Item.price >= min_price)
+    if max_price is not None:
+        query = query.where(models.Item.price <= max_price)
+
+    if not show_deleted:
+        query = query.where(models.Item.deleted.is_(False))
+
+    return query
+
+
+def sort_key(row, sort: str) -> tuple:
+    """The cursor key of a row of items or carts for the given sort order."""
+    return (row.price, row.id) if sort == "price" else (row.id,)
+
+
+# CRUD for Item
+async def get_item(db: AsyncSession, item_id: int) -> Optional[models.Item]:
+    query_counter.labels(operation="get_item").inc()
+    start_time = time.time()
+
+    item = await db.get(models.Item, item_id)
+
+    duration = time.time() - start_time
+    query_duration_histogram.labels(operation="get_item").observe(duration)
+
+    return item
+
+
+async def get_item_data(db: AsyncSession, item_id: int) -> Optional[schemas.Item]:
+    """Read-only item through the read-through cache; writes invalidate it."""
+    async def load() -> Optional[dict]:
+        item = await get_item(db, item_id)
+        return schemas.Item.model_validate(item).model_dump() if item else None
+
+    data = await item_cache.get_or_load(item_id, load)
+    return schemas.Item(**data) if data else None
+
+
+async def create_item(db: AsyncSession, item: schemas.ItemCreate) -> models.Item:
+    query_counter.labels(operation="create_item").inc()
+    start_time = time.time()
+
+    db_item = models.Item(**item.dict())
+    db.add(db_item)
+    await db.commit()
+    await db.refresh(db_item)
+
+    duration = time.time() - start_time
+    query_duration_histogram.labels(operation="create_item").observe(duration)
+
+    return db_item
+
+
+async def create_items(db: AsyncSession, items: List[schemas.ItemCreate]) -> List[Row]:
+    """Insert the items with a single multi-row INSERT ... RETURNING in one transaction; rows of ITEM_COLUMNS in input order."""
+    query_counter.labels(operation="create_items").inc()
+    start_time = time.time()
+
+    rows = []
+    if items:
+        statement = insert(models.Item).returning(*ITEM_COLUMNS, sort_by_parameter_order=True)
+        rows = list((await db.execute(statement, [item.model_dump() for item in items])).all())
+        await db.commit()
+
+    duration = time.time() - start_time
+    query_duration_histogram.labels(operation="create_items").observe(duration)
+
+    return rows
+
+
+async def get_items_by_ids(db: AsyncSession, item_ids: List[int]) -> Tuple[List[Row], List[int]]:
+    """
+    Rows of ITEM_COLUMNS for the given ids with a single IN query, in the order of `item_ids`.
+    Deleted items count as missing, like for get_item_data.
+
+    Returns:
+        Tuple[List[Row], List[int]]: The rows found and the ids that were not.
+    """
+    query_counter.labels(operation="get_items_by_ids").inc()
+    start_time = time.time()
+
+    found = {}
+    if item_ids:
+        query = select(*ITEM_COLUMNS).where(models.Item.id.in_(set(item_ids)), models.Item.deleted.is_(False))
+        found = {row.id: row for row in await db.execute(query)}
+
+    duration = time.time() - start_time
+    query_duration_histogram.labels(operation="get_items_by_ids").observe(duration)
+
+    return [found[i] for i in item_ids if i in found], [i for i in item_ids if i not in found]
+
+
+async def update_item(db: AsyncSession, item_id: int, item: schemas.ItemCreate) -> Optional[models.Item]:
+    query_counter.labels(operation="update_item").inc()
+    start_time = time.time()
+
+    db_item = await db.get(models.Item, item_id)
+    if db_item:
+        db_item.name = item.name
+        db_item.price = item.price
+        await db.commit()
+        await item_cache.invalidate(item_id)
+
+    duration = time.time() - start_time
+    query_duration_histogram.labels(operation="update_item").observe(duration)
+
+    return db_item
+
+
+async def soft_delete_item(db: AsyncSession, item_id: int) -> Optional[models.Item]:
+    query_counter.labels(operation="soft_delete_item").inc()
+    start_time = time.time()
+
+    db_item = await db.get(models.Item, item_id)
+    if db_item:
+        db_item.deleted = True
+        await db.commit()
+        await item_cache.invalidate(item_id)
+
+    duration = time.time() - start_time
+    query_duration_histogram.labels(operation="soft_delete_item").observe(duration)
+
+    return db_item
+
+
+async def patch_item(db: AsyncSession, db_item: models.Item, fields: dict) -> models.Item:
+    query_counter.labels(operation="patch_item").inc()
+    start_time = time.time()
+
+    # PATCH may rewrite the id, so the entry cached under the old one goes too.
+    item_id = db_item.id
+    for key, value in fields.items():
+        setattr(db_item, key, value)
+    await db.commit()
+    await item_cache.invalidate(item_id)
+    if db_item.id != item_id:
+        await item_cache.invalidate(db_item.id)
+
+    duration = time.time() - start_time
+    query_duration_histogram.labels(operation="patch_item").observe(duration)
+
+    return db_item
+
+
+async def get_items(
+        db: AsyncSession,
+        offset: int = 0,
+        limit: int = 10,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        show_deleted: bool = False,
+) -> List[models.Item]:
+    query_counter.labels(operation="get_items").inc()
+    start_time = time.time()
+
+    query = _select_items(select(models.Item), min_price, max_price, show_deleted)
+    items = list((await db.scalars(query.offset(offset).limit(limit))).all())
+
+    duration = time.time() - start_time
+    query_duration_histogram.labels(operation="get_items").observe(duration)
+
+    return items
+
+
+async def get_items_after(
+        db: AsyncSession,
+        after: Optional[tuple] = None,
+        sort: str = "id",
+        limit: int = 10,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        show_deleted: bool = False,
+) -> List[models.Item]:
+    """Keyset pagination: the page of items following the `after` key of a cursor, in `sort` order."""
+    query_counter.labels(operation="get_items_after").inc()
+    start_time = time.time()
+
+    query = _keyset(_select_items(select(models.Item), min_price, max_price, show_deleted), models.Item, sort, after)
+    items = list((await db.scalars(query.limit(limit))).all())
+
+    duration = time.time() - start_time
+    query_duration_histogram.labels(operation="get_items_after").observe(duration)
+
+    return items
+
+
+async def get_item_rows(
+        db: AsyncSession,
+        offset: int = 0,
+        limit: int = 10,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        show_deleted: bool = False,
+        after: Optional[tuple] = None,
+        sort: Optional[str] = None,
+) -> List[Row]:
+    """
+    The items of get_items, or of get_items_after when `sort` is given, as rows of ITEM_COLUMNS
+    rather than ORM objects, for encoding with encoding.encode_rows.
+    """
+    query_counter.labels(operation="get_item_rows").inc()
+    start_time = time.time()
+
+    query = _select_items(select(*ITEM_COLUMNS), min_price, max_price, show_deleted)
+    query = query.offset(offset) if sort is None else _keyset(query, models.Item, sort, after)
+    rows = list((await db.execute(query.limit(limit))).all())
+
+    duration = time.time() - start_time
+    query_duration_histogram.labels(operation="get_item_rows").observe(duration)
+
+    return rows
+
+
+# CRUD for Cart
+async def create_cart(db: AsyncSession) -> models.Cart:
+    query_counter.labels(operation="create_cart").inc()
+    start_time = time.time()
+
+    db_cart = models.Cart(price=0.0, total_quantity=0, items=[])
+    db.add(db_cart)
+    await db.commit()
+
+    duration = time.time() - start_time
+    query_duration_histogram.labels(operation="create_cart").observe(duration)
+
+    return db_cart
+
+
+async def get_cart(db: AsyncSession, cart_id: int) -> Optional[models.Cart]:
+    query_counter.labels(operation="get_cart").inc()
+    start_time = time.time()
+
+    cart = (await db.scalars(_select_cart(cart_id))).first()
+
+    duration = time.time() - start_time
+    query_duration_histogram.labels(operation="get_cart").observe(duration)
+
+    return cart
+
+
+async def get_cart_data(db: AsyncSession, cart_id: int) -> Optional[schemas.Cart]:
+    """Read-only cart with its items through the read-through cache; add_item_to_cart invalidates it."""
+    async def load() -> Optional[dict]:
+        query_counter.labels(operation="get_cart_data").inc()
+        start_time = time.time()
+
+        carts = (await db.execute(select(models.Cart.id, models.Cart.price).where(models.Cart.id == cart_id))).all()
+        cart = (await _cart_models(db, carts))[0].model_dump() if carts else None
+
+        duration = time.time() - start_time
+        query_duration_histogram.labels(operation="get_cart_data").observe(duration)
+
+        return cart
+
+    data = await cart_cache.get_or_load(cart_id, load)
+    return schemas.Cart(**data) if data else None
+
+
+async def add_item_to_cart(db: AsyncSession, cart_id: int, item_id: int, quantity: int = 1) -> Optional[models.Cart]:
+    return await add_items_to_cart(db, cart_id, {item_id: quantity}, operation="add_item_to_cart")
+
+
+async def add_items_to_cart(
+        db: AsyncSession,
+        cart_id: int,
+        quantities: Dict[int, int],
+        operation: str = "add_items_to_cart",
+) -> Optional[models.Cart]:
+    """Add `quantities[item_id]` of each item to the cart in one transaction; None if the cart does not exist."""
+    query_counter.labels(operation=operation).inc()
+    start_time = time.time()
+
+    if quantities:
+        await db.execute(lock_cart_statement(cart_id))
+        rows = (await db.execute(upsert_cart_items(db.bind.dialect.name, cart_id, quantities))).all()
+        if rows:
+            await db.execute(increment_cart_totals(cart_id, rows, quantities))
+        await db.commit()
+        await cart_cache.invalidate(cart_id)
+
+    cart = (await db.scalars(_select_cart(cart_id).execution_options(populate_existing=True))).first()
+
+    duration = time.time() - start_time
+    query_duration_histogram.labels(operation=operation).observe(duration)
+
+    return cart
+
+
+async def get_carts(
+        db: AsyncSession,
+        offset: int = 0,
+        limit: int = 10,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_quantity: Optional[int] = None,
+        max_quantity: Optional[int] = None,
+) -> List[models.Cart]:
+    query_counter.labels(operation="get_carts").inc()
+    start_time = time.time()
+
+    query = _select_carts(
+        select(models.Cart).options(selectinload(models.Cart.items)),
+        min_price, max_price, min_quantity, max_quantity,
+    )
+    carts = list((await db.scalars(query.order_by(models.Cart.id).offset(offset).limit(limit))).all())
+
+    duration = time.time() - start_time
+    query_duration_histogram.labels(operation="get_carts").observe(duration)
+
+    return carts
+
+
+async def get_carts_after(
+        db: AsyncSession,
+        after: Optional[tuple] = None,
+        sort: str = "id",
+        limit: int = 10,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_quantity: Optional[int] = None,
+        max_quantity: Optional[int] = None,
+) -> List[models.Cart]:
+    """Keyset pagination: the page of carts following the `after` key of a cursor, in `sort` order."""
+    query_counter.labels(operation="get_carts_after").inc()
+    start_time = time.time()
+
+    query = _select_carts(
+        select(models.Cart).options(selectinload(models.Cart.items)),
+        min_price, max_price, min_quantity, max_quantity,
+    )
+    carts = list((await db.scalars(_keyset(query, models.Cart, sort, after).limit(limit))).all())
+
+    duration = time.time() - start_time
+    query_duration_histogram.labels(operation="get_carts_after").observe(duration)
+
+    return carts
+
+
+async def get_carts_data(
+        db: AsyncSession,
+        offset: int = 0,
+        limit: int = 10,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_quantity: Optional[int] = None,
+        max_quantity: Optional[int] = None,
+        after: Optional[tuple] = None,
+        sort: Optional[str] = None,
+) -> List[schemas.Cart]:
+    """
+    Response models of the carts of get_carts, or of get_carts_after when `sort` is given, read in two
+    queries whatever the page size: the (id, price) page of carts, then the items of all of them.
+    """
+    query_counter.labels(operation="get_carts_data").inc()
+    start_time = time.time()
+
+    query = _select_carts(select(models.Cart.id, models.Cart.price), min_price, max_price, min_quantity, max_quantity)
+    query = query.order_by(models.Cart.id).offset(offset) if sort is None else _keyset(query, models.Cart, sort, after)
+    carts = await _cart_models(db, (await db.execute(query.limit(limit))).all())
+
+    duration = time.time() - start_time
+    query_duration_histogram.labels(operation="get_carts_data").observe(duration)
+
+    return carts
+
+
+async def reconcile_cart_totals(db: AsyncSession) -> int:
+    """Backfill or repair the denormalized cart totals from the cart items; returns the number of carts fixed."""
+    query_counter.labels(operation="reconcile_cart_totals").inc()
+    start_time = time.time()
+
+    # Under READ COMMITTED the carts are locked first, so each recomputation sees every committed add
+    cart_ids = (await db.scalars(drifted_carts_statement())).all()
+    if cart_ids:
+        cart_ids = (await db.scalars(reconcile_cart_totals_statement(cart_ids))).all()
+    await db.commit()
+    cart_totals_reconciled_counter.inc(len(cart_ids))
+    # Cached carts may hold the drifted price
+    for cart_id in cart_ids:
+        await cart_cache.invalidate(cart_id)
+
+    duration = time.time() - start_time
+    query_duration_histogram.labels(operation="reconcile_cart_totals").observe(duration)
+
+    return len(cart_ids)
@@ -0,0 +1,217 @@
+import codecs
+import csv
+import io
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Tuple
+from prometheus_client import Counter, Gauge
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models, schemas
+from .async_crud import ITEM_COLUMNS
+from .crud import query_counter, query_duration_histogram
+from .encoding import dumps
+
+# Prometheus Metrics; rate(bulk_rows_total) gives the throughput of running jobs
+bulk_rows_counter = Counter('bulk_rows_total', 'Rows imported or exported in bulk', ['operation', 'format'])
+bulk_bytes_counter = Counter('bulk_bytes_total', 'Bytes read by bulk imports or written by bulk exports', ['operation', 'format'])
+bulk_in_progress_gauge = Gauge('bulk_in_progress', 'Bulk imports or exports running', ['operation'])
+bulk_rows_per_second_gauge = Gauge('bulk_rows_per_second', 'Throughput of the last finished bulk job', ['operation'])
+
+# Rows per INSERT or COPY on import, and per server-side cursor fetch on export
+BULK_CHUNK_ROWS = int(os.environ.get("BULK_CHUNK_ROWS", 5000))
+# Longest line or record (in characters) and most lines a quoted CSV field may span before the import fails
+BULK_MAX_RECORD_CHARS = int(os.environ.get("BULK_MAX_RECORD_CHARS", 1024 * 1024))
+BULK_MAX_RECORD_LINES = int(os.environ.get("BULK_MAX_RECORD_LINES", 1000))
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+IMPORT_COLUMNS = ("name", "price", "deleted")
+EXPORT_FIELDS = tuple(column.key for column in ITEM_COLUMNS)
+
+
+class BulkImportError(ValueError):
+    """A line of the imported file is malformed; nothing was imported."""
+
+
+async def _lines(chunks: AsyncIterator[bytes], file_format: str) -> AsyncIterator[str]:
+    """
+    Lines of a UTF-8 byte stream, holding at most one chunk and one unfinished line in memory.
+
+    Raises:
+        BulkImportError: If a line is longer than BULK_MAX_RECORD_CHARS.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    # Pieces of the unfinished line, joined once its end arrives
+    pending: List[str] = []
+    pending_chars = 0
+    number = 0
+    async for chunk in chunks:
+        bulk_bytes_counter.labels(operation="import", format=file_format).inc(len(chunk))
+        *lines, tail = decoder.decode(chunk).split("\n")
+        if lines:
+            lines[0] = "".join(pending) + lines[0]
+            pending = []
+            pending_chars = 0
+        for line in lines:
+            number += 1
+            if len(line) > BULK_MAX_RECORD_CHARS:
+                raise BulkImportError(f"Line {number}: line is too long")
+            yield line
+        pending.append(tail)
+        pending_chars += len(tail)
+        if pending_chars > BULK_MAX_RECORD_CHARS:
+            raise BulkImportError(f"Line {number + 1}: line is too long")
+    pending.append(decoder.decode(b"", final=True))
+    line = "".join(pending)
+    if len(line) > BULK_MAX_RECORD_CHARS:
+        raise BulkImportError(f"Line {number + 1}: line is too long")
+    if line:
+        yield line
+
+
+async def _records(lines: AsyncIterator[str], file_format: str) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """(line number, record) pairs of NDJSON objects or of CSV rows keyed by the header."""
+    number = 0
+    if file_format == "ndjson":
+        async for line in lines:
+            number += 1
+            if line.strip():
+                try:
+                    yield number, json.loads(line)
+                except ValueError:
+                    raise BulkImportError(f"Line {number}: invalid JSON") from None
+        return
+
+    header = None
+    record: List[str] = []
+    record_chars = 0
+    quoted = False
+    async for line in lines:
+        number += 1
+        record.append(line)
+        record_chars += len(line) + 1
+        # A quoted field spans lines while its quotes are unbalanced ("" escapes a quote)
+        quoted ^= line.count('"') % 2 == 1
+        if quoted:
+            if record_chars > BULK_MAX_RECORD_CHARS or len(record) >= BULK_MAX_RECORD_LINES:
+                raise BulkImportError(f"Line {number}: quoted field is too long")
+            continue
+        fields = next(csv.reader(["\n".join(record)]), [])
+        record = []
+        record_chars = 0
+        if not fields:
+            continue
+        if header is None:
+            header = [name.strip() for name in fields]
+            continue
+        yield number, {name: value for name, value in zip(header, fields) if value != ""}
+    if record:
+        raise BulkImportError(f"Line {number}: unterminated quoted field")
+
+
+@asynccontextmanager
+async def _chunk_writer(db: AsyncSession) -> AsyncIterator[Callable[[List[Dict[str, Any]]], Awaitable[None]]]:
+    """
+    Writes chunks of item rows in a single transaction: COPY on Postgres (asyncpg),
+    multi-row INSERTs elsewhere. The transaction is rolled back if the block raises.
+    """
+    connection = await db.connection()
+    if connection.dialect.driver == "asyncpg":
+        driver_connection = (await connection.get_raw_connection()).driver_connection
+
+        async def copy(rows: List[Dict[str, Any]]) -> None:
+            records = [tuple(row[column] for column in IMPORT_COLUMNS) for row in rows]
+            await driver_connection.copy_records_to_table(
+                models.Item.__tablename__, records=records, columns=IMPORT_COLUMNS,
+            )
+
+        async with driver_connection.transaction():
+            yield copy
+        return
+
+    async def insert_rows(rows: List[Dict[str, Any]]) -> None:
+        await db.execute(insert(models.Item), rows)
+
+    try:
+        yield insert_rows
+    except BaseException:
+        await db.rollback()
+        raise
+    await db.commit()
+
+
+async def import_items(db: AsyncSession, chunks: AsyncIterator[bytes], file_format: str) -> int:
+    """
+    Insert the items of an NDJSON or CSV byte stream (name, price and optionally deleted; other
+    fields such as id are ignored), all or nothing. Returns the number of items imported.
+
+    Raises:
+        BulkImportError: If a line is malformed.
+    """
+    query_counter.labels(operation="import_items").inc()
+    start_time = time.time()
+    imported = 0
+
+    with bulk_in_progress_gauge.labels(operation="import").track_inprogress():
+        async with _chunk_writer(db) as write:
+            rows: List[Dict[str, Any]] = []
+            async for number, record in _records(_lines(chunks, file_format), file_format):
+                try:
+                    rows.append(schemas.ItemImport.model_validate(record).model_dump())
+                except ValidationError as e:
+                    raise BulkImportError(f"Line {number}: {e.errors()[0]['msg']}") from None
+                if len(rows) >= BULK_CHUNK_ROWS:
+                    await write(rows)
+                    imported += len(rows)
+                    bulk_rows_counter.labels(operation="import", format=file_format).inc(len(rows))
+                    rows = []
+            if rows:
+                await write(rows)
+                imported += len(rows)
+                bulk_rows_counter.labels(operation="import", format=file_format).inc(len(rows))
+
+    duration = time.time() - start_time
+    query_duration_histogram.labels(operation="import_items").observe(duration)
+    bulk_rows_per_second_gauge.labels(operation="import").set(imported / duration if duration else 0.0)
+
+    return imported
+
+
+def _encode(rows: List[Any], file_format: str) -> bytes:
+    if file_format == "ndjson":
+        return b"".join(dumps(dict(zip(EXPORT_FIELDS, row))) + b"\n" for row in rows)
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(
+        (item_id, name, price, "true" if deleted else "false") for item_id, name, price, deleted in rows
+    )
+    return buffer.getvalue().encode("utf-8")
+
+
+async def export_items(db: AsyncSession, file_format: str) -> AsyncIterator[bytes]:
+    """All items, deleted ones included, as NDJSON or CSV chunks read through a server-side cursor."""
+    query_counter.labels(operation="export_items").inc()
+    start_time = time.time()
+    exported = 0
+
+    with bulk_in_progress_gauge.labels(operation="export").track_inprogress():
+        if file_format == "csv":
+            yield (",".join(EXPORT_FIELDS) + "\n").encode("utf-8")
+        query = select(*ITEM_COLUMNS).order_by(models.Item.id).execution_options(yield_per=BULK_CHUNK_ROWS)
+        result = await db.stream(query)
+        async for rows in result.partitions():
+            data = _encode(rows, file_format)
+            exported += len(rows)
+            bulk_rows_counter.labels(operation="export", format=file_format).inc(len(rows))
+            bulk_bytes_counter.labels(operation="export", format=file_format).inc(len(data))
+            yield data
+
+    duration = time.time() - start_time
+    query_duration_histogram.labels(operation="export_items").observe(duration)
+    bulk_rows_per_second_gauge.labels(operation="export").set(exported / duration if duration else 0.0)
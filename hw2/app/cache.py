@@ -0,0 +1,203 @@
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from prometheus_client import Counter, Gauge
+
+# Prometheus Metrics
+cache_hits_counter = Counter('cache_hits_total', 'Read-through cache hits', ['cache', 'layer'])
+cache_misses_counter = Counter('cache_misses_total', 'Read-through cache misses (loaded from the database)', ['cache'])
+cache_invalidations_counter = Counter('cache_invalidations_total', 'Read-through cache invalidations', ['cache'])
+cache_hit_ratio_gauge = Gauge('cache_hit_ratio', 'Share of lookups answered by the cache since startup', ['cache'])
+cache_entries_gauge = Gauge('cache_entries', 'Entries in the in-process cache', ['cache'])
+
+
+class CacheBackend(ABC):
+    """Shared cache storage (e.g. Redis) holding JSON-encoded values with a TTL."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+
+class FakeBackend(CacheBackend):
+    """In-memory stand-in for a shared backend, for tests and local runs."""
+
+    def __init__(self) -> None:
+        self.data: Dict[str, Tuple[bytes, float]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self.data.get(key)
+        if entry is None or entry[1] < time.monotonic():
+            self.data.pop(key, None)
+            return None
+        return entry[0]
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.data[key] = (value, time.monotonic() + ttl)
+
+    async def delete(self, key: str) -> None:
+        self.data.pop(key, None)
+
+
+class RedisBackend(CacheBackend):
+    """Shared backend on Redis; needs the optional `redis` package."""
+
+    def __init__(self, url: str) -> None:
+        import redis.asyncio
+
+        self.client = redis.asyncio.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.client.set(key, value, px=int(ttl * 1000))
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(key)
+
+
+class TTLCache:
+    """In-process LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def set(self, key: str, value: Any) -> None:
+        self.entries[key] = (value, time.monotonic() + self.ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self.entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class ReadThroughCache:
+    """
+    Two-level read-through cache of JSON-able values: an in-process TTL+LRU in front of an
+    optional shared backend. Values are plain dicts, never ORM objects, so they can be shared
+    between sessions and processes. Callers must not mutate the returned value.
+
+    A value loaded while an invalidation happened is not stored, so a slow reader cannot put
+    back a row that a concurrent write just changed. Other processes keep their in-process
+    copy until it expires, which bounds their staleness by the TTL.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            max_entries: int = 10_000,
+            ttl: float = 30.0,
+            backend: Optional[CacheBackend] = None,
+    ) -> None:
+        self.name = name
+        self.ttl = ttl
+        self.local = TTLCache(max_entries, ttl)
+        self.backend = backend
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        cache_hit_ratio_gauge.labels(cache=name).set_function(self.hit_ratio)
+        cache_entries_gauge.labels(cache=name).set_function(lambda: len(self.local))
+
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _key(self, key: Any) -> str:
+        return f"{self.name}:{key}"
+
+    async def get_or_load(self, key: Any, loader: Callable[[], Awaitable[Optional[dict]]]) -> Optional[dict]:
+        """
+        Return the cached value of `key`, calling `loader` on a miss. None results are not cached.
+
+        Args:
+            key (Any): The identifier, e.g. a primary key.
+            loader (Callable[[], Awaitable[Optional[dict]]]): Loads the value from the database.
+
+        Returns:
+            Optional[dict]: The value, or None when the loader found nothing.
+        """
+        cache_key = self._key(key)
+        value = self.local.get(cache_key)
+        if value is not None:
+            self.hits += 1
+            cache_hits_counter.labels(cache=self.name, layer="local").inc()
+            return value
+
+        generation = self.generation
+        if self.backend is not None:
+            encoded = await self.backend.get(cache_key)
+            if encoded is not None:
+                value = json.loads(encoded)
+                self.hits += 1
+                cache_hits_counter.labels(cache=self.name, layer="shared").inc()
+                if generation == self.generation:
+                    self.local.set(cache_key, value)
+                return value
+
+        self.misses += 1
+        cache_misses_counter.labels(cache=self.name).inc()
+        value = await loader()
+        if value is not None and generation == self.generation:
+            self.local.set(cache_key, value)
+            if self.backend is not None:
+                await self.backend.set(cache_key, json.dumps(value).encode("utf-8"), self.ttl)
+        return value
+
+    async def invalidate(self, key: Any) -> None:
+        cache_key = self._key(key)
+        self.generation += 1
+        cache_invalidations_counter.labels(cache=self.name).inc()
+        self.local.delete(cache_key)
+        if self.backend is not None:
+            await self.backend.delete(cache_key)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self.local.entries.clear()
+
+
+def default_backend() -> Optional[CacheBackend]:
+    """The shared backend configured by CACHE_BACKEND_URL: a redis:// URL, "fake", or none."""
+    url = os.environ.get("CACHE_BACKEND_URL")
+    if not url:
+        return None
+    if url == "fake":
+        return FakeBackend()
+    return RedisBackend(url)
+
+
+CACHE_TTL_SECONDS = float(os.environ.get("CACHE_TTL_SECONDS", 30))
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 10_000))
+
+_backend = default_backend()
+item_cache = ReadThroughCache("item", CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS, _backend)
+cart_cache = ReadThroughCache("cart", CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS, _backend)
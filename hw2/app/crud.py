@@ -1,6 +1,7 @@
-from typing import Optional, List
+from typing import Dict, Optional, List
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import Integer, case, func, literal, or_, select, update
 from . import models, schemas
 from prometheus_client import Counter, Histogram
 import time
@@ -8,6 +9,93 @@ import time
 # Prometheus Metrics
 query_counter = Counter('db_queries_total', 'Total number of database queries', ['operation'])
 query_duration_histogram = Histogram('db_query_duration_seconds', 'Histogram of query durations', ['operation'])
+cart_totals_reconciled_counter = Counter(
+    'cart_totals_reconciled_total', 'Carts whose denormalized price or total quantity had drifted and was corrected'
+)
+
+# INSERT constructs supporting ON CONFLICT DO UPDATE, by dialect name
+UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def upsert_cart_items(dialect_name: str, cart_id: int, quantities: Dict[int, int]):
+    """
+    Single statement adding items to a cart: rows of items already in the cart get their
+    quantity incremented and keep the price they were added at. Unknown items, or all of them
+    when the cart does not exist, are skipped.
+
+    Returns (item_id, price) of the affected cart items; the cart price grows by price * quantities[item_id]
+    and its total quantity by quantities[item_id].
+    """
+    added = select(
+        literal(cart_id, Integer),
+        models.Item.id,
+        case(quantities, value=models.Item.id),
+        models.Item.price,
+    ).where(
+        models.Item.id.in_(quantities),
+        select(models.Cart.id).where(models.Cart.id == cart_id).exists(),
+    )
+    statement = UPSERT_INSERTS[dialect_name](models.CartItem).from_select(
+        ["cart_id", "item_id", "quantity", "price"], added,
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[models.CartItem.cart_id, models.CartItem.item_id],
+        set_={"quantity": models.CartItem.quantity + statement.excluded.quantity},
+    )
+    return statement.returning(models.CartItem.item_id, models.CartItem.price)
+
+
+def increment_cart_totals(cart_id: int, rows, quantities: Dict[int, int]):
+    """UPDATE of the cart price and total quantity for the (item_id, price) rows of upsert_cart_items."""
+    return update(models.Cart).where(models.Cart.id == cart_id).values(
+        price=models.Cart.price + sum(price * quantities[item_id] for item_id, price in rows),
+        total_quantity=models.Cart.total_quantity + sum(quantities[item_id] for item_id, _ in rows),
+    )
+
+
+def lock_cart_statement(cart_id: int):
+    """
+    SELECT ... FOR UPDATE of the cart row. Writers of cart items take it before touching them, so
+    reconcile_cart_totals, which locks the carts it recomputes, never works from a stale sum.
+    """
+    return select(models.Cart.id).where(models.Cart.id == cart_id).with_for_update()
+
+
+def _cart_item_totals():
+    """Scalar subqueries of the price and total quantity of a cart computed from its items."""
+    price = select(func.coalesce(func.sum(models.CartItem.price * models.CartItem.quantity), 0.0)).where(
+        models.CartItem.cart_id == models.Cart.id
+    ).scalar_subquery()
+    quantity = select(func.coalesce(func.sum(models.CartItem.quantity), 0)).where(
+        models.CartItem.cart_id == models.Cart.id
+    ).scalar_subquery()
+    # Float sums may differ in the last bits depending on the order they were added in
+    drifted = or_(
+        models.Cart.total_quantity != quantity,
+        models.Cart.price.is_(None),
+        func.abs(models.Cart.price - price) > 1e-6,
+    )
+    return price, quantity, drifted
+
+
+def drifted_carts_statement():
+    """SELECT ... FOR UPDATE of the ids of the carts whose price or total quantity drifted, in id order."""
+    _, _, drifted = _cart_item_totals()
+    return select(models.Cart.id).where(drifted).order_by(models.Cart.id).with_for_update()
+
+
+def reconcile_cart_totals_statement(cart_ids: List[int]):
+    """
+    UPDATE recomputing the denormalized totals of the given carts (locked by drifted_carts_statement
+    in the same transaction) that still drifted; returns their ids.
+    """
+    price, quantity, drifted = _cart_item_totals()
+    return update(models.Cart).where(models.Cart.id.in_(cart_ids), drifted).values(
+        price=price, total_quantity=quantity,
+    ).returning(models.Cart.id).execution_options(synchronize_session=False)
 
 
 # CRUD for Item
@@ -128,30 +216,6 @@ def get_cart(db: Session, cart_id: int) -> Optional[models.Cart]:
     return cart
 
 
-def add_item_to_cart(db: Session, cart_id: int, item_id: int, quantity: int = 1) -> Optional[models.Cart]:
-    query_counter.labels(operation="add_item_to_cart").inc()
-    start_time = time.time()
-
-    cart = db.query(models.Cart).filter(models.Cart.id == cart_id).first()
-    item = db.query(models.Item).filter(models.Item.id == item_id).first()
-
-    if cart and item:
-        cart_item = models.CartItem(cart_id=cart_id, item_id=item_id, quantity=quantity, price=item.price)
-        db.add(cart_item)
-        db.commit()
-
-        # Recalculate cart total price
-        total_price = sum(ci.price * ci.quantity for ci in cart.items)
-        cart.price = total_price
-        db.commit()
-        db.refresh(cart)
-
-    duration = time.time() - start_time
-    query_duration_histogram.labels(operation="add_item_to_cart").observe(duration)
-
-    return cart
-
-
 def get_carts(
         db: Session,
         offset: int = 0,
@@ -164,7 +228,7 @@ def get_carts(
     query_counter.labels(operation="get_carts").inc()
     start_time = time.time()
 
-    query = db.query(models.Cart).join(models.CartItem)
+    query = db.query(models.Cart)
 
     # Apply price filters
     if min_price is not None:
@@ -172,15 +236,13 @@ def get_carts(
     if max_price is not None:
         query = query.filter(models.Cart.price <= max_price)
 
-    query = query.group_by(models.Cart.id)
-
     # Apply quantity filters
     if min_quantity is not None:
-        query = query.having(func.sum(models.CartItem.quantity) >= min_quantity)
+        query = query.filter(models.Cart.total_quantity >= min_quantity)
     if max_quantity is not None:
-        query = query.having(func.sum(models.CartItem.quantity) <= max_quantity)
+        query = query.filter(models.Cart.total_quantity <= max_quantity)
 
-    carts = query.offset(offset).limit(limit).all()
+    carts = query.order_by(models.Cart.id).offset(offset).limit(limit).all()
 
     duration = time.time() - start_time
     query_duration_histogram.labels(operation="get_carts").observe(duration)
@@ -1,26 +1,157 @@
+import asyncio
+import os
 import time
-from sqlalchemy import create_engine
+from typing import Optional
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateColumn
+from .pool import TimedAsyncAdaptedQueuePool, TimedQueuePool, instrument_pool
 
 
-SQLALCHEMY_DATABASE_URL = "postgresql://myuser:mypassword@db/online_store"
+SQLALCHEMY_DATABASE_URL = os.environ.get("DATABASE_URL", "postgresql+psycopg2://myuser:mypassword@db/online_store")
+
+# Async drivers for the sync URLs: asyncpg in production, aiosqlite for local runs and tests
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme.split('+', 1)[0], scheme)}://{rest}"
+
+
+ASYNC_DATABASE_URL = os.environ.get("ASYNC_DATABASE_URL", to_async_url(SQLALCHEMY_DATABASE_URL))
 
-engine = None
-for _ in range(100):  # Retry 10 times
-    try:
-        engine = create_engine(SQLALCHEMY_DATABASE_URL)
-        break
-    except OperationalError:
-        print("Database not ready, retrying in 2 seconds...")
-        time.sleep(30)
-else:
-    raise Exception("Could not connect to the database after 10 retries.")
+
+def pool_options() -> dict:
+    """Connection pool settings shared by both engines, read from the environment."""
+    return {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+        # Seconds after which a connection is replaced, -1 to keep connections forever
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": os.environ.get("DB_POOL_PRE_PING", "1") != "0",
+    }
+
+
+# Creating an engine does not connect: the first connection is opened on the first checkout,
+# so importing this module never blocks on the database (see wait_for_database)
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL, poolclass=TimedQueuePool, pool_logging_name="sync", **pool_options(),
+)
+instrument_pool(engine, "sync")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Async engine used by the endpoints; objects stay readable after commit, as nothing can be lazy-loaded
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, poolclass=TimedAsyncAdaptedQueuePool, pool_logging_name="async", **pool_options(),
+)
+instrument_pool(async_engine.sync_engine, "async")
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Set once the database answered and the tables exist
+database_ready = asyncio.Event()
+
+
+def create_missing_indexes(connection) -> None:
+    """create_all skips existing tables, so add indexes declared after a table was created."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def create_missing_columns(connection) -> None:
+    """Add columns declared after a table was created; they need a server default or to be nullable."""
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=connection.dialect)
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+
+
+def merge_duplicate_cart_items(connection) -> None:
+    """
+    Before the unique (cart_id, item_id) index exists, adding an item again inserted another cart_items
+    row. Merge such rows into the oldest one, summing the quantities and keeping the total price, so
+    the index can be created.
+    """
+    indexes = {index["name"] for index in inspect(connection).get_indexes("cart_items")}
+    if "uq_cart_items_cart_id_item_id" in indexes:
+        return
+    duplicated = (
+        "SELECT MIN(id) FROM cart_items WHERE cart_id IS NOT NULL AND item_id IS NOT NULL "
+        "GROUP BY cart_id, item_id HAVING COUNT(*) > 1"
+    )
+    same_item = "d.cart_id = cart_items.cart_id AND d.item_id = cart_items.item_id"
+    connection.execute(text(
+        f"UPDATE cart_items SET "
+        f"price = (SELECT SUM(d.price * d.quantity) / SUM(d.quantity) FROM cart_items d WHERE {same_item}), "
+        f"quantity = (SELECT SUM(d.quantity) FROM cart_items d WHERE {same_item}) "
+        f"WHERE id IN ({duplicated})"
+    ))
+    connection.execute(text(
+        "DELETE FROM cart_items WHERE cart_id IS NOT NULL AND item_id IS NOT NULL AND id NOT IN "
+        "(SELECT MIN(id) FROM cart_items GROUP BY cart_id, item_id)"
+    ))
+
+
+async def wait_for_database(
+        initial_delay: float = 0.5,
+        max_delay: float = 30.0,
+        timeout: Optional[float] = None,
+) -> None:
+    """
+    Create the tables as soon as the database accepts connections, retrying with exponential backoff.
+
+    Only connection failures (OperationalError, OSError) are retried, for at most `timeout` seconds
+    (DB_WAIT_TIMEOUT, 300 by default); any other error, or the last failure, is raised.
+    """
+    if timeout is None:
+        timeout = float(os.environ.get("DB_WAIT_TIMEOUT", 300))
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while True:
+        try:
+            async with async_engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                await conn.run_sync(create_missing_columns)
+                await conn.run_sync(merge_duplicate_cart_items)
+                await conn.run_sync(create_missing_indexes)
+            database_ready.set()
+            return
+        except (OperationalError, OSError) as e:
+            if time.monotonic() + delay > deadline:
+                raise
+            print(f"Database not ready ({e.__class__.__name__}), retrying in {delay:.1f} seconds...")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
+
+
+async def ping_database(timeout: float = 2.0) -> bool:
+    """Whether the tables were created and the database answers a trivial query within `timeout`."""
+    if not database_ready.is_set():
+        return False
+
+    async def select_one() -> None:
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    try:
+        await asyncio.wait_for(select_one(), timeout)
+        return True
+    except Exception:
+        return False
+
 
 def get_db():
     db = SessionLocal()
@@ -28,3 +159,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
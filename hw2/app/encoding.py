@@ -0,0 +1,19 @@
+import json
+from typing import Any, Iterable, Sequence
+
+# orjson is optional: the stdlib encoder gives the same JSON, only slower
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def encode_rows(fields: Sequence[str], rows: Iterable[Sequence[Any]]) -> bytes:
+    """JSON array of objects for the column tuples of a query, encoded without ORM objects or pydantic."""
+    return dumps([dict(zip(fields, row)) for row in rows])
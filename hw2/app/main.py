@@ -1,19 +1,31 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Query, WebSocket
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from fastapi import FastAPI, Depends, HTTPException, status, Query, Request, Response, WebSocket
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from prometheus_fastapi_instrumentator import Instrumentator
+import asyncio
+import os
+import traceback
 import psutil
 from prometheus_client import Gauge
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from .chat import websocket_endpoint
-from . import schemas, crud
-from .database import engine, Base, get_db
-
-
-# Create a FastAPI instance and initialize the database
+from . import bulk, schemas, async_crud
+from .encoding import dumps, encode_rows
+from .pagination import SORT_KEYS, decode_cursor, encode_cursor
+from .database import (
+    AsyncSessionLocal,
+    async_engine,
+    database_ready,
+    get_async_db,
+    ping_database,
+    wait_for_database,
+)
+
+
+# Create a FastAPI instance
 app = FastAPI()
-Base.metadata.create_all(bind=engine)
 
 # Instrument the app with Prometheus metrics
 instrumentator = Instrumentator()
@@ -35,15 +47,50 @@ def update_system_metrics():
     network_io_gauge.set(network_io.bytes_sent + network_io.bytes_recv)
 
 
+# Repair the denormalized cart totals if they drifted from the cart items
+async def reconcile_carts():
+    if not database_ready.is_set():
+        return
+    async with AsyncSessionLocal() as db:
+        fixed = await async_crud.reconcile_cart_totals(db)
+    if fixed:
+        print(f"Reconciled the totals of {fixed} carts")
+
+
+# Seconds between two reconciliations of the cart totals
+CART_RECONCILE_INTERVAL = float(os.environ.get("CART_RECONCILE_INTERVAL", 3600))
+
 # APScheduler for periodic task scheduling
 scheduler = AsyncIOScheduler()
 
 
+# Background task connecting to the database; startup does not wait for it, see /ready
+database_task: Optional[asyncio.Task] = None
+
+
+async def prepare_database():
+    try:
+        await wait_for_database()
+        # Backfills the totals of carts created before total_quantity existed
+        await reconcile_carts()
+    except Exception:
+        # Nothing awaits this task, so report the failure here; /ready keeps answering 503
+        print("Database preparation failed:")
+        traceback.print_exc()
+
+
+@app.on_event("startup")
+async def init_database():
+    global database_task
+    database_task = asyncio.create_task(prepare_database())
+
+
 @app.on_event("startup")
 async def start_scheduler():
     scheduler.start()
     # Schedule the system metrics update every 5 seconds
     scheduler.add_job(update_system_metrics, "interval", seconds=5)
+    scheduler.add_job(reconcile_carts, "interval", seconds=CART_RECONCILE_INTERVAL)
 
 
 @app.on_event("shutdown")
@@ -51,53 +98,170 @@ async def shutdown_scheduler():
     scheduler.shutdown()
 
 
+@app.on_event("shutdown")
+async def dispose_database():
+    if database_task is not None:
+        database_task.cancel()
+    await async_engine.dispose()
+
+
+# Readiness probe: 200 once the database is reachable and initialized, 503 otherwise
+@app.get("/ready")
+async def readiness():
+    if await ping_database():
+        return {"status": "ready"}
+    return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"status": "unavailable"})
+
+
+def parse_cursor(after: str, sort: Optional[str]) -> tuple:
+    """Sort order and key of an `after` cursor; an empty cursor starts at the first page."""
+    if sort is not None and sort not in SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(SORT_KEYS)}")
+    if not after:
+        return sort or "id", None
+    try:
+        cursor_sort, key = decode_cursor(after)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if sort is not None and sort != cursor_sort:
+        raise HTTPException(status_code=400, detail="sort does not match the cursor")
+    return cursor_sort, key
+
+
+def set_next_cursor(request: Request, response: Response, rows: list, sort: str, limit: int) -> None:
+    """Point to the next page with X-Next-Cursor and a Link header unless this page is the last one."""
+    if len(rows) < limit:
+        return
+    token = encode_cursor(sort, async_crud.sort_key(rows[-1], sort))
+    response.headers["X-Next-Cursor"] = token
+    response.headers["Link"] = f'<{request.url.include_query_params(after=token)}>; rel="next"'
+
+
+# JSON keys of the item rows encoded by list_items
+ITEM_FIELDS = tuple(column.key for column in async_crud.ITEM_COLUMNS)
+# Validates and encodes the rows returned by create_items
+ITEM_LIST = TypeAdapter(List[schemas.Item])
+
+# Most items read or created by one call of the batch endpoints
+ITEM_BATCH_GET_MAX = int(os.environ.get("ITEM_BATCH_GET_MAX", 1000))
+ITEM_BATCH_CREATE_MAX = int(os.environ.get("ITEM_BATCH_CREATE_MAX", 1000))
+
+
+def check_batch_size(size: int, limit: int) -> None:
+    if size > limit:
+        raise HTTPException(status_code=422, detail=f"At most {limit} items per batch")
+
+
 # Item Endpoints
 @app.post("/item", response_model=schemas.Item, status_code=status.HTTP_201_CREATED)
-def create_item(item: schemas.ItemCreate, db: Session = Depends(get_db)):
-    return crud.create_item(db, item)
+async def create_item(item: schemas.ItemCreate, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.create_item(db, item)
 
 
+# Rows are encoded straight to JSON; response_model only documents them
 @app.get("/item", response_model=List[schemas.Item])
-def list_items(
-    db: Session = Depends(get_db),
+async def list_items(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
     offset: int = Query(0, ge=0),
     limit: int = Query(10, gt=0),
     min_price: Optional[float] = Query(None, ge=0.0),
     max_price: Optional[float] = Query(None, ge=0.0),
-    show_deleted: bool = False
+    show_deleted: bool = False,
+    after: Optional[str] = None,
+    sort: Optional[str] = None,
 ):
-    items = crud.get_items(
+    # Cursor mode when `after` is given (empty for the first page), offset mode otherwise
+    key = None
+    if after is not None:
+        sort, key = parse_cursor(after, sort)
+    else:
+        sort = None
+    items = await async_crud.get_item_rows(
         db,
         offset=offset,
         limit=limit,
         min_price=min_price,
         max_price=max_price,
         show_deleted=show_deleted,
+        after=key,
+        sort=sort,
     )
     if not items:
         raise HTTPException(status_code=404, detail="No items found")
-    return items
+    response = Response(encode_rows(ITEM_FIELDS, items), media_type="application/json")
+    if sort is not None:
+        set_next_cursor(request, response, items, sort, limit)
+    return response
+
+
+# Batch endpoints: one query and one round trip for many items
+@app.post("/item/batch-get", response_model=schemas.ItemBatch)
+async def batch_get_items(body: schemas.ItemIds, db: AsyncSession = Depends(get_async_db)):
+    check_batch_size(len(body.ids), ITEM_BATCH_GET_MAX)
+    rows, missing = await async_crud.get_items_by_ids(db, body.ids)
+    content = dumps({"items": [dict(zip(ITEM_FIELDS, row)) for row in rows], "missing": missing})
+    return Response(content, media_type="application/json")
+
+
+@app.post("/item/batch", response_model=List[schemas.Item], status_code=status.HTTP_201_CREATED)
+async def create_items(items: List[schemas.ItemCreate], db: AsyncSession = Depends(get_async_db)):
+    check_batch_size(len(items), ITEM_BATCH_CREATE_MAX)
+    rows = await async_crud.create_items(db, items)
+    # RETURNING gives values as inserted (SQLite returns a price of 1 as an int), so the rows go
+    # through schemas.Item like a single create's response
+    content = ITEM_LIST.dump_json(ITEM_LIST.validate_python(rows, from_attributes=True))
+    return Response(content, status_code=status.HTTP_201_CREATED, media_type="application/json")
+
+
+# Bulk import and export, streamed in chunks of bulk.BULK_CHUNK_ROWS rows
+@app.post("/item/import", status_code=status.HTTP_201_CREATED)
+async def import_items(request: Request, format: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    # The format defaults to the request's content type
+    if format is None:
+        format = "csv" if request.headers.get("content-type", "").startswith("text/csv") else "ndjson"
+    if format not in bulk.MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(bulk.MEDIA_TYPES)}")
+    try:
+        imported = await bulk.import_items(db, request.stream(), format)
+    except bulk.BulkImportError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"imported": imported}
+
+
+@app.get("/item/export")
+async def export_items(format: str = "ndjson"):
+    if format not in bulk.MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(bulk.MEDIA_TYPES)}")
+
+    # The response outlives the endpoint, so the stream opens its own session
+    async def stream():
+        async with AsyncSessionLocal() as db:
+            async for chunk in bulk.export_items(db, format):
+                yield chunk
+
+    return StreamingResponse(stream(), media_type=bulk.MEDIA_TYPES[format])
 
 
 @app.get("/item/{item_id}", response_model=schemas.Item)
-def read_item(item_id: int, db: Session = Depends(get_db)):
-    db_item = crud.get_item(db, item_id)
+async def read_item(item_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_item = await async_crud.get_item_data(db, item_id)
     if db_item is None or db_item.deleted:
         raise HTTPException(status_code=404, detail="Item not found")
     return db_item
 
 
 @app.put("/item/{item_id}", response_model=schemas.Item)
-def update_item(item_id: int, item: schemas.ItemCreate, db: Session = Depends(get_db)):
-    db_item = crud.get_item(db, item_id)
+async def update_item(item_id: int, item: schemas.ItemCreate, db: AsyncSession = Depends(get_async_db)):
+    db_item = await async_crud.get_item(db, item_id)
     if db_item is None:
         raise HTTPException(status_code=404, detail="Item not found")
-    return crud.update_item(db, item_id, item)
+    return await async_crud.update_item(db, item_id, item)
 
 
 @app.patch("/item/{item_id}", response_model=schemas.Item)
-def patch_item(item_id: int, item: dict, db: Session = Depends(get_db)):
-    db_item = crud.get_item(db, item_id)
+async def patch_item(item_id: int, item: dict, db: AsyncSession = Depends(get_async_db)):
+    db_item = await async_crud.get_item(db, item_id)
     if db_item is None:
         raise HTTPException(status_code=404, detail="Item not found")
 
@@ -113,26 +277,21 @@ def patch_item(item_id: int, item: dict, db: Session = Depends(get_db)):
             content={"detail": f"Invalid fields: {invalid_fields}"}
         )
 
-    for key, value in item.items():
-        setattr(db_item, key, value)
-
-    db.commit()
-    db.refresh(db_item)
-    return db_item
+    return await async_crud.patch_item(db, db_item, item)
 
 
 @app.delete("/item/{item_id}", response_model=schemas.Item)
-def delete_item(item_id: int, db: Session = Depends(get_db)):
-    db_item = crud.get_item(db, item_id)
+async def delete_item(item_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_item = await async_crud.get_item(db, item_id)
     if db_item is None:
         raise HTTPException(status_code=404, detail="Item not found")
-    return crud.soft_delete_item(db, item_id)
+    return await async_crud.soft_delete_item(db, item_id)
 
 
 # Cart Endpoints
 @app.post("/cart", response_model=schemas.Cart, status_code=status.HTTP_201_CREATED)
-def create_cart(db: Session = Depends(get_db)):
-    new_cart = crud.create_cart(db)
+async def create_cart(db: AsyncSession = Depends(get_async_db)):
+    new_cart = await async_crud.create_cart(db)
     cart_data = schemas.Cart.from_orm(new_cart)
     return JSONResponse(
         status_code=status.HTTP_201_CREATED,
@@ -142,24 +301,42 @@ def create_cart(db: Session = Depends(get_db)):
 
 
 @app.get("/cart/{cart_id}", response_model=schemas.Cart)
-def read_cart(cart_id: int, db: Session = Depends(get_db)):
-    db_cart = crud.get_cart(db, cart_id)
+async def read_cart(cart_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_cart = await async_crud.get_cart_data(db, cart_id)
     if db_cart is None:
         raise HTTPException(status_code=404, detail="Cart not found")
-    return schemas.Cart.from_orm(db_cart)
+    return db_cart
 
 
 @app.get("/cart", response_model=List[schemas.Cart])
-def list_carts(
-    db: Session = Depends(get_db),
+async def list_carts(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     offset: int = Query(0, ge=0),
     limit: int = Query(10, gt=0),
     min_price: Optional[float] = Query(None, ge=0.0),
     max_price: Optional[float] = Query(None, ge=0.0),
     min_quantity: Optional[int] = Query(None, ge=0),
     max_quantity: Optional[int] = Query(None, ge=0),
+    after: Optional[str] = None,
+    sort: Optional[str] = None,
 ):
-    return crud.get_carts(
+    if after is not None:
+        sort, key = parse_cursor(after, sort)
+        carts = await async_crud.get_carts_data(
+            db,
+            after=key,
+            sort=sort,
+            limit=limit,
+            min_price=min_price,
+            max_price=max_price,
+            min_quantity=min_quantity,
+            max_quantity=max_quantity
+        )
+        set_next_cursor(request, response, carts, sort, limit)
+        return carts
+    return await async_crud.get_carts_data(
         db,
         offset=offset,
         limit=limit,
@@ -171,8 +348,25 @@ def list_carts(
 
 
 @app.post("/cart/{cart_id}/add/{item_id}", response_model=schemas.Cart)
-def add_item_to_cart(cart_id: int, item_id: int, db: Session = Depends(get_db)):
-    return crud.add_item_to_cart(db, cart_id, item_id)
+async def add_item_to_cart(cart_id: int, item_id: int, db: AsyncSession = Depends(get_async_db)):
+    cart = await async_crud.add_item_to_cart(db, cart_id, item_id)
+    if cart is None:
+        raise HTTPException(status_code=404, detail="Cart not found")
+    return cart
+
+
+# Add several items at once; the same item may be listed more than once
+@app.post("/cart/{cart_id}/add", response_model=schemas.Cart)
+async def add_items_to_cart(
+    cart_id: int, items: List[schemas.CartItemCreate], db: AsyncSession = Depends(get_async_db),
+):
+    quantities = {}
+    for item in items:
+        quantities[item.item_id] = quantities.get(item.item_id, 0) + item.quantity
+    cart = await async_crud.add_items_to_cart(db, cart_id, quantities)
+    if cart is None:
+        raise HTTPException(status_code=404, detail="Cart not found")
+    return cart
 
 
 @app.websocket("/chat/{chat_name}")
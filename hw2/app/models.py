@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -11,14 +11,30 @@ class Item(Base):
     price = Column(Float)
     deleted = Column(Boolean, default=False)
 
+    # Keyset pagination by id or (price, id), with and without the soft-delete filter
+    __table_args__ = (
+        Index("ix_items_deleted_id", "deleted", "id"),
+        Index("ix_items_deleted_price_id", "deleted", "price", "id"),
+        Index("ix_items_price_id", "price", "id"),
+    )
+
 
 class Cart(Base):
     __tablename__ = "carts"
 
     id = Column(Integer, primary_key=True, index=True)
     price = Column(Float, default=0.0)
+    # Sum of the quantities of the cart's items, kept by the add-to-cart write path and
+    # corrected by async_crud.reconcile_cart_totals, so quantity filters need no join
+    total_quantity = Column(Integer, default=0, server_default="0", nullable=False)
     items = relationship("CartItem", back_populates="cart")
 
+    # The (price, id) index also serves price range filters
+    __table_args__ = (
+        Index("ix_carts_price_id", "price", "id"),
+        Index("ix_carts_total_quantity", "total_quantity"),
+    )
+
 
 class CartItem(Base):
     __tablename__ = 'cart_items'
@@ -29,6 +45,11 @@ class CartItem(Base):
     quantity = Column(Integer, default=1)
     price = Column(Float, nullable=False)
 
+    # An item appears once per cart; adding it again increments the quantity (see crud.upsert_cart_items)
+    __table_args__ = (
+        Index("uq_cart_items_cart_id_item_id", "cart_id", "item_id", unique=True),
+    )
+
     cart = relationship("Cart", back_populates="items")
     item = relationship("Item")
 
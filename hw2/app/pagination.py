@@ -0,0 +1,35 @@
+import base64
+import binascii
+import json
+from typing import Tuple
+
+# Sort orders of cursor pagination and the number of key columns each one pages by
+SORT_KEYS = {
+    "id": 1,  # (id,)
+    "price": 2,  # (price, id)
+}
+
+
+def encode_cursor(sort: str, key: tuple) -> str:
+    """Opaque token pointing just after the row with the given sort key."""
+    payload = json.dumps({"s": sort, "k": list(key)}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(token: str) -> Tuple[str, tuple]:
+    """
+    Decode a token made by encode_cursor.
+
+    Raises:
+        ValueError: If the token is malformed.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        sort, key = payload["s"], tuple(payload["k"])
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor") from None
+    # The price of a (price, id) key may be NULL; ids never are
+    values = key[1:] if sort == "price" and key[:1] == (None,) else key
+    if SORT_KEYS.get(sort) != len(key) or not all(isinstance(v, (int, float)) for v in values):
+        raise ValueError("Invalid cursor")
+    return sort, key
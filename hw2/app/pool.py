@@ -0,0 +1,54 @@
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from prometheus_client import Counter, Gauge, Histogram
+
+# Prometheus Metrics, labelled by the engine ("sync" or "async") through the pool logging name
+pool_size_gauge = Gauge('db_pool_size', 'Configured number of pooled connections', ['engine'])
+pool_checked_out_gauge = Gauge('db_pool_checked_out', 'Connections currently checked out of the pool', ['engine'])
+pool_overflow_gauge = Gauge('db_pool_overflow', 'Connections open beyond the pool size', ['engine'])
+pool_checkouts_counter = Counter('db_pool_checkouts_total', 'Total number of connection checkouts', ['engine'])
+pool_timeouts_counter = Counter('db_pool_timeouts_total', 'Checkouts that gave up waiting for a connection', ['engine'])
+pool_wait_histogram = Histogram(
+    'db_pool_wait_seconds',
+    'Time spent waiting for a connection from the pool',
+    ['engine'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+
+class _TimedPoolMixin:
+    """Measures how long a checkout waits for a free connection, including opening a new one."""
+
+    def _do_get(self):
+        engine_label = self.logging_name or "default"
+        start_time = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_timeouts_counter.labels(engine=engine_label).inc()
+            raise
+        finally:
+            pool_wait_histogram.labels(engine=engine_label).observe(time.perf_counter() - start_time)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_pool(engine: Engine, engine_label: str) -> None:
+    """Export the size, checked-out and overflow gauges and the checkout counter of the engine's pool."""
+    pool = engine.pool
+    pool_size_gauge.labels(engine=engine_label).set_function(pool.size)
+    pool_checked_out_gauge.labels(engine=engine_label).set_function(pool.checkedout)
+    pool_overflow_gauge.labels(engine=engine_label).set_function(lambda: max(pool.overflow(), 0))
+
+    @event.listens_for(pool, "checkout")
+    def count_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_checkouts_counter.labels(engine=engine_label).inc()
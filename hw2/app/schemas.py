@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List
 
 
@@ -11,6 +11,10 @@ class ItemCreate(ItemBase):
     pass
 
 
+class ItemImport(ItemBase):
+    deleted: bool = False
+
+
 class Item(BaseModel):
     id: int
     name: str
@@ -21,9 +25,18 @@ class Item(BaseModel):
         from_attributes = True
 
 
+class ItemIds(BaseModel):
+    ids: List[int]
+
+
+class ItemBatch(BaseModel):
+    items: List[Item]
+    missing: List[int]
+
+
 class CartItemBase(BaseModel):
     item_id: int
-    quantity: int
+    quantity: int = Field(1, gt=0)
 
 
 class CartItemCreate(CartItemBase):
@@ -0,0 +1,97 @@
+"""
+Queries and latency of reading a page of carts with their items as the page grows.
+
+- lazy: ORM carts whose `items` lazy-load when pydantic reads them (1 + N queries)
+- selectin: async_crud.get_carts, ORM carts with items eager-loaded, validated by pydantic
+- rows: async_crud.get_carts_data, (id, price) rows and cart_item rows turned into models
+
+Usage:
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.bench_cart_reads [--carts 10 100 1000]
+                                                                         [--items-per-cart 5]
+"""
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable, List
+
+from sqlalchemy import event
+
+from app import async_crud, models, schemas
+from app.database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine
+
+
+async def seed(carts: int, items_per_cart: int) -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    async with AsyncSessionLocal() as db:
+        item_ids = [(await async_crud.create_item(db, schemas.ItemCreate(name=f"Item {i}", price=1.0 + i))).id
+                    for i in range(items_per_cart)]
+        for _ in range(carts):
+            cart = await async_crud.create_cart(db)
+            await async_crud.add_items_to_cart(db, cart.id, {item_id: 1 for item_id in item_ids})
+
+
+def lazy(limit: int) -> List[schemas.Cart]:
+    db = SessionLocal()
+    try:
+        return [schemas.Cart.model_validate(cart) for cart in db.query(models.Cart).limit(limit).all()]
+    finally:
+        db.close()
+
+
+async def selectin(limit: int) -> List[schemas.Cart]:
+    async with AsyncSessionLocal() as db:
+        return [schemas.Cart.model_validate(cart) for cart in await async_crud.get_carts(db, limit=limit)]
+
+
+async def rows(limit: int) -> List[schemas.Cart]:
+    async with AsyncSessionLocal() as db:
+        return await async_crud.get_carts_data(db, limit=limit)
+
+
+async def measure(read: Callable[[int], Awaitable[List[schemas.Cart]]], limit: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        carts = await read(limit)
+        best = min(best, time.perf_counter() - start)
+    assert len(carts) == limit
+    return best
+
+
+async def run(args: argparse.Namespace) -> None:
+    statements = []
+
+    def count(*_) -> None:
+        statements.append(None)
+
+    for bound in (engine, async_engine.sync_engine):
+        event.listen(bound, "before_cursor_execute", count)
+
+    async def lazy_read(limit: int) -> List[schemas.Cart]:
+        return lazy(limit)
+
+    print(f"{'carts':>6} {'path':<9} {'queries':>8} {'best, ms':>9}")
+    for carts in args.carts:
+        await seed(carts, args.items_per_cart)
+        for path, read in (("lazy", lazy_read), ("selectin", selectin), ("rows", rows)):
+            await read(carts)
+            statements.clear()
+            await read(carts)
+            queries = len(statements)
+            best = await measure(read, carts, args.repeat)
+            print(f"{carts:>6} {path:<9} {queries:>8} {best * 1e3:>9.2f}")
+    await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--carts", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--items-per-cart", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Throughput of the sync and async database paths under many concurrent requests.
+
+Sync mode reproduces what FastAPI does for `def` endpoints: every request runs its sync
+Session work in Starlette's threadpool, capped at 40 threads. Async mode awaits the same
+queries on an AsyncSession from the event loop. The database is taken from DATABASE_URL
+(and ASYNC_DATABASE_URL), e.g. a local SQLite file or the Postgres of docker-compose.
+
+Usage:
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.bench_db_modes [--requests 2000]
+                                                                       [--concurrency 10 100 500]
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import anyio
+import anyio.to_thread
+
+from app import async_crud, crud, schemas
+from app.database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine
+
+# Starlette's default threadpool size for sync endpoints and dependencies
+THREADPOOL_SIZE = 40
+
+
+async def seed(items: int, carts: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    async with AsyncSessionLocal() as db:
+        item_ids = [(await async_crud.create_item(db, schemas.ItemCreate(name=f"Item {i}", price=1.0 + i))).id
+                    for i in range(items)]
+        for _ in range(carts):
+            cart = await async_crud.create_cart(db)
+            await async_crud.add_items_to_cart(db, cart.id, {item_id: 1 for item_id in random.sample(item_ids, 3)})
+
+
+def sync_request(item_id: int, cart_id: int) -> None:
+    db = SessionLocal()
+    try:
+        crud.get_item(db, item_id)
+        schemas.Cart.model_validate(crud.get_cart(db, cart_id))
+    finally:
+        db.close()
+
+
+async def async_request(item_id: int, cart_id: int) -> None:
+    async with AsyncSessionLocal() as db:
+        await async_crud.get_item(db, item_id)
+        schemas.Cart.model_validate(await async_crud.get_cart(db, cart_id))
+
+
+async def measure(request: Callable[[int, int], Awaitable[None]], requests: int, concurrency: int,
+                  items: int, carts: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with slots:
+            start = time.perf_counter()
+            await request(random.randint(1, items), random.randint(1, carts))
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1e3,
+        "p99_ms": latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1e3,
+    }
+
+
+async def run(args: argparse.Namespace) -> None:
+    if not args.no_seed:
+        await seed(args.items, args.carts)
+    limiter = anyio.CapacityLimiter(THREADPOOL_SIZE)
+
+    async def threadpool_request(item_id: int, cart_id: int) -> None:
+        await anyio.to_thread.run_sync(sync_request, item_id, cart_id, limiter=limiter)
+
+    print(f"{'mode':<6} {'concurrency':>11} {'req/s':>9} {'p50, ms':>9} {'p99, ms':>9}")
+    for concurrency in args.concurrency:
+        for mode, request in (("sync", threadpool_request), ("async", async_request)):
+            result = await measure(request, args.requests, concurrency, args.items, args.carts)
+            print(f"{mode:<6} {concurrency:>11} {result['rps']:>9.0f} {result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f}")
+    await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--carts", type=int, default=200)
+    parser.add_argument("--no-seed", action="store_true", help="reuse the rows of a previous run")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
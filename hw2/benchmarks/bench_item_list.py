@@ -0,0 +1,82 @@
+"""
+Time to produce the JSON body of GET /item for growing page sizes.
+
+- orm: async_crud.get_items, ORM objects validated into schemas.Item and encoded like
+  FastAPI does for a response_model (jsonable_encoder, then json.dumps)
+- rows: async_crud.get_item_rows, column tuples encoded by encoding.encode_rows
+
+Usage:
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.bench_item_list [--rows 10 1000 100000]
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable, List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+
+from app import async_crud, models, schemas
+from app.database import AsyncSessionLocal, Base, async_engine
+from app.encoding import encode_rows, orjson
+
+ITEMS = TypeAdapter(List[schemas.Item])
+ITEM_FIELDS = [column.key for column in async_crud.ITEM_COLUMNS]
+
+
+async def seed(rows: int) -> None:
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(models.Item),
+            [{"name": f"Item {i}", "price": 1.0 + i / 100, "deleted": False} for i in range(rows)],
+        )
+
+
+async def orm(limit: int) -> bytes:
+    async with AsyncSessionLocal() as db:
+        items = ITEMS.validate_python(await async_crud.get_items(db, limit=limit), from_attributes=True)
+    return json.dumps(jsonable_encoder(items), separators=(",", ":")).encode("utf-8")
+
+
+async def rows(limit: int) -> bytes:
+    async with AsyncSessionLocal() as db:
+        return encode_rows(ITEM_FIELDS, await async_crud.get_item_rows(db, limit=limit))
+
+
+async def measure(encode: Callable[[int], Awaitable[bytes]], limit: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await encode(limit)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+async def run(args: argparse.Namespace) -> None:
+    await seed(max(args.rows))
+    assert json.loads(await orm(10)) == json.loads(await rows(10))
+
+    print(f"encoder: {'orjson' if orjson is not None else 'json'}")
+    print(f"{'rows':>7} {'orm, ms':>9} {'rows, ms':>9} {'speedup':>8}")
+    for limit in args.rows:
+        repeat = max(1, args.repeat * 1000 // max(limit, 1000))
+        slow = await measure(orm, limit, repeat)
+        fast = await measure(rows, limit, repeat)
+        print(f"{limit:>7} {slow * 1e3:>9.2f} {fast * 1e3:>9.2f} {slow / fast:>7.1f}x")
+    await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 1000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
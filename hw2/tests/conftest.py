@@ -0,0 +1,19 @@
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.cache import cart_cache, item_cache
+from app.database import Base
+
+
+@pytest_asyncio.fixture
+async def db():
+    """AsyncSession on a fresh in-memory SQLite database, with the read-through caches emptied."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    item_cache.clear()
+    cart_cache.clear()
+    async with async_sessionmaker(engine, autoflush=False, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
@@ -0,0 +1,222 @@
+import json
+
+import pytest
+from sqlalchemy import event, insert, update
+from sqlalchemy.dialects import postgresql
+
+from app import async_crud, crud, models, schemas
+from app.encoding import encode_rows
+from app.pagination import decode_cursor, encode_cursor
+
+
+@pytest.mark.asyncio
+async def test_item_lifecycle(db):
+    item = await async_crud.create_item(db, schemas.ItemCreate(name="Item", price=10.0))
+    assert (item.name, item.price, item.deleted) == ("Item", 10.0, False)
+
+    await async_crud.update_item(db, item.id, schemas.ItemCreate(name="Renamed", price=12.5))
+    assert (await async_crud.get_item(db, item.id)).name == "Renamed"
+
+    await async_crud.soft_delete_item(db, item.id)
+    assert await async_crud.get_items(db) == []
+    assert [i.id for i in await async_crud.get_items(db, show_deleted=True)] == [item.id]
+
+
+@pytest.mark.asyncio
+async def test_cart_lifecycle(db):
+    cheap = await async_crud.create_item(db, schemas.ItemCreate(name="Cheap", price=1.5))
+    expensive = await async_crud.create_item(db, schemas.ItemCreate(name="Expensive", price=100.0))
+    cart = await async_crud.create_cart(db)
+    assert schemas.Cart.from_orm(cart).items == []
+
+    await async_crud.add_item_to_cart(db, cart.id, cheap.id, quantity=2)
+    cart = await async_crud.add_item_to_cart(db, cart.id, expensive.id)
+    assert cart.price == 103.0
+    assert len(schemas.Cart.from_orm(await async_crud.get_cart(db, cart.id)).items) == 2
+
+    assert [c.id for c in await async_crud.get_carts(db, min_quantity=3)] == [cart.id]
+    assert await async_crud.get_carts(db, min_quantity=4) == []
+    assert await async_crud.add_item_to_cart(db, cart.id + 1, cheap.id) is None
+
+
+@pytest.mark.asyncio
+async def test_cached_reads_are_invalidated_by_writes(db):
+    item = await async_crud.create_item(db, schemas.ItemCreate(name="Item", price=10.0))
+    assert (await async_crud.get_item_data(db, item.id)).name == "Item"
+
+    await async_crud.update_item(db, item.id, schemas.ItemCreate(name="Updated", price=10.0))
+    assert (await async_crud.get_item_data(db, item.id)).name == "Updated"
+    await async_crud.patch_item(db, item, {"price": 5.0})
+    assert (await async_crud.get_item_data(db, item.id)).price == 5.0
+    await async_crud.soft_delete_item(db, item.id)
+    assert (await async_crud.get_item_data(db, item.id)).deleted
+
+    cart = await async_crud.create_cart(db)
+    assert (await async_crud.get_cart_data(db, cart.id)).items == []
+    await async_crud.add_item_to_cart(db, cart.id, item.id)
+    cached = await async_crud.get_cart_data(db, cart.id)
+    assert (len(cached.items), cached.price) == (1, 5.0)
+
+
+@pytest.mark.asyncio
+async def test_patching_the_id_invalidates_the_old_entry(db):
+    item = await async_crud.create_item(db, schemas.ItemCreate(name="Item", price=10.0))
+    old_id = item.id
+    assert (await async_crud.get_item_data(db, old_id)).name == "Item"
+
+    await async_crud.patch_item(db, item, {"id": old_id + 100})
+    assert await async_crud.get_item_data(db, old_id) is None
+    assert (await async_crud.get_item_data(db, old_id + 100)).name == "Item"
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_cover_all_items_once(db):
+    prices = [5.0, 1.0, 5.0, 3.0, 1.0, 2.0, 5.0]
+    for i, price in enumerate(prices):
+        await async_crud.create_item(db, schemas.ItemCreate(name=f"Item {i}", price=price))
+    deleted = await async_crud.create_item(db, schemas.ItemCreate(name="Deleted", price=0.5))
+    await async_crud.soft_delete_item(db, deleted.id)
+
+    for sort in ("id", "price"):
+        seen, key = [], None
+        while True:
+            page = await async_crud.get_items_after(db, after=key, sort=sort, limit=3)
+            seen.extend(page)
+            if len(page) < 3:
+                break
+            key = async_crud.sort_key(page[-1], sort)
+        assert len(seen) == len(prices)
+        assert [async_crud.sort_key(i, sort) for i in seen] == sorted(async_crud.sort_key(i, sort) for i in seen)
+
+    page = await async_crud.get_items_after(db, after=(1.0, 5), sort="price", limit=10, max_price=4.0)
+    assert [(i.price, i.id) for i in page] == [(2.0, 6), (3.0, 4)]
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_past_null_prices(db):
+    await db.execute(insert(models.Item), [
+        {"name": f"Item {i}", "price": price} for i, price in enumerate([None, 2.0, None, 1.0, None])
+    ])
+    await db.commit()
+
+    seen, token = [], None
+    while True:
+        _, key = decode_cursor(token) if token is not None else (None, None)
+        page = await async_crud.get_item_rows(db, after=key, sort="price", limit=2)
+        seen.extend(page)
+        if len(page) < 2:
+            break
+        token = encode_cursor("price", async_crud.sort_key(page[-1], "price"))
+    assert [(r.price, r.id) for r in seen] == [(1.0, 4), (2.0, 2), (None, 1), (None, 3), (None, 5)]
+
+
+@pytest.mark.asyncio
+async def test_keyset_carts(db):
+    item = await async_crud.create_item(db, schemas.ItemCreate(name="Item", price=2.0))
+    carts = [await async_crud.create_cart(db) for _ in range(4)]
+    for quantity, cart in enumerate(carts, start=1):
+        await async_crud.add_item_to_cart(db, cart.id, item.id, quantity=quantity)
+
+    first = await async_crud.get_carts_after(db, sort="price", limit=2)
+    assert [c.id for c in first] == [carts[0].id, carts[1].id]
+    rest = await async_crud.get_carts_after(db, after=async_crud.sort_key(first[-1], "price"), sort="price", limit=2, min_quantity=4)
+    assert [c.id for c in rest] == [carts[3].id]
+
+
+@pytest.mark.asyncio
+async def test_adding_an_item_again_increments_its_quantity(db):
+    first = await async_crud.create_item(db, schemas.ItemCreate(name="First", price=2.0))
+    second = await async_crud.create_item(db, schemas.ItemCreate(name="Second", price=10.0))
+    cart = await async_crud.create_cart(db)
+
+    await async_crud.add_item_to_cart(db, cart.id, first.id)
+    cart = await async_crud.add_item_to_cart(db, cart.id, first.id, quantity=2)
+    assert [(ci.item_id, ci.quantity) for ci in cart.items] == [(first.id, 3)]
+    assert cart.price == 6.0
+
+    # Items already in the cart keep the price they were added at
+    await async_crud.patch_item(db, first, {"price": 100.0})
+    cart = await async_crud.add_items_to_cart(db, cart.id, {first.id: 1, second.id: 2, second.id + 1: 5})
+    assert sorted((ci.item_id, ci.quantity, ci.price) for ci in cart.items) == [(first.id, 4, 2.0), (second.id, 2, 10.0)]
+    assert cart.price == 28.0
+    assert (await async_crud.get_cart_data(db, cart.id)).price == 28.0
+
+    assert await async_crud.add_items_to_cart(db, cart.id + 1, {first.id: 1}) is None
+
+
+@pytest.mark.asyncio
+async def test_cart_projection_matches_orm_in_two_queries(db):
+    items = [await async_crud.create_item(db, schemas.ItemCreate(name=f"Item {i}", price=1.0 + i)) for i in range(5)]
+    for n in range(1, 13):
+        cart = await async_crud.create_cart(db)
+        await async_crud.add_items_to_cart(db, cart.id, {item.id: n for item in items[:n % 5 + 1]})
+
+    statements = []
+    event.listen(db.bind.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    carts = await async_crud.get_carts_data(db, limit=100, min_quantity=3)
+    assert len(statements) == 2
+
+    expected = [schemas.Cart.model_validate(c) for c in await async_crud.get_carts(db, limit=100, min_quantity=3)]
+    assert [c.model_dump() for c in carts] == [c.model_dump() for c in expected]
+    assert len(carts) == 11
+
+    page = await async_crud.get_carts_data(db, after=(carts[0].id,), sort="id", limit=3)
+    assert [c.id for c in page] == [c.id for c in carts[1:4]]
+    assert (await async_crud.get_cart_data(db, carts[0].id)) == carts[0]
+
+
+@pytest.mark.asyncio
+async def test_cart_totals_are_maintained_and_reconciled(db):
+    item = await async_crud.create_item(db, schemas.ItemCreate(name="Item", price=2.5))
+    empty = await async_crud.create_cart(db)
+    cart = await async_crud.create_cart(db)
+    await async_crud.add_items_to_cart(db, cart.id, {item.id: 3})
+    cart = await async_crud.add_item_to_cart(db, cart.id, item.id)
+    assert (cart.total_quantity, cart.price) == (4, 10.0)
+
+    # Empty carts are listed too
+    assert [c.id for c in await async_crud.get_carts_data(db, max_quantity=0)] == [empty.id]
+    assert [c.id for c in await async_crud.get_carts_data(db, min_quantity=4)] == [cart.id]
+    assert await async_crud.reconcile_cart_totals(db) == 0
+
+    await db.execute(update(models.Cart).where(models.Cart.id == cart.id).values(total_quantity=1, price=0.0))
+    await db.commit()
+    assert (await async_crud.get_cart_data(db, cart.id)).price == 0.0
+    assert await async_crud.reconcile_cart_totals(db) == 1
+    assert (await async_crud.get_cart_data(db, cart.id)).price == 10.0
+    assert [c.id for c in await async_crud.get_carts_data(db, min_quantity=4)] == [cart.id]
+
+
+def test_cart_writers_and_reconciliation_lock_carts():
+    # Row locks are a no-op on SQLite, so only the Postgres SQL is checked
+    for statement in (crud.lock_cart_statement(1), crud.drifted_carts_statement()):
+        assert str(statement.compile(dialect=postgresql.dialect())).endswith("FOR UPDATE")
+
+
+@pytest.mark.asyncio
+async def test_item_rows_encode_like_the_schema(db):
+    for i in range(4):
+        await async_crud.create_item(db, schemas.ItemCreate(name=f"Товар {i}", price=0.1 * i))
+    await async_crud.soft_delete_item(db, 2)
+
+    fields = [column.key for column in async_crud.ITEM_COLUMNS]
+    rows = await async_crud.get_item_rows(db, limit=10, show_deleted=True)
+    expected = [schemas.Item.model_validate(i).model_dump() for i in await async_crud.get_items(db, show_deleted=True)]
+    assert json.loads(encode_rows(fields, rows)) == expected
+
+    assert [r.id for r in await async_crud.get_item_rows(db, offset=1, limit=2)] == [3, 4]
+    assert [r.id for r in await async_crud.get_item_rows(db, after=(0.1, 1), sort="price", limit=2)] == [3, 4]
+
+
+@pytest.mark.asyncio
+async def test_batch_create_and_get_items(db):
+    rows = await async_crud.create_items(db, [schemas.ItemCreate(name=f"Item {i}", price=i) for i in range(5)])
+    assert [(r.name, r.price, r.deleted) for r in rows] == [(f"Item {i}", i, False) for i in range(5)]
+    assert await async_crud.create_items(db, []) == []
+
+    ids = [r.id for r in rows]
+    await async_crud.soft_delete_item(db, ids[1])
+    found, missing = await async_crud.get_items_by_ids(db, [ids[4], 999, ids[0], ids[1], ids[4]])
+    assert [r.id for r in found] == [ids[4], ids[0], ids[4]]
+    assert missing == [999, ids[1]]
+    assert await async_crud.get_items_by_ids(db, []) == ([], [])
@@ -0,0 +1,61 @@
+import pytest
+
+from app import async_crud, bulk
+
+
+async def chunked(data: bytes, size: int = 7):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def export(db, file_format: str) -> bytes:
+    return b"".join([chunk async for chunk in bulk.export_items(db, file_format)])
+
+
+@pytest.mark.asyncio
+async def test_ndjson_round_trip(db, monkeypatch):
+    monkeypatch.setattr(bulk, "BULK_CHUNK_ROWS", 2)
+    data = "\n".join(f'{{"name": "Товар {i}", "price": {i}.5, "deleted": {str(i == 3).lower()}}}' for i in range(5))
+    assert await bulk.import_items(db, chunked(data.encode("utf-8")), "ndjson") == 5
+
+    exported = await export(db, "ndjson")
+    assert exported.count(b"\n") == 5
+    assert exported.splitlines()[3] == '{"id":4,"name":"Товар 3","price":3.5,"deleted":true}'.encode("utf-8")
+
+    # Exports import back, ids aside
+    assert await bulk.import_items(db, chunked(exported), "ndjson") == 5
+    assert [r.name for r in await async_crud.get_item_rows(db, offset=5, limit=10, show_deleted=True)] == [
+        f"Товар {i}" for i in range(5)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_csv_round_trip(db):
+    data = 'name,price\r\nplain,1.5\r\n"quoted, with ""comma""\nand newline",2\r\n\r\n'
+    assert await bulk.import_items(db, chunked(data.encode("utf-8"), 3), "csv") == 2
+
+    exported = await export(db, "csv")
+    assert exported.decode("utf-8") == (
+        'id,name,price,deleted\n1,plain,1.5,false\n2,"quoted, with ""comma""\nand newline",2.0,false\n'
+    )
+    assert await bulk.import_items(db, chunked(exported), "csv") == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(("file_format", "data", "message"), [
+    ("ndjson", b'{"name": "a", "price": 1}\n{"name": "b"}\n', "Line 2: Field required"),
+    ("ndjson", b'{"name": "a", "price": 1}\nnot json\n', "Line 2: invalid JSON"),
+    ("csv", b'name,price\na,1\nb,x\n', "Line 3: Input should be a valid number"),
+    ("csv", b'name,price\n"a,1\n', "unterminated quoted field"),
+    ("csv", b'name,price\na,1\n"b' + b'\n' * 10, "Line 7: quoted field is too long"),
+    ("ndjson", b'{"name": "a", "price": 1}\n' + b' ' * 200, "Line 2: line is too long"),
+    ("csv", b'name,price\na,1\n' + b'b' * 200 + b',1\n', "Line 3: line is too long"),
+])
+async def test_invalid_import_writes_nothing(db, monkeypatch, file_format, data, message):
+    # Earlier rows were already written when the bad line is reached
+    monkeypatch.setattr(bulk, "BULK_CHUNK_ROWS", 1)
+    monkeypatch.setattr(bulk, "BULK_MAX_RECORD_LINES", 5)
+    monkeypatch.setattr(bulk, "BULK_MAX_RECORD_CHARS", 100)
+    with pytest.raises(bulk.BulkImportError, match=message):
+        await bulk.import_items(db, chunked(data), file_format)
+    assert await async_crud.get_item_rows(db, show_deleted=True) == []
@@ -0,0 +1,64 @@
+import pytest
+
+from app.cache import FakeBackend, ReadThroughCache, TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(max_entries=2, ttl=-1)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+@pytest.mark.asyncio
+async def test_read_through_cache_with_shared_backend():
+    backend = FakeBackend()
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return {"id": 1}
+
+    first = ReadThroughCache("test_shared", backend=backend)
+    assert await first.get_or_load(1, load) == {"id": 1}
+    assert await first.get_or_load(1, load) == {"id": 1}
+    # Another process finds the value in the shared backend
+    second = ReadThroughCache("test_shared", backend=backend)
+    assert await second.get_or_load(1, load) == {"id": 1}
+    assert len(loads) == 1
+    assert first.hit_ratio() == 0.5
+
+    await first.invalidate(1)
+    assert await first.get_or_load(1, load) == {"id": 1}
+    assert len(loads) == 2
+
+
+@pytest.mark.asyncio
+async def test_value_loaded_during_invalidation_is_not_stored():
+    cache = ReadThroughCache("test_race")
+
+    async def load():
+        await cache.invalidate(1)
+        return {"id": 1, "stale": True}
+
+    assert await cache.get_or_load(1, load) == {"id": 1, "stale": True}
+    assert len(cache.local) == 0
+
+
+@pytest.mark.asyncio
+async def test_missing_values_are_not_cached():
+    cache = ReadThroughCache("test_missing")
+
+    async def load():
+        return None
+
+    assert await cache.get_or_load(1, load) is None
+    assert len(cache.local) == 0
@@ -0,0 +1,69 @@
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import database, models  # noqa: F401  (registers the tables)
+from app.database import Base, create_missing_columns, create_missing_indexes, merge_duplicate_cart_items
+
+
+@pytest.mark.asyncio
+async def test_upgrade_adds_missing_columns_and_indexes():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        # carts as created before total_quantity and the composite indexes existed
+        await conn.execute(text("CREATE TABLE carts (id INTEGER PRIMARY KEY, price FLOAT)"))
+        await conn.execute(text("INSERT INTO carts (id, price) VALUES (1, 5.0)"))
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(create_missing_columns)
+        await conn.run_sync(create_missing_indexes)
+
+        columns = await conn.run_sync(lambda sync_conn: [c["name"] for c in inspect(sync_conn).get_columns("carts")])
+        indexes = await conn.run_sync(lambda sync_conn: [i["name"] for i in inspect(sync_conn).get_indexes("carts")])
+        assert "total_quantity" in columns
+        assert {"ix_carts_price_id", "ix_carts_total_quantity"} <= set(indexes)
+        assert (await conn.execute(text("SELECT total_quantity FROM carts"))).scalar() == 0
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_wait_for_database_gives_up(monkeypatch):
+    monkeypatch.setattr(database, "async_engine", create_async_engine("sqlite+aiosqlite:////nonexistent/dir/db"))
+    with pytest.raises(OperationalError):
+        await database.wait_for_database(initial_delay=0.01, timeout=0.05)
+
+    # Errors other than connection failures are not retried
+    attempts = []
+
+    def broken(connection) -> None:
+        attempts.append(connection)
+        raise RuntimeError("broken migration")
+
+    monkeypatch.setattr(database, "async_engine", create_async_engine("sqlite+aiosqlite:///:memory:"))
+    monkeypatch.setattr(database, "create_missing_columns", broken)
+    with pytest.raises(RuntimeError):
+        await database.wait_for_database(initial_delay=0.01, timeout=10)
+    assert len(attempts) == 1
+
+
+@pytest.mark.asyncio
+async def test_upgrade_merges_duplicate_cart_items():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        # cart_items as created before the unique (cart_id, item_id) index, with an add stored twice
+        await conn.execute(text(
+            "CREATE TABLE cart_items (id INTEGER PRIMARY KEY, cart_id INTEGER, item_id INTEGER, "
+            "quantity INTEGER, price FLOAT NOT NULL)"
+        ))
+        await conn.execute(text(
+            "INSERT INTO cart_items (id, cart_id, item_id, quantity, price) "
+            "VALUES (1, 1, 1, 1, 2.0), (2, 1, 2, 1, 5.0), (3, 1, 1, 3, 4.0)"
+        ))
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(create_missing_columns)
+        await conn.run_sync(merge_duplicate_cart_items)
+        await conn.run_sync(create_missing_indexes)
+
+        rows = (await conn.execute(text("SELECT id, item_id, quantity, price FROM cart_items ORDER BY id"))).all()
+        assert [tuple(row) for row in rows] == [(1, 1, 4, 3.5), (2, 2, 1, 5.0)]
+    await engine.dispose()
@@ -284,6 +284,11 @@ def test_delete_item(client, existing_item: dict[str, Any]) -> None:
     assert response.status_code == HTTPStatus.OK
 
 
+def test_add_item_to_missing_cart(client, existing_items: list[int]) -> None:
+    response = client.post(f"/cart/999999999/add/{existing_items[0]}")
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
 @pytest.mark.asyncio
 async def test_chat_room():
     chat_room_name = "room1"
@@ -0,0 +1,25 @@
+import pytest
+
+from app.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    for sort, key in (("id", (42,)), ("price", (19.99, 7)), ("price", (None, 7))):
+        token = encode_cursor(sort, key)
+        assert "=" not in token
+        assert decode_cursor(token) == (sort, key)
+
+
+@pytest.mark.parametrize("token", [
+    "",
+    "not a cursor",
+    encode_cursor("id", (1, 2)),
+    encode_cursor("price", (1.0,)),
+    encode_cursor("name", (1,)),
+    encode_cursor("id", ("1",)),
+    encode_cursor("id", (None,)),
+    encode_cursor("price", (1.0, None)),
+])
+def test_invalid_cursor(token):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(token)
@@ -0,0 +1,26 @@
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+
+from app.pool import TimedQueuePool, instrument_pool
+
+
+def sample(name: str) -> float:
+    return REGISTRY.get_sample_value(name, {"engine": "test"}) or 0.0
+
+
+def test_pool_metrics(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=TimedQueuePool, pool_logging_name="test", pool_size=2,
+    )
+    instrument_pool(engine, "test")
+    checkouts = sample("db_pool_checkouts_total")
+    waits = sample("db_pool_wait_seconds_count")
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        assert sample("db_pool_checked_out") == 1
+    assert sample("db_pool_checked_out") == 0
+    assert sample("db_pool_size") == 2
+    assert sample("db_pool_checkouts_total") == checkouts + 1
+    assert sample("db_pool_wait_seconds_count") == waits + 1
+    engine.dispose()